@@ -1,3 +1,6 @@
+import time
+BOOT_TIME = time.time()
+
 from gevent import monkey
 try:
     monkey.patch_all()
@@ -5,17 +8,27 @@ try:
 except ImportError:
     pass
 
-from flask import Flask, render_template, Response, request, jsonify
+from flask import Flask, render_template, Response, request, jsonify, send_from_directory
 from flask_socketio import SocketIO, emit
 from modules.servo_controller import ServoController
 from modules.laser_controller import LaserController
 from modules.camera import CameraStreamer
 from modules.calibration_logger import CalibrationLogger
-from modules.detector import create_detector
+from modules.detector import create_detector, BaseDetector
 from modules.auto_pilot import AutoPilot
-from gpiozero.pins.pigpio import PiGPIOFactory
-import time
-import json
+from modules.config_store import ConfigStore
+from modules.startup import StartupOrchestrator, offload
+from modules.power import PowerManager
+from modules.thermal import ThermalGovernor
+from modules import metrics
+from modules.tracing import TRACER
+from modules.profiler import SamplingProfiler
+from modules.joystick import JoystickIntegrator
+from modules.video_push import VideoPusher
+from modules.events import EventRing, EventPublisher, sse_format, SSE_CLIENTS
+from modules.assets import AssetPipeline, Asset, CACHE_IMMUTABLE
+from modules.clip_recorder import ClipRecorder
+import threading
 import os
 import atexit
 import signal
@@ -37,43 +50,36 @@ print(f"[System] Async Mode: {async_mode}")
 app = Flask(__name__)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode)
 
+# Fingerprinted, precompressed static files (templates use asset_url())
+assets = AssetPipeline(os.path.join(app.root_path, 'static'))
+app.jinja_env.globals['asset_url'] = assets.url
+
 # Load Config
 CONFIG_PATH = 'config/config.json'
 HARDWARE_CONFIG_PATH = 'config/hardware.json'
 
-try:
-    with open(CONFIG_PATH, 'r') as f:
-        CONFIG = json.load(f)
-except Exception as e:
-    print(f"Error loading config: {e}. Using defaults.")
-    CONFIG = {}
-
-# Overlay Hardware Config
-if os.path.exists(HARDWARE_CONFIG_PATH):
-    try:
-        with open(HARDWARE_CONFIG_PATH, 'r') as f:
-            hw_conf = json.load(f)
-            if 'servos' not in CONFIG: CONFIG['servos'] = {}
-            if 'servos' in hw_conf:
-                for k, v in hw_conf['servos'].items():
-                    CONFIG['servos'][k] = v
-            print(f"Loaded Hardware Config from {HARDWARE_CONFIG_PATH}")
-    except Exception as e:
-        print(f"Error loading hardware config: {e}")
+# Immutable snapshots (config.json + hardware.json overlay), swapped atomically on update
+config_store = ConfigStore(CONFIG_PATH, HARDWARE_CONFIG_PATH)
+CONFIG = config_store.get() # Startup snapshot (read-only)
 
-# Initialize Hardware
-try:
-    factory = PiGPIOFactory()
-except:
-    print("MOCK: Could not connect to pigpio. Running in MOCK mode.")
-    factory = None
+# Per-frame pipeline tracing (off unless enabled here or via /api/trace)
+TRACER.configure(CONFIG.get('tracing', {}))
+
+# On-demand sampling profiler (/api/admin/profile)
+profiler = SamplingProfiler(CONFIG.get('profiler', {}))
+
+# Subsystems (GPIO, detector, camera) come up concurrently; the web UI is served meanwhile
+startup = StartupOrchestrator(BOOT_TIME)
 
-servos = ServoController(factory)
+# Initialize Hardware (connected by the 'gpio' startup task)
+servos = ServoController(connect=False)
 
 # Apply Limits
 p_lim = CONFIG.get('servos', {}).get('pan_limits_deg', [0, 180])
 t_lim = CONFIG.get('servos', {}).get('tilt_limits_deg', [0, 180])
 servos.set_limits(p_lim, t_lim)
+config_store.subscribe('servos', lambda conf: servos.set_limits(
+    conf.get('pan_limits_deg', [0, 180]), conf.get('tilt_limits_deg', [0, 180])))
 
 # Apply Center
 center = CONFIG.get('servos', {}).get('center_deg')
@@ -81,45 +87,249 @@ center = CONFIG.get('servos', {}).get('center_deg')
 #     servos.set_pan(center[0])
 #     servos.set_tilt(center[1])
 
-laser = LaserController(factory)
+laser = LaserController()
 
 # Initialize Logic Modules
-calibration = CalibrationLogger('config/laser_calibration.json')
-
-# Create Detector (Using Factory)
-detector = create_detector(CONFIG)
+calib_conf = CONFIG.get('calibration', {})
+calibration = CalibrationLogger(
+    'config/laser_calibration.json',
+    model=calib_conf.get('model', 'linear'),
+    lut_step_deg=calib_conf.get('lut_step_deg', 1.0),
+    inverse_step_px=calib_conf.get('inverse_step_px', 8),
+    inverse_margin_px=calib_conf.get('inverse_margin_px', 20),
+    online=calib_conf.get('online', {}),
+    compact_every=calib_conf.get('journal_compact_every', 1000)
+)
+
+# Detector placeholder until the 'detector' startup task has loaded the real one
+detector = BaseDetector()
 
 # AutoPilot
-autopilot = AutoPilot(CONFIG, servos, laser, detector, calibration)
+autopilot = AutoPilot(CONFIG, servos, laser, detector, calibration, config_store=config_store)
 
 # Camera (Deferred Init)
 camera_streamer = None
 
+# Idle power mode (no cat for a while); detector / camera are swapped in by startup tasks
+power = PowerManager(CONFIG, servos, laser, autopilot, lambda: detector, lambda: camera_streamer)
+
+# No idle power mode in the middle of a calibration sweep (servos would detach, laser go off)
+power.add_inhibitor('calibration', lambda: calibration_sweep is not None and calibration_sweep.running)
+
+# Thermal governor: sheds stream fps -> stream quality -> inference rate as the SoC heats up
+thermal = ThermalGovernor(CONFIG, lambda: camera_streamer, lambda: detector)
+
+# Metrics (scraped from /metrics); pipeline stages are instrumented in their modules
+MJPEG_CLIENTS = metrics.gauge('laser_mjpeg_clients', 'Connected MJPEG stream clients')
+MJPEG_BYTES = metrics.counter('laser_mjpeg_bytes_sent_total', 'MJPEG bytes handed to clients')
+metrics.gauge('laser_soc_temp_celsius', 'Last SoC temperature read by the thermal governor', lambda: thermal.temp_c)
+metrics.gauge('laser_power_idle', '1 while in idle power mode', lambda: power.idle)
+
+# Manual control: joystick axis state integrated at a fixed rate (only while in MANUAL, not during a sweep)
+joystick = JoystickIntegrator(CONFIG, servos,
+                              lambda: autopilot.state == 'MANUAL' and not (calibration_sweep and calibration_sweep.running),
+                              on_move=lambda pan, tilt: socketio.emit('gimbal_state', {'pan': pan, 'tilt': tilt}))
+
+# Binary WebSocket video (latest-only, acked); /video_feed stays as the MJPEG fallback
+video_pusher = VideoPusher(CONFIG, socketio, lambda: camera_streamer, lambda: thermal.stream_fps)
+
+# Change events (detections / AutoPilot state) for long-poll and SSE consumers
+EVENTS_CONFIG = CONFIG.get('events', {})
+event_ring = EventRing(EVENTS_CONFIG.get('capacity', 1024))
+event_publisher = EventPublisher(CONFIG, event_ring, lambda: detector, autopilot)
+
+# Pre/post-event clips (EVADE, model failover, manual via /api/clips)
+recorder = ClipRecorder(CONFIG, lambda: camera_streamer, lambda: detector,
+                        on_clip=lambda info: event_ring.publish('clip', info))
+autopilot.on_evade = lambda det: recorder.trigger('evade', {"label": det.get('label'), "bbox": det.get('bbox')})
+
+# Auto Calibration Sweep (Created on first use, needs camera)
+calibration_sweep = None
+
+# --- Startup Tasks ---
+_wire_lock = threading.Lock()
+
+def _wire_detector(det):
+    """Hand the loaded detector to everything that consumes it."""
+    global detector
+    with _wire_lock:
+        detector = det
+        autopilot.detector = det
+        if camera_streamer:
+            camera_streamer.detector = det
+    models = getattr(det, 'models', None) # TFLite ModelManager
+    if models is not None:
+        models.on_failover = lambda failed, standby: recorder.trigger('failover', {"failed": failed, "standby": standby})
+    det.start()
+
+def _init_gpio():
+    def import_gpiozero():
+        from gpiozero.pins.pigpio import PiGPIOFactory
+        return PiGPIOFactory
+    # Slow import on a worker; the pigpio connect itself stays here (it starts its own thread)
+    try:
+        factory = offload(import_gpiozero)()
+    except Exception:
+        print("MOCK: Could not connect to pigpio. Running in MOCK mode.")
+        return "mock"
+    servos.connect(factory)
+    laser.connect(factory)
+    return "pigpio"
+
+def _init_detector():
+    # Model load / delegate / tensor allocation are blocking C calls
+    return offload(create_detector, CONFIG)
+
+def _init_camera():
+    global camera_streamer
+    from modules.laser_dot import LaserDotDetector
+    with _wire_lock:
+        camera_streamer = CameraStreamer(CONFIG, detector)
+    camera_streamer.start()
+    autopilot.set_frame_source(camera_streamer, LaserDotDetector(CONFIG.get('calibration', {}).get('laser_dot', {})))
+    if not camera_streamer.wait_first_frame(CONFIG.get('camera', {}).get('first_frame_timeout_s', 10.0)):
+        raise RuntimeError("No frame from camera")
+    return camera_streamer.backend
+
+startup.run('gpio', _init_gpio)
+startup.run('detector', _init_detector, on_ready=_wire_detector)
+
 # --- Routes ---
+def _send_asset(asset, cache_control):
+    encoding = assets.negotiate(asset, request.accept_encodings)
+    etag = asset.etag(encoding)
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+        if encoding != 'identity':
+            resp.headers['Content-Encoding'] = encoding
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = cache_control
+    resp.headers['Vary'] = 'Accept-Encoding'
+    return resp
+
+_index_page = None
+
 @app.route('/')
 def index():
-    # Force client to update cache
-    return render_template('index.html', version=int(time.time()))
+    # The page only changes with the assets: render once, revalidate with ETag (304)
+    global _index_page
+    if _index_page is None:
+        _index_page = Asset('index.html', render_template('index.html', version=assets.version).encode('utf-8'))
+    return _send_asset(_index_page, 'no-cache')
+
+@app.route('/assets/<path:hashed_path>')
+def hashed_asset(hashed_path):
+    asset = assets.lookup(hashed_path)
+    if not asset:
+        return jsonify({"status": "error", "msg": "Unknown asset"}), 404
+    return _send_asset(asset, CACHE_IMMUTABLE)
+
+MJPEG_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+MJPEG_NEXT_PART = b'\r\n' + MJPEG_PART_HEADER # CRLF ending the previous JPEG + next part header
 
 @app.route('/video_feed')
 def video_feed():
     def stream_generator():
-        while True:
-            if camera_streamer:
-                frame = camera_streamer.get_frame()
-                if frame:
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        last_count = -1
+        last_sent = 0
+        first = True
+        MJPEG_CLIENTS.inc()
+        try:
+            while True:
+                if camera_streamer:
+                    # Only new frames, at most thermal.stream_fps when the governor limits it
+                    if thermal.stream_fps:
+                        wait = last_sent + 1.0 / thermal.stream_fps - time.time()
+                        if wait > 0: time.sleep(wait)
+                    if camera_streamer.frame_count == last_count:
+                        time.sleep(0.01)
+                        continue
+                    buf, count, _ = camera_streamer.acquire_frame()
+                    if not buf:
+                        time.sleep(0.01)
+                        continue
+                    try:
+                        last_count = count
+                        last_sent = time.time()
+                        # Part header (closing the previous part), then the pooled JPEG itself: no per-frame concat copy
+                        header = MJPEG_PART_HEADER if first else MJPEG_NEXT_PART
+                        first = False
+                        MJPEG_BYTES.inc(len(header) + len(buf))
+                        t_send = metrics.now()
+                        yield header
+                        yield buf.view()
+                        # Resumed once the server has written the frame (includes client backpressure)
+                        TRACER.complete('mjpeg_send', 'mjpeg', count, t_send)
+                    finally:
+                        buf.release()
                 else:
-                    time.sleep(0.05)
-            else:
-                time.sleep(1)
-                yield b''
+                    time.sleep(1)
+                    yield b''
+        finally:
+            # Client went away (GeneratorExit) or the server is shutting down
+            MJPEG_CLIENTS.dec()
 
     return Response(stream_generator(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 # --- API Routes ---
 
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus text exposition format
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/trace', methods=['GET', 'POST'])
+def trace():
+    # GET: Chrome trace JSON of the last `seconds` (open in chrome://tracing or ui.perfetto.dev)
+    if request.method == 'GET':
+        seconds = request.args.get('seconds', 10, type=float)
+        resp = Response(TRACER.dumps(seconds), mimetype='application/json')
+        resp.headers['Content-Disposition'] = f'attachment; filename=pi_laser_trace_{int(time.time())}.json'
+        return resp
+
+    data = request.json or {}
+    if 'enabled' in data:
+        TRACER.set_enabled(data['enabled'])
+    if data.get('clear'):
+        TRACER.clear()
+    print(f"[Trace] {'Enabled' if TRACER.enabled else 'Disabled'}")
+    return jsonify(TRACER.status())
+
+@app.route('/api/admin/profile', methods=['POST'])
+def run_profile():
+    # Blocks this request for `seconds`, then returns collapsed stacks (flamegraph.pl / speedscope)
+    data = request.json or {}
+    seconds = data.get('seconds', request.args.get('seconds', 10, type=float))
+    stacks = profiler.profile(seconds, data.get('interval_ms'))
+    if stacks is None:
+        return jsonify({"status": "error", "msg": "Profiler already running"}), 409
+
+    print(f"[Profiler] {profiler.last}")
+    if data.get('format') == 'json':
+        return jsonify(dict(profiler.last, collapsed=dict(stacks.most_common())))
+    resp = Response(profiler.collapsed(stacks), mimetype='text/plain')
+    resp.headers['X-Profile-Samples'] = str(profiler.last['samples'])
+    resp.headers['X-Profile-Overhead-Pct'] = str(profiler.last['overhead_pct'])
+    return resp
+
+@app.route('/api/clips', methods=['GET', 'POST'])
+def clips():
+    # POST: manual trigger, the clip is written post_s seconds later
+    if request.method == 'POST':
+        data = request.json or {}
+        if not recorder.trigger(data.get('reason', 'manual'), data.get('note')):
+            return jsonify({"status": "error", "msg": "Recorder disabled"}), 409
+        return jsonify({"status": "ok", "ready_in_s": recorder.post_s})
+    return jsonify({"recorder": recorder.status(), "clips": recorder.list_clips()})
+
+@app.route('/api/clips/<path:filename>')
+def clip_file(filename):
+    # <id>.mjpeg (play with ffplay -f mjpeg) or <id>.json (triggers + per-frame detections)
+    mimetype = 'video/x-motion-jpeg' if filename.endswith('.mjpeg') else None
+    return send_from_directory(os.path.abspath(recorder.dir), filename, mimetype=mimetype)
+
 @app.route('/api/health')
 def health():
     cam_status = camera_streamer.get_status() if camera_streamer else {"status": "uninitialized"}
@@ -134,14 +344,77 @@ def health():
         "camera": cam_status,
         "detector": {
             "mode": det_mode,
-            "type": detector.__class__.__name__
+            "type": detector.__class__.__name__,
+            "healthy": detector.healthy(),
+            "status": detector.status()
         },
-        "autopilot": autopilot.state
+        "autopilot": autopilot.state,
+        "calibration": calibration.online_status(),
+        "config": config_store.status(),
+        "startup": startup.status(),
+        "power": power.status(),
+        "thermal": thermal.status(),
+        "tracing": TRACER.status(),
+        "profiler": profiler.status(),
+        "joystick": joystick.status(),
+        "ws_video": video_pusher.status(),
+        "recorder": recorder.status()
     })
 
 @app.route('/api/detections')
 def get_detections():
-    return jsonify(detector.get_latest_detections())
+    # Without after_seq: current detections (plain list, as before)
+    after_seq = request.args.get('after_seq', type=int)
+    if after_seq is None:
+        return jsonify(detector.get_latest_detections())
+
+    # Long-poll: detection changes newer than after_seq, waiting up to `timeout` seconds for one
+    timeout = min(request.args.get('timeout', EVENTS_CONFIG.get('long_poll_timeout_s', 25), type=float), 60)
+    events, missed, cursor = event_ring.wait(after_seq, timeout, types=('detections',))
+    return jsonify({"seq": cursor, "missed": missed, "events": events})
+
+@app.route('/api/events')
+def event_stream():
+    # Server-Sent Events; reconnecting clients resume from Last-Event-ID (or ?after_seq=)
+    types = tuple(t for t in request.args.get('types', '').split(',') if t) or None
+    after_seq = request.headers.get('Last-Event-ID', type=int)
+    if after_seq is None:
+        after_seq = request.args.get('after_seq', event_ring.seq, type=int)
+    keepalive = EVENTS_CONFIG.get('sse_keepalive_s', 15)
+
+    def generate(seq):
+        SSE_CLIENTS.inc()
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                events, missed, seq = event_ring.wait(seq, keepalive, types)
+                if missed:
+                    yield "event: missed\ndata: {}\n\n"
+                for event in events:
+                    yield sse_format(event)
+                if not events and not missed:
+                    yield ": keepalive\n\n" # Also how a closed connection gets noticed
+        finally:
+            SSE_CLIENTS.dec()
+
+    resp = Response(generate(after_seq), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+@app.route('/api/detector/models')
+def get_models():
+    if not hasattr(detector, 'models'):
+        return jsonify({"status": "error", "msg": "Detector has no model registry"}), 400
+    return jsonify(detector.models.stats())
+
+@app.route('/api/detector/models/activate', methods=['POST'])
+def activate_model():
+    if not hasattr(detector, 'models'):
+        return jsonify({"status": "error", "msg": "Detector has no model registry"}), 400
+    name = request.json.get('name')
+    res = detector.models.activate(name)
+    return jsonify(res), (200 if res['success'] else 404)
 
 @app.route('/api/calibration/sample', methods=['POST'])
 def add_sample():
@@ -166,6 +439,35 @@ def clear_calibration():
     calibration.clear()
     return jsonify({"status": "ok"})
 
+@app.route('/api/calibration/auto', methods=['GET', 'POST'])
+def auto_calibration():
+    global calibration_sweep
+    if request.method == 'GET':
+        if not calibration_sweep:
+            return jsonify({"state": "IDLE"})
+        return jsonify(calibration_sweep.status())
+
+    if not camera_streamer:
+        return jsonify({"success": False, "msg": "Camera not available"}), 503
+
+    if calibration_sweep is None:
+        from modules.laser_dot import LaserDotDetector
+        from modules.calibration_sweep import CalibrationSweep
+        dot = LaserDotDetector(CONFIG.get('calibration', {}).get('laser_dot', {}))
+        calibration_sweep = CalibrationSweep(CONFIG, servos, laser, calibration, dot, camera_streamer, safety=autopilot)
+
+    # Sweep owns the servos and laser while it runs (wake from idle first: servos attached, full fps)
+    power.touch('calibration')
+    autopilot.set_mode('manual')
+    res = calibration_sweep.start()
+    return jsonify(res), (200 if res['success'] else 409)
+
+@app.route('/api/calibration/auto/stop', methods=['POST'])
+def stop_auto_calibration():
+    if calibration_sweep:
+        calibration_sweep.stop()
+    return jsonify({"status": "ok"})
+
 @app.route('/api/limits/set', methods=['POST'])
 def set_limits():
     data = request.json
@@ -176,21 +478,14 @@ def set_limits():
     if axis == 'pan': current_val = servos.current_pan
     elif axis == 'tilt': current_val = servos.current_tilt
     
-    if 'servos' not in CONFIG: CONFIG['servos'] = {}
-    
-    if axis == 'pan':
-        if 'pan_limits_deg' not in CONFIG['servos']: CONFIG['servos']['pan_limits_deg'] = [0, 180]
-        limits = CONFIG['servos']['pan_limits_deg']
-    else:
-        if 'tilt_limits_deg' not in CONFIG['servos']: CONFIG['servos']['tilt_limits_deg'] = [0, 180]
-        limits = CONFIG['servos']['tilt_limits_deg']
+    key = 'pan_limits_deg' if axis == 'pan' else 'tilt_limits_deg'
+    limits = list(config_store.section('servos').get(key, [0, 180]))
         
     if lim_type == 'min': limits[0] = current_val
     elif lim_type == 'max': limits[1] = current_val
     
-    if autopilot:
-        autopilot.pan_limits = CONFIG['servos'].get('pan_limits_deg', [0, 180])
-        autopilot.tilt_limits = CONFIG['servos'].get('tilt_limits_deg', [0, 180])
+    # New snapshot; servos / autopilot pick it up atomically (persisted on /api/config/save)
+    config_store.update('servos', {key: limits}, persist=False)
 
     print(f"[Limits] Updated {axis} {lim_type} to {current_val}")
     return jsonify({"status": "ok", "limits": limits, "val": current_val})
@@ -200,8 +495,7 @@ def set_center():
     pan = servos.current_pan
     tilt = servos.current_tilt
     
-    if 'servos' not in CONFIG: CONFIG['servos'] = {}
-    CONFIG['servos']['center_deg'] = [pan, tilt]
+    config_store.update('servos', {'center_deg': [pan, tilt]}, persist=False)
     
     print(f"[Center] Updated Center to P:{pan}, T:{tilt}")
     return jsonify({"status": "ok", "center": [pan, tilt]})
@@ -209,30 +503,10 @@ def set_center():
 @app.route('/api/config/save', methods=['POST'])
 def save_config_all():
     try:
-        # Save Hardware
-        hw_keys = ['pan_limits_deg', 'tilt_limits_deg', 'center_deg']
-        hw_data = {'servos': {}}
-        servos_conf = CONFIG.get('servos', {})
-        for k in hw_keys:
-            if k in servos_conf:
-                hw_data['servos'][k] = servos_conf[k]
-        
-        with open(HARDWARE_CONFIG_PATH, 'w') as f:
-            json.dump(hw_data, f, indent=4)
-            
-        # Save Main Config (Exclude HW keys)
-        import copy
-        main_conf = copy.deepcopy(CONFIG)
-        if 'servos' in main_conf:
-            for k in hw_keys:
-                if k in main_conf['servos']:
-                    del main_conf['servos'][k]
-                    
-        with open(CONFIG_PATH, 'w') as f:
-            json.dump(main_conf, f, indent=4)
-        
+        # Hardware + main config are written in the background (debounced, atomic replace)
+        config_store.save()
         calibration.save()
-        return jsonify({"status": "ok"})
+        return jsonify({"status": "ok", "version": config_store.version})
     except Exception as e:
         return jsonify({"status": "error", "msg": str(e)}), 500
 
@@ -248,6 +522,7 @@ def mock_detection():
     if camera_streamer:
         FW, FH = camera_streamer.resolution
     
+    power.touch('mock_detection')
     if hasattr(detector, 'set_detection'):
         detector.set_detection(x, y, w, h, FW, FH)
         return jsonify({"status": "ok"})
@@ -257,6 +532,7 @@ def mock_detection():
 # --- WebSocket Events ---
 @socketio.on('connect')
 def handle_connect():
+    power.touch('client')
     emit('gimbal_state', {
         'pan': servos.current_pan, 
         'tilt': servos.current_tilt,
@@ -264,27 +540,35 @@ def handle_connect():
         'mode': autopilot.state
     })
 
+@socketio.on('disconnect')
+def handle_disconnect():
+    joystick.release(request.sid)
+    video_pusher.unsubscribe(request.sid)
+
+@socketio.on('video_subscribe')
+def handle_video_subscribe():
+    power.touch('video')
+    video_pusher.subscribe(request.sid)
+    # Disabled in config -> the client stays on MJPEG
+    emit('video_mode', {'enabled': request.sid in video_pusher.clients})
+
+@socketio.on('video_unsubscribe')
+def handle_video_unsubscribe():
+    video_pusher.unsubscribe(request.sid)
+
+@socketio.on('video_ack')
+def handle_video_ack(data):
+    video_pusher.ack(request.sid, (data or {}).get('seq'))
+
 @socketio.on('joystick_control')
 def handle_joystick(data):
-    if autopilot.state != 'MANUAL': return
-    
-    pan_input = data.get('pan_axis', 0.0)
-    tilt_input = data.get('tilt_axis', 0.0)
-    
-    if abs(pan_input) < 0.1: pan_input = 0
-    if abs(tilt_input) < 0.1: tilt_input = 0
-    
-    SPEED = 1.0 
-    d_pan = pan_input * -SPEED 
-    d_tilt = tilt_input * SPEED 
-    
-    print(f"[Joystick] In: P={pan_input:.2f}/T={tilt_input:.2f} -> D: P={d_pan:.2f}/T={d_tilt:.2f}")
-    
-    real_pan, real_tilt = servos.move_relative(d_pan, d_tilt, ignore_limits=True)
-    emit('gimbal_state', {'pan': real_pan, 'tilt': real_tilt})
+    # Axis state changes (+ keep-alive while held); the integrator loop moves the servos
+    power.touch('joystick')
+    joystick.set_axes(request.sid, data.get('pan_axis', 0.0), data.get('tilt_axis', 0.0))
 
 @socketio.on('toggle_laser')
 def handle_laser_toggle():
+    power.touch('laser')
     if autopilot.state != 'MANUAL':
         autopilot.set_mode('manual')
         laser.off()
@@ -297,22 +581,59 @@ def handle_laser_toggle():
 @socketio.on('set_mode')
 def handle_set_mode(data):
     mode = data.get('mode')
-    autopilot.set_mode(mode)
+    power.touch('mode')
+    if mode == 'auto' and not startup.ready('detector'):
+        # No detections = no person / cat safety check: never let ROAM fire the laser blind
+        task = startup.tasks.get('detector') or {}
+        msg = f"Detector not ready ({task.get('error') or task.get('state', 'not started')})"
+        emit('gimbal_state', {'mode': autopilot.state, 'error': msg})
+        return
+    if mode == 'auto' and calibration_sweep and calibration_sweep.running:
+        emit('gimbal_state', {'mode': autopilot.state, 'error': "Calibration sweep running"})
+        return
+    if not autopilot.set_mode(mode):
+        emit('gimbal_state', {'mode': autopilot.state, 'error': "Detector not loaded"})
+        return
     emit('gimbal_state', {'mode': autopilot.state})
 
 # --- Background Status Loop ---
 def background_status_thread():
+    # Timestamped samples at status_hz; the browser interpolates between them at display rate.
+    # AutoPilot state changes (e.g. EVADE) go out right away.
+    interval = 1.0 / CONFIG.get('ui', {}).get('status_hz', 5)
+    idle_sent = False
+    last_emit = 0
+    last_state = None
     while True:
         try:
+            # Idle: one last update (shows IDLE), then stay quiet until woken
+            if power.idle:
+                if idle_sent:
+                    time.sleep(0.5)
+                    continue
+                idle_sent = True
+            else:
+                idle_sent = False
+            
+            if autopilot.state == last_state and time.time() - last_emit < interval:
+                time.sleep(0.05)
+                continue
+            
+            t_emit = metrics.now()
             status = autopilot.get_status()
             if camera_streamer:
                 status['frame_size'] = camera_streamer.resolution
             else:
                 status['frame_size'] = [640, 480]
+            last_emit = time.time()
+            last_state = status['state']
+            status['ts'] = last_emit * 1000 # Server clock (ms), same clock as video frame ts
+            status['det_ts'] = detector.detections_ts * 1000
             socketio.emit('auto_status', status)
+            TRACER.complete('auto_status', 'status', detector.detections_seq, t_emit)
         except Exception as e:
             print(f"Status Loop Error: {e}")
-        time.sleep(0.1) 
+            time.sleep(0.1)
 
 def cleanup():
     print("Cleaning up...")
@@ -320,22 +641,27 @@ def cleanup():
     if autopilot: autopilot.stop()
     if laser: laser.off()
     if servos: servos.detach()
+    config_store.close()
 
 atexit.register(cleanup)
 signal.signal(signal.SIGTERM, lambda num, frame: sys.exit(0))
 signal.signal(signal.SIGINT, lambda num, frame: sys.exit(0))
 
-if __name__ == '__main__':
+def start_background():
+    """Camera, control loops and the status broadcast (also used by tools/soak_test.py)."""
     print("Initializing Camera Streamer...")
-    try:
-        camera_streamer = CameraStreamer(CONFIG, detector)
-        camera_streamer.start()
-    except Exception as e:
-        print(f"Warning: Camera init failed: {e}")
-        camera_streamer = None
+    startup.run('camera', _init_camera)
 
     autopilot.start()
+    event_publisher.start()
+    recorder.start()
+    joystick.start()
+    power.start()
+    thermal.start()
     socketio.start_background_task(background_status_thread)
+
+if __name__ == '__main__':
+    start_background()
     
     # Run
     socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False)
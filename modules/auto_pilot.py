@@ -3,7 +3,18 @@ import threading
 import random
 import os
 import math
+
+import numpy as np
+
 from . import safety
+from . import geometry
+from . import metrics
+from .tracing import TRACER
+from .detector import BaseDetector
+
+TICK_SECONDS = metrics.histogram('laser_control_tick_seconds', 'AutoPilot ROAM tick (safety check + move), sleeps excluded')
+DETECTION_AGE = metrics.histogram('laser_detection_age_seconds', 'Age of the detections used by the safety check', metrics.INTERVAL_BUCKETS)
+EVADES = metrics.counter('laser_evades_total', 'Danger overlaps that triggered an evade')
 
 """
 1. MANUAL (手動模式)
@@ -35,23 +46,36 @@ from . import safety
     時長：預設 2 秒 (evade_cooldown_ms)。
     進入條件：從 EVADE 狀態結束後自動進入。
     離開條件：時間到後，自動切回 ROAM，重新開始漫遊。
+5. IDLE (待機模式)
+    意義：省電中。長時間沒有看到貓，由 PowerManager 暫停。
+    行為：
+        雷射：保持關閉。
+        動作：空轉 (sleep)，伺服馬達已斷電 (detach)。
+    進入條件：PowerManager 判定閒置 (suspend)。
+    離開條件：偵測到貓或使用者操作，回到進入 IDLE 前的狀態 (resume)。
 """
 class AutoPilot:
-    def __init__(self, config_data, servos, laser, detector, calibration):
+    def __init__(self, config_data, servos, laser, detector, calibration, config_store=None):
         self.config = config_data.get('auto_loop', {})
+        self.config_store = config_store # Live limits (set from the UI) when available
         self.servos = servos
         self.laser = laser
         self.detector = detector
         self.calibration = calibration
         
         # State
-        self.state = 'MANUAL' # MANUAL, TRACK, EVADE, COOLDOWN
+        self.on_state = None # (old, new) on every transition (e.g. event stream)
+        self._state = 'MANUAL' # MANUAL, TRACK, EVADE, COOLDOWN, IDLE
+        self.resume_state = 'MANUAL'
         self.running = False
         self.thread = None
         self.last_move_time = 0
         self.last_hit_time = 0
         self.laser_on_start_time = 0
         self.evade_start_time = 0
+        self.traced_seq = 0 # Last detection seq written to the trace
+        self.on_evade = None # (det) after the laser went off for a danger overlap (e.g. clip recorder)
+        self.detector_lost = False # ROAM held dark because the detector is unhealthy
         
         # Config params
         self.roi_radius = config_data.get('calibration', {}).get('roi_radius_px', 35)
@@ -61,11 +85,51 @@ class AutoPilot:
         self.danger_margin = config_data.get('safety', {}).get('danger_margin_px', 50)
         self.evade_cooldown_ms = config_data.get('safety', {}).get('cooldown_ms', 2000)
         
+        # Per-class danger profiles: label -> (margin_px, head_radius_px, priority)
+        self.default_profile = (self.danger_margin, 0, 0)
+        self.profiles = {}
+        for label, prof in config_data.get('safety', {}).get('profiles', {}).items():
+            self.profiles[label.lower()] = (
+                prof.get('margin_px', self.danger_margin),
+                prof.get('head_radius_px', 0),
+                prof.get('priority', 0)
+            )
+        
         self.pan_limits = config_data.get('servos', {}).get('pan_limits_deg', [20, 160])
         self.tilt_limits = config_data.get('servos', {}).get('tilt_limits_deg', [20, 140])
         
         # Speed Config
         self.step_size = self.config.get('roam_step_deg', 0.5)
+        
+        # Target Sampling (evaluated in one batch per pick)
+        self.roam_candidates = self.config.get('roam_candidates', 64)
+        self.path_samples = self.config.get('path_samples', 8)
+        
+        # Online calibration: observe the laser dot while paused during ROAM
+        online = config_data.get('calibration', {}).get('online', {})
+        self.observe_enabled = online.get('enabled', True)
+        self.observe_frames = online.get('fresh_frames', 2)
+        self.camera = None
+        self.dot_detector = None
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        old = self._state
+        self._state = state
+        if state != old and self.on_state:
+            try:
+                self.on_state(old, state)
+            except Exception as e:
+                print(f"[AutoPilot] State callback error: {e}")
+
+    def set_frame_source(self, camera, dot_detector):
+        """camera needs get_frame() and frame_count (CameraStreamer)"""
+        self.camera = camera
+        self.dot_detector = dot_detector
 
     def start(self):
         if self.running: return
@@ -87,18 +151,38 @@ class AutoPilot:
         print("[AutoPilot] Stopped")
 
     def set_mode(self, mode):
+        """Returns False if auto was refused (no detector yet: ROAM would fire the laser without a safety check)."""
         if mode == 'auto':
+            if type(self.detector) is BaseDetector:
+                print("[AutoPilot] Refusing ROAM: detector not loaded")
+                return False
             self.state = 'ROAM'
             print("[AutoPilot] Switched to ROAM")
         else:
             self.state = 'MANUAL'
             self.laser.off()
             print("[AutoPilot] Switched to MANUAL")
+        return True
+
+    def suspend(self):
+        """Enter IDLE (power saving); remembers the current mode for resume()."""
+        if self.state == 'IDLE': return
+        # Interrupted EVADE / COOLDOWN come back as ROAM
+        self.resume_state = 'MANUAL' if self.state == 'MANUAL' else 'ROAM'
+        self.state = 'IDLE'
+        self.laser.off()
+        if hasattr(self, 'target_pan'): del self.target_pan
+        print("[AutoPilot] Suspended (IDLE)")
+
+    def resume(self):
+        if self.state != 'IDLE': return
+        self.state = self.resume_state
+        print(f"[AutoPilot] Resumed -> {self.state}")
 
     def _loop(self):
         while self.running:
             try:
-                if self.state == 'MANUAL':
+                if self.state in ('MANUAL', 'IDLE'):
                     time.sleep(0.1)
                     continue
 
@@ -122,16 +206,33 @@ class AutoPilot:
 
                 # --- 3. ROAM STATE (Active Roaming) ---
                 if self.state == 'ROAM':
+                    # No model (failed, nothing warm): no detections means no safety check. Hold ROAM dark.
+                    if not self.detector.healthy():
+                        if self.laser.state: self.laser.off()
+                        if not self.detector_lost:
+                            self.detector_lost = True
+                            print("[AutoPilot] Detector unhealthy: laser off, holding ROAM")
+                        time.sleep(0.1)
+                        continue
+                    if self.detector_lost:
+                        self.detector_lost = False
+                        print("[AutoPilot] Detector healthy again: resuming ROAM")
+
+                    tick_start = metrics.now()
                     # A. Safety Check (ALWAYS FIRST)
                     if self._check_danger_and_evade():
+                        TICK_SECONDS.observe(metrics.now() - tick_start)
                         continue
 
                     # B. Roaming Logic
                     # If we are settled (reached target or just started), pick a new target
                     if not hasattr(self, 'target_pan') or self._has_reached_target():
+                        frame_mark = self.camera.frame_count if self.camera else 0
                         self._pick_new_roam_target()
                         # Pause briefly at the destination to simulate "observing"
                         time.sleep(random.uniform(0.2, 0.8))
+                        # The laser sat still during the pause: a good time to check calibration
+                        self._observe_laser(frame_mark)
                         continue
                     
                     # C. Move towards target (Interpolation)
@@ -140,9 +241,10 @@ class AutoPilot:
                     # D. Laser Control
                     # In ROAM mode, laser should be ON unless we are moving too fast (optional)
                     # For this "creepy crawl" effect, we keep it ON.
-                    if not self.laser.state:
+                    if not self.laser.state and self.state == 'ROAM': # May have been suspended meanwhile
                         self.laser.on()
                         self.laser_on_start_time = now
+                    TICK_SECONDS.observe(metrics.now() - tick_start)
                     
                     # Max Laser On Time Check (Optional: blink or reset to prevent overheating if needed)
                     # For now, we let it roam continuously.
@@ -156,72 +258,141 @@ class AutoPilot:
     def _check_danger_and_evade(self):
         """負責移動中的即時安全檢查
         若偵測到危險且狀態切換至 EVADE 迴避，則返回 True"""
+        t_check = metrics.now()
         # 1. Get Prediction
         roi_center = self.calibration.predict(self.servos.current_pan, self.servos.current_tilt)
-        if not roi_center: return False
         
-        # 2. Get Detections
-        bboxes = self.detector.get_latest_detections()
+        # 2. Get Detections (targets + safety classes from the same inference)
+        seq = self.detector.detections_seq
+        dets, zones, priority = self._danger_zones(self.detector.get_latest_detections())
+        if self.detector.detections_ts:
+            DETECTION_AGE.observe(time.time() - self.detector.detections_ts)
+        # Trace only the first check that sees a new inference result (the loop runs at 50Hz)
+        trace_seq = seq if seq != self.traced_seq else None
+        self.traced_seq = seq
         
         # 3. Check Overlap
-        laser_bbox = [
-            roi_center[0] - self.roi_radius,
-            roi_center[1] - self.roi_radius,
-            roi_center[0] + self.roi_radius,
-            roi_center[1] + self.roi_radius
-        ]
+        laser_bbox = None
+        if roi_center:
+            laser_bbox = [
+                roi_center[0] - self.roi_radius,
+                roi_center[1] - self.roi_radius,
+                roi_center[0] + self.roi_radius,
+                roi_center[1] + self.roi_radius
+            ]
         
-        for det in bboxes:
-            cat_bbox = det.get('bbox')
-            if not cat_bbox: continue
-            
-            danger_zone = safety.expand_bbox(cat_bbox, self.danger_margin)
-            
-            if safety.rect_intersects(laser_bbox, danger_zone):
-                print(f"[AutoPilot] DANGER! Overlap with {det.get('label')}")
-                self.laser.off()
-                self._perform_evade(cat_bbox, roi_center)
-                self.state = 'EVADE'
-                return True
-        return False
+        # Let the detector boost its rate around the laser / danger zones
+        self.detector.set_focus(laser_bbox, zones.reshape(-1, 4).tolist() if zones is not None else [])
+        if not laser_bbox or zones is None:
+            if trace_seq: TRACER.complete('safety_check', 'autopilot', trace_seq, t_check)
+            return False
+        
+        # One vectorized pass over all body + head zones
+        hit = safety.rect_hits(laser_bbox, zones).any(axis=1)
+        if trace_seq: TRACER.complete('safety_check', 'autopilot', trace_seq, t_check)
+        if not hit.any(): return False
+        
+        # Evade from the highest-priority class that was hit
+        det = dets[int(np.argmax(np.where(hit, priority, -np.inf)))]
+        print(f"[AutoPilot] DANGER! Overlap with {det.get('label')}")
+        EVADES.inc()
+        self.laser.off()
+        TRACER.instant('laser_off', 'autopilot', seq)
+        self._perform_evade(det['bbox'], roi_center)
+        self.state = 'EVADE'
+        if self.on_evade:
+            try:
+                self.on_evade(det)
+            except Exception as e:
+                print(f"[AutoPilot] Evade callback error: {e}")
+        return True
+
+    def danger_at(self, x, y):
+        """Detection whose danger zone a laser dot at pixel (x, y) touches (highest priority first), or None.
+        Same zones as the ROAM safety check; used by tasks that drive the laser outside ROAM (sweep)."""
+        dets, zones, priority = self._danger_zones(self.detector.get_latest_detections())
+        if zones is None: return None
+        r = self.roi_radius
+        hit = safety.rect_hits([x - r, y - r, x + r, y + r], zones).any(axis=1)
+        if not hit.any(): return None
+        return dets[int(np.argmax(np.where(hit, priority, -np.inf)))]
+
+    def _danger_zones(self, bboxes, extra_margin=0):
+        """Build per-class danger zones for all detections.
+        Returns (dets, zones (N, 2, 4), priority (N,)), zones is None when nothing is detected."""
+        dets = [det for det in bboxes if det.get('bbox')]
+        if not dets: return dets, None, None
+        
+        boxes = np.array([det['bbox'] for det in dets], dtype=float)
+        prof = np.array([self.profiles.get(str(det.get('label', '')).lower(), self.default_profile) for det in dets], dtype=float)
+        zones = safety.danger_zones(boxes, prof[:, 0] + extra_margin, prof[:, 1] + extra_margin)
+        return dets, zones, prof[:, 2]
 
     def _pick_new_roam_target(self):
         """負責挑選安全落點"""
-        # Try to find a safe point
-        for _ in range(10):
-            # Randomly pick a point within limits
-            t_pan = random.uniform(self.pan_limits[0], self.pan_limits[1])
-            t_tilt = random.uniform(self.tilt_limits[0], self.tilt_limits[1])
+        # Sample all candidates at once
+        n = self.roam_candidates
+        pan_limits, tilt_limits = self._limits()
+        pans = np.random.uniform(pan_limits[0], pan_limits[1], n)
+        tilts = np.random.uniform(tilt_limits[0], tilt_limits[1], n)
+        
+        # Predict where they are
+        pts = self.calibration.predict_many(pans, tilts)
+        if pts is None:
+            # If we cannot predict, just stay put
+            self.target_pan = self.servos.current_pan
+            self.target_tilt = self.servos.current_tilt
+            return
+        
+        # Danger zones once per pick (extra margin for target)
+        _, zones, _ = self._danger_zones(self.detector.get_latest_detections(), extra_margin=20)
+        choice = 0
+        if zones is not None:
+            zones = zones.reshape(-1, 4)
             
-            # Predict where this is
-            pred_pt = self.calibration.predict(t_pan, t_tilt)
-            if not pred_pt: continue
+            # Destination must be outside every danger zone
+            end_safe = ~geometry.points_in_rects(pts, zones).any(axis=1)
             
-            # Check if this potential target is near any cat
-            bboxes = self.detector.get_latest_detections()
-            is_safe = True
-            for det in bboxes:
-                cat_bbox = det.get('bbox')
-                if not cat_bbox: continue
-                
-                # Check if target is inside danger zone
-                danger_zone = safety.expand_bbox(cat_bbox, self.danger_margin + 20) # Extra margin for target
-                
-                # Simple point-in-rect check
-                px, py = pred_pt
-                if (danger_zone[0] < px < danger_zone[2]) and (danger_zone[1] < py < danger_zone[3]):
-                    is_safe = False
-                    break
+            # Sweep the path (in servo space) and make sure the laser never crosses a zone on the way
+            paths = geometry.sweep((self.servos.current_pan, self.servos.current_tilt),
+                                   np.column_stack((pans, tilts)), self.path_samples)
+            path_px = self.calibration.predict_many(paths[..., 0].ravel(), paths[..., 1].ravel())
+            path_safe = ~geometry.points_in_rects(path_px, zones).any(axis=1).reshape(n, -1).any(axis=1)
             
-            if is_safe:
-                self.target_pan = t_pan
-                self.target_tilt = t_tilt
-                # print(f"[AutoPilot] New Target: {t_pan:.1f}, {t_tilt:.1f}")
+            safe = np.flatnonzero(end_safe & path_safe)
+            if not len(safe):
+                # Fall back to a safe destination even if the path grazes a zone
+                safe = np.flatnonzero(end_safe)
+            if not len(safe):
+                # If we failed to find a safe point, just stay put
+                self.target_pan = self.servos.current_pan
+                self.target_tilt = self.servos.current_tilt
                 return
+            choice = safe[0]
+        
+        self.target_pan = float(pans[choice])
+        self.target_tilt = float(tilts[choice])
+        # print(f"[AutoPilot] New Target: {self.target_pan:.1f}, {self.target_tilt:.1f}")
 
-        # If we failed to find a safe point, just stay put or pick current
-        self.target_pan = self.servos.current_pan
-        self.target_tilt = self.servos.current_tilt
+    def _observe_laser(self, frame_mark):
+        """Detect the (settled) laser dot and feed it to the online calibration corrector."""
+        if not (self.observe_enabled and self.camera and self.dot_detector): return
+        if not self.laser.state or not self.calibration.calibrated: return
+        # Only frames captured after the servo stopped (the pause above)
+        if self.camera.frame_count < frame_mark + self.observe_frames: return
+        
+        frame = self.camera.get_frame()
+        if not frame: return
+        hit = self.dot_detector.detect(frame)
+        if hit:
+            self.calibration.observe(self.servos.current_pan, self.servos.current_tilt, hit[0], hit[1])
+
+    def _limits(self):
+        """(pan_limits, tilt_limits) from one config snapshot, so both come from the same version."""
+        if self.config_store is None:
+            return self.pan_limits, self.tilt_limits
+        conf = self.config_store.section('servos')
+        return conf.get('pan_limits_deg', self.pan_limits), conf.get('tilt_limits_deg', self.tilt_limits)
 
     def _has_reached_target(self):
         if not hasattr(self, 'target_pan'): return True
@@ -260,10 +431,18 @@ class AutoPilot:
         # Calculate repulsion target
         tx, ty = safety.get_repulsion_target(cat_bbox, current_roi, safe_dist=200)
         
-        # Since we don't have inverse kinematics, we use a large random jump
-        # But we try to bias it if possible. For now, large random jump is safest fallback.
         print("[AutoPilot] Evading...")
         
+        # Aim at the repulsion target through the inverse calibration LUT if we have one
+        inv = self.calibration.inverse(tx, ty)
+        if inv:
+            self.servos.set_pan(inv[0])
+            self.servos.set_tilt(inv[1])
+            if hasattr(self, 'target_pan'): del self.target_pan
+            return
+        
+        # Without inverse kinematics, a large random jump is the safest fallback.
+        
         # Force a large random move immediately
         retarget = self.config.get('retarget', {})
         j_pan = retarget.get('pan_jitter_deg', 20) * 2 # Double jitter for evade
@@ -3,74 +3,187 @@ import time
 import os
 import numpy as np
 
+from . import geometry
+from .journal import Journal, SampleStore, atomic_write_json
+from .calibration_models import create_model, AffineModel, CalibrationLUT
+from .calibration_online import OnlineCorrector
+
 CALIBRATION_FILE = 'config/laser_calibration.json'
 
 class CalibrationLogger:
-    def __init__(self, filepath=CALIBRATION_FILE):
+    def __init__(self, filepath=CALIBRATION_FILE, model='linear', pan_range=(0, 180), tilt_range=(0, 180),
+                 frame_size=(640, 480), lut_step_deg=1.0, inverse_step_px=8, online=None, compact_every=1000,
+                 inverse_margin_px=20):
         self.filepath = filepath
+        # Snapshot (filepath) + append-only journal of changes since the last snapshot
+        self.journal = Journal(os.path.splitext(filepath)[0] + '.journal.jsonl')
+        self.compact_every = compact_every
         # 2D Regression Params: x = c1*P + c2*T + c3, y = c4*P + c5*T + c6
         self.params = {
             "c1": 0.0, "c2": 0.0, "c3": 0.0,
             "c4": 0.0, "c5": 0.0, "c6": 0.0
         }
-        self.samples = [] # Verified samples list
+        self.store = SampleStore() # Verified samples (column arrays)
         self.calibrated = False
+
+        # Selected model (linear, homography, poly2, poly3, tps) baked into LUTs
+        create_model(model) # Validate name early
+        self.model_name = model
+        self.model = None
+        self.inverse_model = None
+        self.rmse_px = None
+        self.lut = None
+        self.inverse_lut = None
+        self.pan_range = pan_range
+        self.tilt_range = tilt_range
+        self.frame_size = frame_size
+        self.lut_step = lut_step_deg
+        self.inverse_step = inverse_step_px
+        # inverse() only inside the sampled region (+ margin): the fit is extrapolation outside it
+        self.inverse_margin = inverse_margin_px
+        self.pixel_hull = None
+
+        # Online drift correction (RLS) layered on top of the fitted model
+        self.online = OnlineCorrector(online)
+        self.online_save_every = (online or {}).get('save_every', 50)
+
+        self._sync_matrix()
         self.load()
 
+    def _sync_matrix(self):
+        """Cache params as a 2x3 matrix (batched) and plain float tuples (scalar predict)."""
+        p = self.params
+        self.matrix = np.array([
+            [p['c1'], p['c2'], p['c3']],
+            [p['c4'], p['c5'], p['c6']]
+        ], dtype=float)
+        self.coefs = tuple(tuple(float(v) for v in row) for row in self.matrix)
+
+    def _build_luts(self):
+        """Bake the model (pan/tilt -> px) and inverse model (px -> pan/tilt) into dense grids."""
+        self.lut = None
+        self.inverse_lut = None
+        self.pixel_hull = None
+        if len(self.store) >= 3:
+            self.pixel_hull = geometry.convex_hull(np.column_stack((self.store.column('x'), self.store.column('y'))))
+        if self.model is not None and self.model.name != 'linear':
+            self.lut = CalibrationLUT(self.model, self.pan_range, self.tilt_range, self.lut_step)
+        if self.inverse_model is not None:
+            fw, fh = self.frame_size
+            self.inverse_lut = CalibrationLUT(self.inverse_model, (0, fw), (0, fh), self.inverse_step)
+
+    @property
+    def samples(self):
+        """Samples as a list of dicts (copy, for export / compatibility)."""
+        return self.store.to_list()
+
     def load(self):
-        if os.path.exists(self.filepath):
+        if os.path.exists(self.filepath) or os.path.exists(self.journal.path):
             try:
-                with open(self.filepath, 'r') as f:
-                    data = json.load(f)
-                    
-                    # Migration: Samples
-                    if 'samples' in data:
-                        self.samples = data['samples']
-                    else:
-                        sx = data.get('samples_x', [])
-                        sy = data.get('samples_y', [])
-                        self.samples = sx + sy
-                    
-                    # Params Validation & Migration
-                    loaded_params = data.get('params', {})
-                    if 'c1' in loaded_params:
-                        self.params = loaded_params
-                        self.calibrated = data.get('calibrated', False)
-                    else:
-                        # Legacy Params detected, ignore them and re-fit
-                        print("[Calibration] Legacy params detected. Attempting migration via re-fit...")
-                        self.calibrated = False 
-                        if len(self.samples) >= 3:
-                            res = self.fit() # This computes params, sets calibrated=True, and saves
-                            if res['success']:
-                                print("[Calibration] Migration Success: 2D Params generated.")
-                            else:
-                                print(f"[Calibration] Migration Fit Failed: {res.get('msg')}")
+                data = {}
+                if os.path.exists(self.filepath):
+                    with open(self.filepath, 'r') as f:
+                        data = json.load(f)
+
+                # Migration: Samples
+                if 'samples' in data:
+                    self.store.extend(data['samples'])
+                else:
+                    sx = data.get('samples_x', [])
+                    sy = data.get('samples_y', [])
+                    self.store.extend(sx + sy)
+
+                # Replay changes since the snapshot
+                online_state = data.get('online')
+                for entry in self.journal.replay(data.get('journal_gen', 0)):
+                    if entry.get('op') == 'add':
+                        self.store.extend([entry])
+                    elif entry.get('op') == 'online':
+                        online_state = entry['state']
+
+                # Params Validation & Migration
+                loaded_params = data.get('params', {})
+                if 'c1' in loaded_params:
+                    self.params = loaded_params
+                    self._sync_matrix()
+                    self.calibrated = data.get('calibrated', False)
+
+                    if self.calibrated and data.get('model', 'linear') == self.model_name and \
+                            (self.model_name == 'linear' or 'model_params' in data):
+                        self._restore_models(data)
+                        if online_state:
+                            self.online.load_dict(online_state)
+                    elif self.calibrated:
+                        # Model changed in config (or file predates models): re-fit from samples
+                        print(f"[Calibration] Model '{self.model_name}' not fitted yet. Re-fitting...")
+                        self.calibrated = False
+                        res = self.fit()
+                        if not res['success']:
+                            print(f"[Calibration] Re-fit Failed: {res.get('msg')}")
+                elif data:
+                    # Legacy Params detected, ignore them and re-fit
+                    print("[Calibration] Legacy params detected. Attempting migration via re-fit...")
+                    self.calibrated = False
+                    if len(self.store) >= 3:
+                        res = self.fit() # This computes params, sets calibrated=True, and saves
+                        if res['success']:
+                            print("[Calibration] Migration Success: 2D Params generated.")
                         else:
-                             print("[Calibration] Not enough samples for migration.")
+                            print(f"[Calibration] Migration Fit Failed: {res.get('msg')}")
+                    else:
+                         print("[Calibration] Not enough samples for migration.")
 
-                    print(f"Calibration loaded: {self.calibrated} ({len(self.samples)} samples)")
+                print(f"Calibration loaded: {self.calibrated} ({len(self.store)} samples, model={self.model_name})")
             except Exception as e:
                 print(f"Error loading calibration: {e}")
 
+    def _restore_models(self, data):
+        self.rmse_px = data.get('rmse_px')
+        # The plane may stand in for the configured model (too few samples at fit time)
+        fitted = data.get('fitted_model', self.model_name)
+        if fitted == 'linear':
+            self.model = AffineModel(self.matrix)
+        else:
+            self.model = create_model(fitted)
+            self.model.load_dict(data['model_params'])
+
+        self.inverse_model = None
+        if data.get('inverse_params'):
+            self.inverse_model = create_model(fitted)
+            self.inverse_model.load_dict(data['inverse_params'])
+        self._build_luts()
+
     def save(self):
+        """Compaction: write a full snapshot atomically (temp file + rename), then drop the journal.
+        The snapshot records the next journal generation: if the journal survives (power loss before
+        truncate()), load() knows its entries are already in the snapshot."""
+        generation = self.journal.generation + 1
         data = {
             "calibrated": self.calibrated,
             "params": self.params,
-            "samples": self.samples
+            "model": self.model_name,
+            "fitted_model": self.model.name if self.model else None,
+            "model_params": self.model.to_dict() if self.model else None,
+            "inverse_params": self.inverse_model.to_dict() if self.inverse_model else None,
+            "rmse_px": self.rmse_px,
+            "online": self.online.to_dict() if self.online.updates else None,
+            "samples": self.samples,
+            "journal_gen": generation
         }
         try:
-            with open(self.filepath, 'w') as f:
-                json.dump(data, f, indent=4)
+            atomic_write_json(self.filepath, data)
+            self.journal.truncate(generation)
             print("Calibration saved.")
         except Exception as e:
             print(f"Error saving calibration: {e}")
 
-    def add_sample(self, pan, tilt, x, y, sample_type="general"):
+    def add_sample(self, pan, tilt, x, y, sample_type="general", save=True):
         """
-        sample_type: 'x_calib', 'y_calib', or 'general'
+        sample_type: 'x_calib', 'y_calib', 'general' or 'auto' (sweep)
+        save: False keeps the sample in memory only (caller saves once at the end)
         """
         sample = {
+            "op": "add",
             "pan": pan,
             "tilt": tilt,
             "x": x,
@@ -78,51 +191,85 @@ class CalibrationLogger:
             "ts": time.time(),
             "type": sample_type
         }
-        self.samples.append(sample)
+        self.store.append(pan, tilt, x, y, sample['ts'], sample_type)
         print(f"Added Sample: P={pan:.1f}, T={tilt:.1f} -> X={x:.1f}, Y={y:.1f}")
-        self.save()
+        if save:
+            self._journal(sample)
+
+    def fit_samples(self, samples, sample_type="auto", replace=False):
+        """
+        Fit with `samples` [(pan, tilt, x, y)] added to (replace=False) or instead of the current ones.
+        The new sample set is committed (and saved) only if the fit succeeds; otherwise the previous
+        samples and calibration stay exactly as they were.
+        """
+        previous = self.store
+        store = SampleStore()
+        if not replace:
+            store.extend(previous.to_list())
+        ts = time.time()
+        for pan, tilt, x, y in samples:
+            store.append(pan, tilt, x, y, ts, sample_type)
+        self.store = store
+        result = self.fit()
+        if not result.get('success'):
+            self.store = previous
+        return result
+
+    def _journal(self, entry):
+        """O(1) append; compacts into the snapshot once the journal grows past compact_every."""
+        try:
+            self.journal.append(entry)
+        except Exception as e:
+            print(f"Error writing calibration journal: {e}")
+            return
+        if self.journal.entries >= self.compact_every:
+            self.save()
 
     def fit(self):
-        """Compute 2D Multivariate Linear Regression"""
+        """Fit the 2D plane (params c1..c6) plus the selected model, then bake the LUTs"""
         # Requirements: min 3 points for plane, but user recommends 8-12
-        if len(self.samples) < 3:
+        if len(self.store) < 3:
             print("[Calibration] Not enough samples (min 3 required).")
             return {"success": False, "msg": "Not enough samples"}
-            
+
         try:
             # Prepare Data Matrices
-            P = np.array([s['pan'] for s in self.samples])
-            T = np.array([s['tilt'] for s in self.samples])
-            X = np.array([s['x'] for s in self.samples])
-            Y = np.array([s['y'] for s in self.samples])
-            
-            # Form Design Matrix A: [P, T, 1]
-            A = np.column_stack((P, T, np.ones(len(P))))
-            
-            # Solve for X coefficients: [c1, c2, c3]
-            # lstsq returns: x, residuals, rank, s
-            sol_x, resid_x, rank_x, s_x = np.linalg.lstsq(A, X, rcond=None)
-            
-            # Solve for Y coefficients: [c4, c5, c6]
-            sol_y, resid_y, rank_y, s_y = np.linalg.lstsq(A, Y, rcond=None)
-            
-            # Check Rank (must be 3 for P, T, 1 to be independent)
-            if rank_x < 3:
-                print(f"[Calibration] Rank Deficient ({rank_x}). Points may be collinear.")
-                # We can fallback to simple mean or abort. 
-                # User spec: "Return 'not calibrated' if failed, preserve old coeffs"
-                return {"success": False, "msg": "Points Collinear (Rank Deficient)"}
-
-            # Update Params
-            self.params = {
-                "c1": float(sol_x[0]), "c2": float(sol_x[1]), "c3": float(sol_x[2]),
-                "c4": float(sol_y[0]), "c5": float(sol_y[1]), "c6": float(sol_y[2])
-            }
-            self.calibrated = True
-            self.save()
-            print(f"[Calibration] Success! Params: {self.params}")
-            return {"success": True, "params": self.params}
+            P = self.store.column('pan')
+            T = self.store.column('tilt')
+            X = self.store.column('x')
+            Y = self.store.column('y')
+
+            # Plane: [c1, c2, c3] / [c4, c5, c6] (always kept, also used by online correction)
+            plane = AffineModel()
+            rmse = plane.fit(P, T, X, Y)
+            model = plane
+
+            # Selected nonlinear model (the plane stands in until there are enough samples for it)
+            if self.model_name != 'linear':
+                candidate = create_model(self.model_name)
+                if len(self.store) < candidate.min_samples:
+                    print(f"[Calibration] {len(self.store)} samples, {self.model_name} needs {candidate.min_samples}: "
+                          f"using the plane fit for now")
+                else:
+                    try:
+                        rmse = candidate.fit(P, T, X, Y)
+                        model = candidate
+                    except (ValueError, np.linalg.LinAlgError) as e:
+                        # e.g. samples along one line: not enough spread for the model yet
+                        print(f"[Calibration] {self.model_name} fit failed ({e}): using the plane fit for now")
 
+            # Inverse (px -> pan/tilt) with the same model family. Optional.
+            inverse = create_model(model.name)
+            try:
+                inverse.fit(X, Y, P, T)
+            except (ValueError, np.linalg.LinAlgError) as e:
+                print(f"[Calibration] Inverse fit skipped: {e}")
+                inverse = None
+
+        except ValueError as e:
+            # User spec: "Return 'not calibrated' if failed, preserve old coeffs"
+            print(f"[Calibration] {e}")
+            return {"success": False, "msg": str(e)}
         except np.linalg.LinAlgError as e:
             print(f"[Calibration] LinAlgError: {e}")
             return {"success": False, "msg": str(e)}
@@ -130,22 +277,106 @@ class CalibrationLogger:
             print(f"[Calibration] Error: {e}")
             return {"success": False, "msg": str(e)}
 
+        # Update Params
+        m = plane.matrix
+        self.params = {
+            "c1": float(m[0, 0]), "c2": float(m[0, 1]), "c3": float(m[0, 2]),
+            "c4": float(m[1, 0]), "c5": float(m[1, 1]), "c6": float(m[1, 2])
+        }
+        self._sync_matrix()
+        self.model = model
+        self.inverse_model = inverse
+        self.rmse_px = rmse
+        self._build_luts()
+        self.online.reset() # Fresh fit absorbs any drift seen so far
+        self.calibrated = True
+        self.save()
+        print(f"[Calibration] Success! Model={model.name} RMSE={rmse:.2f}px Params: {self.params}")
+        return {"success": True, "params": self.params, "model": model.name, "rmse_px": rmse}
+
+    def _predict_base(self, pan, tilt):
+        if self.lut is not None:
+            # Nonlinear: constant-cost bilinear LUT lookup
+            return self.lut.lookup(pan, tilt)
+
+        (c1, c2, c3), (c4, c5, c6) = self.coefs
+        # x = c1*P + c2*T + c3
+        x = c1 * pan + c2 * tilt + c3
+        # y = c4*P + c5*T + c6
+        y = c4 * pan + c5 * tilt + c6
+
+        return (x, y)
+
     def predict(self, pan, tilt):
         if not self.calibrated:
             return None
-        
-        # x = c1*P + c2*T + c3
-        x = self.params['c1'] * pan + self.params['c2'] * tilt + self.params['c3']
-        # y = c4*P + c5*T + c6
-        y = self.params['c4'] * pan + self.params['c5'] * tilt + self.params['c6']
-        
+
+        x, y = self._predict_base(pan, tilt)
+        if self.online.updates:
+            dx, dy = self.online.correction(pan, tilt)
+            x += dx
+            y += dy
         return (x, y)
 
+    def predict_many(self, pan, tilt):
+        """Batched predict: (N,) pan/tilt arrays -> (N, 2) pixels, or None if not calibrated."""
+        if not self.calibrated:
+            return None
+        if self.lut is not None:
+            pts = self.lut.lookup_many(pan, tilt)
+        else:
+            pts = geometry.project(self.matrix, pan, tilt)
+        if self.online.updates:
+            pts = pts + geometry.project(self.online.matrix, pan, tilt)
+        return pts
+
+    def inverse(self, x, y):
+        """Pixel -> (pan, tilt) through the inverse LUT, or None if unavailable or outside the sampled region."""
+        if not self.calibrated or self.inverse_lut is None:
+            return None
+        if self.pixel_hull is None or not geometry.in_hull(self.pixel_hull, x, y, self.inverse_margin):
+            return None
+        pt = self.inverse_lut.lookup(x, y)
+        if self.online.updates:
+            # One fixed-point step: remove the drift expected at the first guess, look up again
+            dx, dy = self.online.correction(pt[0], pt[1])
+            pt = self.inverse_lut.lookup(x - dx, y - dy)
+        return pt
+
+    def observe(self, pan, tilt, x, y):
+        """
+        Feed one live laser-dot observation into the online corrector (O(1), no refit).
+        Returns the residual (px) before the update, or None if not calibrated / rejected as outlier.
+        """
+        if not self.calibrated:
+            return None
+        bx, by = self._predict_base(pan, tilt)
+        was_drifting = self.online.drift
+        residual = self.online.update(pan, tilt, x - bx, y - by)
+        if residual is not None and self.online.updates % self.online_save_every == 0:
+            self._journal({"op": "online", "state": self.online.to_dict()})
+        if self.online.drift and not was_drifting:
+            print(f"[Calibration] Drift detected: residual {self.online.residual_px:.1f}px (consider a refit)")
+        return residual
+
+    def online_status(self):
+        status = self.online.status()
+        status["rmse_px"] = self.rmse_px
+        return status
+
     def clear(self):
-        self.samples = []
+        self.store.clear()
         self.calibrated = False
         self.params = {
             "c1": 0.0, "c2": 0.0, "c3": 0.0,
             "c4": 0.0, "c5": 0.0, "c6": 0.0
         }
+        self._sync_matrix()
+        self.model = None
+        self.inverse_model = None
+        self.rmse_px = None
+        self.lut = None
+        self.inverse_lut = None
+        self.pixel_hull = None
+        self.online.reset()
         self.save()
@@ -0,0 +1,275 @@
+import math
+
+import numpy as np
+
+from . import geometry
+
+"""
+Calibration models: (pan, tilt) -> (x, y) pixels.
+- linear      : x = c1*P + c2*T + c3 (plane, original model, evaluated directly)
+- homography  : projective map, exact for a flat floor seen by a pinhole camera
+- poly2/poly3 : 2nd / 3rd order bivariate polynomial
+- tps         : thin-plate spline (smooth, passes near every sample)
+Nonlinear models are only evaluated at fit/load time; runtime queries go through CalibrationLUT.
+"""
+
+class _Norm:
+    """Center / scale 2D inputs so polynomial and TPS systems stay well conditioned."""
+    def __init__(self, u=None, v=None, mean=None, scale=None):
+        if mean is not None:
+            self.mean = np.asarray(mean, dtype=float)
+            self.scale = np.asarray(scale, dtype=float)
+        else:
+            self.mean = np.array([u.mean(), v.mean()])
+            self.scale = np.array([max(u.std(), 1e-6), max(v.std(), 1e-6)])
+
+    def __call__(self, u, v):
+        return (np.asarray(u, dtype=float) - self.mean[0]) / self.scale[0], \
+               (np.asarray(v, dtype=float) - self.mean[1]) / self.scale[1]
+
+    def to_dict(self):
+        return {"mean": self.mean.tolist(), "scale": self.scale.tolist()}
+
+class CalibrationModel:
+    name = None
+    min_samples = 3
+
+    def fit(self, u, v, x, y):
+        """Fit from sample arrays. Returns RMSE in pixels. Raises ValueError if ill-posed."""
+        raise NotImplementedError
+
+    def evaluate(self, u, v):
+        """(N,) pan / tilt -> (N, 2) pixels"""
+        raise NotImplementedError
+
+    def to_dict(self):
+        raise NotImplementedError
+
+    def load_dict(self, data):
+        raise NotImplementedError
+
+    def _rmse(self, u, v, x, y):
+        pred = self.evaluate(u, v)
+        return float(np.sqrt(np.mean((pred[:, 0] - x) ** 2 + (pred[:, 1] - y) ** 2)))
+
+class AffineModel(CalibrationModel):
+    """Plane fit: [x, y]^T = M [u, v, 1]^T with M the 2x3 calibration matrix."""
+    name = 'linear'
+    min_samples = 3
+
+    def __init__(self, matrix=None):
+        self.matrix = None if matrix is None else np.asarray(matrix, dtype=float)
+
+    def fit(self, u, v, x, y):
+        A = np.column_stack((u, v, np.ones(len(u))))
+        sol, _, rank, _ = np.linalg.lstsq(A, np.column_stack((x, y)), rcond=None)
+        # Rank must be 3 for P, T, 1 to be independent
+        if rank < 3:
+            raise ValueError(f"Points Collinear (Rank Deficient {rank})")
+        self.matrix = sol.T
+        return self._rmse(u, v, x, y)
+
+    def evaluate(self, u, v):
+        return geometry.project(self.matrix, np.atleast_1d(u), np.atleast_1d(v))
+
+    def to_dict(self):
+        return {"matrix": self.matrix.tolist()}
+
+    def load_dict(self, data):
+        self.matrix = np.asarray(data['matrix'], dtype=float)
+
+class PolynomialModel(CalibrationModel):
+    """Least squares on bivariate monomials u^i v^j, i + j <= order."""
+    def __init__(self, order):
+        self.order = order
+        self.name = f'poly{order}'
+        self.terms = [(i, d - i) for d in range(order + 1) for i in range(d, -1, -1)]
+        self.min_samples = len(self.terms)
+        self.norm = None
+        self.coef = None # (n_terms, 2)
+
+    def _design(self, u, v):
+        nu, nv = self.norm(u, v)
+        return np.column_stack([nu ** i * nv ** j for i, j in self.terms])
+
+    def fit(self, u, v, x, y):
+        self.norm = _Norm(u, v)
+        A = self._design(u, v)
+        coef, _, rank, _ = np.linalg.lstsq(A, np.column_stack((x, y)), rcond=None)
+        if rank < len(self.terms):
+            raise ValueError(f"Rank Deficient ({rank}/{len(self.terms)}). Points may be collinear.")
+        self.coef = coef
+        return self._rmse(u, v, x, y)
+
+    def evaluate(self, u, v):
+        return self._design(np.atleast_1d(u), np.atleast_1d(v)) @ self.coef
+
+    def to_dict(self):
+        return {"norm": self.norm.to_dict(), "coef": self.coef.tolist()}
+
+    def load_dict(self, data):
+        self.norm = _Norm(**data['norm'])
+        self.coef = np.asarray(data['coef'], dtype=float)
+
+class HomographyModel(CalibrationModel):
+    """Normalized DLT: [x, y, w]^T = H [u, v, 1]^T."""
+    name = 'homography'
+    min_samples = 4
+
+    def __init__(self):
+        self.H = None
+
+    @staticmethod
+    def _similarity(a, b):
+        # Hartley normalization: centroid to origin, mean distance sqrt(2)
+        ca, cb = a.mean(), b.mean()
+        d = np.mean(np.sqrt((a - ca) ** 2 + (b - cb) ** 2))
+        s = math.sqrt(2) / d if d > 1e-9 else 1.0
+        return np.array([[s, 0, -s * ca], [0, s, -s * cb], [0, 0, 1]])
+
+    def fit(self, u, v, x, y):
+        Tin = self._similarity(u, v)
+        Tout = self._similarity(x, y)
+        pu, pv = (Tin @ np.vstack((u, v, np.ones_like(u))))[:2]
+        px, py = (Tout @ np.vstack((x, y, np.ones_like(x))))[:2]
+
+        n = len(u)
+        A = np.zeros((2 * n, 9))
+        A[0::2, 0:3] = np.column_stack((pu, pv, np.ones(n)))
+        A[0::2, 6:9] = -px[:, None] * A[0::2, 0:3]
+        A[1::2, 3:6] = A[0::2, 0:3]
+        A[1::2, 6:9] = -py[:, None] * A[0::2, 0:3]
+
+        _, sv, vt = np.linalg.svd(A)
+        if np.count_nonzero(sv > sv[0] * 1e-10) < 8:
+            raise ValueError("Rank Deficient. Points may be collinear.")
+        Hn = vt[-1].reshape(3, 3)
+        H = np.linalg.inv(Tout) @ Hn @ Tin
+        self.H = H / H[2, 2]
+        return self._rmse(u, v, x, y)
+
+    def evaluate(self, u, v):
+        u = np.atleast_1d(np.asarray(u, dtype=float))
+        v = np.atleast_1d(np.asarray(v, dtype=float))
+        w = self.H[2, 0] * u + self.H[2, 1] * v + self.H[2, 2]
+        x = (self.H[0, 0] * u + self.H[0, 1] * v + self.H[0, 2]) / w
+        y = (self.H[1, 0] * u + self.H[1, 1] * v + self.H[1, 2]) / w
+        return np.column_stack((x, y))
+
+    def to_dict(self):
+        return {"H": self.H.tolist()}
+
+    def load_dict(self, data):
+        self.H = np.asarray(data['H'], dtype=float)
+
+class ThinPlateSplineModel(CalibrationModel):
+    """Regularized thin-plate spline, U(r) = r^2 log r, plus an affine part."""
+    name = 'tps'
+    min_samples = 3
+
+    def __init__(self, smoothing=1e-3):
+        self.smoothing = smoothing
+        self.norm = None
+        self.centers = None # (N, 2) normalized
+        self.weights = None # (N + 3, 2)
+
+    @staticmethod
+    def _kernel(a, b):
+        r2 = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = 0.5 * r2 * np.log(r2)
+        k[r2 == 0] = 0.0
+        return k
+
+    def fit(self, u, v, x, y):
+        self.norm = _Norm(u, v)
+        c = np.column_stack(self.norm(u, v))
+        n = len(c)
+        P = np.column_stack((np.ones(n), c))
+        if np.linalg.matrix_rank(P) < 3:
+            raise ValueError("Rank Deficient. Points may be collinear.")
+
+        L = np.zeros((n + 3, n + 3))
+        L[:n, :n] = self._kernel(c, c) + self.smoothing * np.eye(n)
+        L[:n, n:] = P
+        L[n:, :n] = P.T
+        rhs = np.zeros((n + 3, 2))
+        rhs[:n, 0] = x
+        rhs[:n, 1] = y
+
+        self.weights = np.linalg.lstsq(L, rhs, rcond=None)[0]
+        self.centers = c
+        return self._rmse(u, v, x, y)
+
+    def evaluate(self, u, v):
+        q = np.column_stack(self.norm(np.atleast_1d(u), np.atleast_1d(v)))
+        n = len(self.centers)
+        P = np.column_stack((np.ones(len(q)), q))
+        return self._kernel(q, self.centers) @ self.weights[:n] + P @ self.weights[n:]
+
+    def to_dict(self):
+        return {
+            "smoothing": self.smoothing,
+            "norm": self.norm.to_dict(),
+            "centers": self.centers.tolist(),
+            "weights": self.weights.tolist()
+        }
+
+    def load_dict(self, data):
+        self.smoothing = data.get('smoothing', self.smoothing)
+        self.norm = _Norm(**data['norm'])
+        self.centers = np.asarray(data['centers'], dtype=float)
+        self.weights = np.asarray(data['weights'], dtype=float)
+
+MODELS = ('linear', 'homography', 'poly2', 'poly3', 'tps')
+
+def create_model(name):
+    if name == 'linear': return AffineModel()
+    if name == 'poly2': return PolynomialModel(2)
+    if name == 'poly3': return PolynomialModel(3)
+    if name == 'homography': return HomographyModel()
+    if name == 'tps': return ThinPlateSplineModel()
+    raise ValueError(f"Unknown calibration model '{name}' (choose from {', '.join(MODELS)})")
+
+class CalibrationLUT:
+    """
+    Dense lookup table baked from a model at fit time.
+    Query cost is a constant bilinear interpolation regardless of model complexity.
+    """
+    CHUNK = 4096 # Bound temporaries (TPS kernel is chunk x n_samples)
+
+    def __init__(self, model, u_range, v_range, step):
+        self.origin = (float(u_range[0]), float(v_range[0]))
+        self.step = (float(step), float(step))
+        us = np.arange(u_range[0], u_range[1] + step * 0.5, step, dtype=float)
+        vs = np.arange(v_range[0], v_range[1] + step * 0.5, step, dtype=float)
+        gu, gv = np.meshgrid(us, vs, indexing='ij')
+        gu = gu.ravel()
+        gv = gv.ravel()
+
+        flat = np.empty((len(gu), 2))
+        for i in range(0, len(gu), self.CHUNK):
+            flat[i:i + self.CHUNK] = model.evaluate(gu[i:i + self.CHUNK], gv[i:i + self.CHUNK])
+        self.table = flat.reshape(len(us), len(vs), 2)
+
+    def lookup(self, u, v):
+        """Scalar query in plain Python (no temporary arrays), same math as geometry.bilinear."""
+        t = self.table
+        nu, nv = t.shape[0], t.shape[1]
+        fu = min(max((u - self.origin[0]) / self.step[0], 0.0), nu - 1)
+        fv = min(max((v - self.origin[1]) / self.step[1], 0.0), nv - 1)
+        i = min(int(fu), nu - 2)
+        j = min(int(fv), nv - 2)
+        du = fu - i
+        dv = fv - j
+        item = t.item
+        w00 = (1 - du) * (1 - dv)
+        w10 = du * (1 - dv)
+        w01 = (1 - du) * dv
+        w11 = du * dv
+        x = item(i, j, 0) * w00 + item(i + 1, j, 0) * w10 + item(i, j + 1, 0) * w01 + item(i + 1, j + 1, 0) * w11
+        y = item(i, j, 1) * w00 + item(i + 1, j, 1) * w10 + item(i, j + 1, 1) * w01 + item(i + 1, j + 1, 1) * w11
+        return (x, y)
+
+    def lookup_many(self, u, v):
+        return geometry.bilinear(self.table, self.origin, self.step, u, v)
@@ -0,0 +1,99 @@
+import numpy as np
+
+"""
+Online calibration drift correction.
+Recursive least squares with a forgetting factor on an affine correction layer:
+    observed(x, y) - model(pan, tilt) = C @ [pan, tilt, 1]
+x and y share the same regressor, so a single 3x3 covariance and 3x2 weight matrix is enough:
+every update is a handful of 3-element operations (O(1), independent of the sample count).
+"""
+class OnlineCorrector:
+    def __init__(self, config=None):
+        config = config or {}
+        self.lam = config.get('forgetting', 0.98)
+        self.delta = config.get('init_covariance', 100.0)
+        self.max_trace = config.get('max_covariance_trace', 1e4)
+        self.gate_px = config.get('gate_px', 150)
+        self.threshold_px = config.get('residual_threshold_px', 15)
+        self.alpha = config.get('residual_alpha', 0.2)
+        self.reset()
+
+    def reset(self):
+        self.P = np.eye(3) * self.delta
+        self.W = np.zeros((3, 2)) # Normalized regressor weights
+        self.matrix = np.zeros((2, 3)) # Same correction in raw pan/tilt units (for geometry.project)
+        self.coefs = ((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+        self.updates = 0
+        self.rejected = 0
+        self.residual_px = 0.0
+        self.last_residual_px = 0.0
+        self.drift = False
+
+    @staticmethod
+    def _phi(pan, tilt):
+        # Center/scale angles so the covariance stays well conditioned
+        return np.array([(pan - 90.0) / 90.0, (tilt - 90.0) / 90.0, 1.0])
+
+    def correction(self, pan, tilt):
+        (a1, a2, a3), (a4, a5, a6) = self.coefs
+        return (a1 * pan + a2 * tilt + a3, a4 * pan + a5 * tilt + a6)
+
+    def update(self, pan, tilt, err_x, err_y):
+        """
+        err: observed - base model prediction (pixels).
+        Returns the a-priori residual (pixels) after the current correction, or None if gated out.
+        """
+        phi = self._phi(pan, tilt)
+        e = np.array([err_x, err_y]) - phi @ self.W
+        residual = float(np.hypot(e[0], e[1]))
+        self.last_residual_px = residual
+
+        # Residual tracking (drift flag) sees every observation, including gated ones
+        self.residual_px += self.alpha * (residual - self.residual_px)
+        self.drift = self.residual_px > self.threshold_px
+        if residual > self.gate_px:
+            self.rejected += 1
+            return None
+
+        Pphi = self.P @ phi
+        k = Pphi / (self.lam + phi @ Pphi)
+        self.W += np.outer(k, e)
+        self.P = (self.P - np.outer(k, Pphi)) / self.lam
+
+        # Anti-windup: with poor excitation 1/lambda inflates P without bound
+        tr = np.trace(self.P)
+        if tr > self.max_trace:
+            self.P *= self.max_trace / tr
+
+        self.updates += 1
+        self._sync()
+        return residual
+
+    def _sync(self):
+        # x = w0*(P-90)/90 + w1*(T-90)/90 + w2  ->  a1*P + a2*T + a3
+        w = self.W
+        self.matrix = np.array([
+            [w[0, 0] / 90.0, w[1, 0] / 90.0, w[2, 0] - w[0, 0] - w[1, 0]],
+            [w[0, 1] / 90.0, w[1, 1] / 90.0, w[2, 1] - w[0, 1] - w[1, 1]]
+        ])
+        self.coefs = tuple(tuple(float(v) for v in row) for row in self.matrix)
+
+    def to_dict(self):
+        return {"W": self.W.tolist(), "P": self.P.tolist(), "updates": self.updates}
+
+    def load_dict(self, data):
+        self.W = np.asarray(data['W'], dtype=float)
+        self.P = np.asarray(data['P'], dtype=float)
+        self.updates = data.get('updates', 0)
+        self._sync()
+
+    def status(self):
+        return {
+            "updates": self.updates,
+            "rejected": self.rejected,
+            "residual_px": round(self.residual_px, 2),
+            "last_residual_px": round(self.last_residual_px, 2),
+            "drift": self.drift,
+            "center_offset_px": [round(self.coefs[0][0] * 90 + self.coefs[0][1] * 90 + self.coefs[0][2], 2),
+                          round(self.coefs[1][0] * 90 + self.coefs[1][1] * 90 + self.coefs[1][2], 2)]
+        }
@@ -0,0 +1,157 @@
+import time
+import threading
+
+import numpy as np
+
+"""
+Automatic calibration sweep.
+Drives the servos over a grid inside the configured limits, detects the laser dot on a fresh
+frame at every stop and collects the samples on the side. They reach CalibrationLogger only
+through a successful fit, so a stopped / failed sweep leaves the current calibration untouched.
+The laser is on for the whole sweep: every dot is checked against the danger zones of the latest
+detections (laser off, point skipped), and the sweep aborts if the detector becomes unhealthy.
+"""
+class CalibrationSweep:
+    def __init__(self, config_data, servos, laser, calibration, dot_detector, frame_source, safety=None):
+        self.config = config_data.get('calibration', {}).get('sweep', {})
+        self.servos = servos
+        self.laser = laser
+        self.calibration = calibration
+        self.dot = dot_detector
+        self.camera = frame_source # needs get_frame() and frame_count
+        self.safety = safety # AutoPilot: danger_at() and the current detector
+
+        grid = self.config.get('grid', [15, 12])
+        self.grid_pan, self.grid_tilt = int(grid[0]), int(grid[1])
+        self.settle_ms = self.config.get('settle_ms', 150)
+        self.fresh_frames = self.config.get('fresh_frames', 2)
+        self.frame_timeout = self.config.get('frame_timeout_s', 1.0)
+        self.replace = self.config.get('clear_existing', False) # Replace (not extend) the samples on success
+
+        self.running = False
+        self.thread = None
+        self.state = 'IDLE' # IDLE, RUNNING, DONE, FAILED, STOPPED
+        self.total = 0
+        self.visited = 0
+        self.found = 0
+        self.skipped = 0 # Dots that landed in a danger zone
+        self.started_at = 0
+        self.elapsed = 0.0
+        self.result = None
+
+    def start(self):
+        if self.running:
+            return {"success": False, "msg": "Sweep already running"}
+        if not self.camera:
+            return {"success": False, "msg": "Camera not available"}
+        if self.servos.detached:
+            return {"success": False, "msg": "Servos detached (idle power mode)"}
+        if self.safety and not self.safety.detector.healthy():
+            return {"success": False, "msg": "Detector not ready: no safety check for the laser"}
+
+        self.running = True
+        self.state = 'RUNNING'
+        self.visited = 0
+        self.found = 0
+        self.skipped = 0
+        self.result = None
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return {"success": True}
+
+    def stop(self):
+        self.running = False
+
+    def status(self):
+        if self.state == 'RUNNING':
+            self.elapsed = time.time() - self.started_at
+        return {
+            "state": self.state,
+            "total": self.total,
+            "visited": self.visited,
+            "found": self.found,
+            "skipped": self.skipped,
+            "elapsed_s": round(self.elapsed, 1),
+            "result": self.result
+        }
+
+    def _grid(self):
+        """Serpentine order so consecutive points are neighbours (short, fast servo moves)."""
+        pans = np.linspace(self.servos.pan_limits[0], self.servos.pan_limits[1], self.grid_pan)
+        tilts = np.linspace(self.servos.tilt_limits[0], self.servos.tilt_limits[1], self.grid_tilt)
+        points = []
+        for row, t in enumerate(tilts):
+            for p in (pans if row % 2 == 0 else pans[::-1]):
+                points.append((float(p), float(t)))
+        return points
+
+    def _fresh_frame(self):
+        """Wait until the camera has captured frames taken after the servo settled."""
+        target = self.camera.frame_count + self.fresh_frames
+        deadline = time.time() + self.frame_timeout
+        while self.camera.frame_count < target:
+            if time.time() > deadline: return None
+            time.sleep(0.005)
+        return self.camera.get_frame()
+
+    def _run(self):
+        points = self._grid()
+        self.total = len(points)
+        print(f"[Sweep] Starting auto calibration: {self.total} points")
+        samples = []
+        try:
+            # Background reference with the laser OFF
+            self.laser.off()
+            self.servos.set_pan(points[0][0])
+            self.servos.set_tilt(points[0][1])
+            time.sleep(self.settle_ms / 1000.0)
+            bg = self._fresh_frame()
+            if bg: self.dot.set_background(bg)
+
+            for pan, tilt in points:
+                if not self.running: break
+                if self.servos.detached:
+                    # Servos would not move: every dot would land on the same pixel and poison the fit
+                    raise RuntimeError("Servos detached (idle power mode), sweep aborted")
+                if self.safety and not self.safety.detector.healthy():
+                    raise RuntimeError("Detector unhealthy, sweep aborted")
+
+                if not self.laser.state: self.laser.on()
+                pan = self.servos.set_pan(pan)
+                tilt = self.servos.set_tilt(tilt)
+                time.sleep(self.settle_ms / 1000.0)
+
+                frame = self._fresh_frame()
+                self.visited += 1
+                if not frame: continue
+
+                hit = self.dot.detect(frame)
+                danger = self.safety.danger_at(hit[0], hit[1]) if hit and self.safety else None
+                if danger:
+                    self.laser.off()
+                    self.skipped += 1
+                    print(f"[Sweep] Dot at ({hit[0]:.0f}, {hit[1]:.0f}) near {danger.get('label')}, point skipped")
+                    continue
+                if hit:
+                    samples.append((pan, tilt, hit[0], hit[1]))
+                    self.found += 1
+
+            self.laser.off()
+
+            if not self.running:
+                self.state = 'STOPPED'
+                return
+
+            self.result = self.calibration.fit_samples(samples, 'auto', replace=self.replace)
+            self.state = 'DONE' if self.result.get('success') else 'FAILED'
+        except Exception as e:
+            print(f"[Sweep] Error: {e}")
+            self.result = {"success": False, "msg": str(e)}
+            self.state = 'FAILED'
+        finally:
+            self.laser.off()
+            self.dot.clear_background()
+            self.running = False
+            self.elapsed = time.time() - self.started_at
+            print(f"[Sweep] {self.state}: {self.found}/{self.visited} dots ({self.skipped} skipped) in {self.elapsed:.1f}s")
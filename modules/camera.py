@@ -1,12 +1,18 @@
 import time
-import io
 import threading
 import logging
 
+from . import metrics
+from .tracing import TRACER
+from .frame_pool import FramePool, FrameReader, FrameWriter
+
 # Configure logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Camera")
 
+CAPTURE_INTERVAL = metrics.histogram('laser_capture_interval_seconds', 'Time between published camera frames', metrics.INTERVAL_BUCKETS)
+FRAMES = metrics.counter('laser_frames_captured_total', 'Camera frames published')
+
 try:
     import picamera
 except ImportError:
@@ -17,9 +23,19 @@ class CameraStreamer:
         self.config = config_data.get('camera', {})
         self.detector = detector
         self.fps = self.config.get('stream_fps_cap', 15)
+        self.fps_caps = {} # source (power / thermal) -> max fps
+        self.target_fps = self.fps
+        self.quality = self.config.get('jpeg_quality', 85)
+        self.quality_caps = {} # source (thermal) -> max JPEG quality
+        self.target_quality = self.quality
+        # Sensor AGC/AWB settle time: frames are streamed but not fed to the detector meanwhile
+        self.warmup_s = self.config.get('warmup_s', 1.0)
         self.running = False
         self.thread = None
-        self.current_frame = None
+        self.current_frame = None # FrameBuffer, one reference held by the streamer
+        self.current_ts = 0 # time.time() when current_frame was captured
+        pool_conf = self.config.get('frame_pool', {})
+        self.pool = FramePool(pool_conf.get('buffers', 8), pool_conf.get('buffer_kb', 128) * 1024)
         self.lock = threading.Lock()
         self.resolution = (640, 480) 
         
@@ -28,6 +44,8 @@ class CameraStreamer:
         self.start_time = 0
         self.backend = 'none' # picamera, mock
         self.error_msg = None
+        self.first_frame_at = None
+        self.last_frame_t = None
 
     def start(self):
         if self.running: return
@@ -43,9 +61,74 @@ class CameraStreamer:
             self.thread.join(timeout=2.0)
         logger.info("Camera Streamer Stopped")
 
+    def set_fps_cap(self, source, fps):
+        """Lower the capture rate on behalf of `source` (None removes the cap)."""
+        caps = dict(self.fps_caps)
+        if fps is None:
+            caps.pop(source, None)
+        else:
+            caps[source] = fps
+        self.fps_caps = caps
+        self.target_fps = min([self.fps] + list(caps.values()))
+
+    def set_quality_cap(self, source, quality):
+        """Lower the JPEG quality on behalf of `source` (None removes the cap). Applied on the next frame."""
+        caps = dict(self.quality_caps)
+        if quality is None:
+            caps.pop(source, None)
+        else:
+            caps[source] = quality
+        self.quality_caps = caps
+        self.target_quality = min([self.quality] + list(caps.values()))
+
+    def wait_first_frame(self, timeout=10.0):
+        """Block until the first frame is captured. Returns False on timeout / stop."""
+        deadline = time.time() + timeout
+        while self.running and self.frame_count == 0:
+            if time.time() > deadline: return False
+            time.sleep(0.02)
+        return self.frame_count > 0
+
+    def _publish(self, buf, t_capture):
+        """Make `buf` (a FrameBuffer, its reference passes to the streamer) the current frame.
+        Returns its seq (= frame_count, 1-based), the trace key downstream."""
+        ts = time.time()
+        with self.lock:
+            previous = self.current_frame
+            self.current_frame = buf
+            self.current_ts = ts
+            self.frame_count += 1
+            seq = self.frame_count
+        if previous is not None:
+            previous.release() # Back to the pool once no consumer holds it any more
+        t = metrics.now()
+        TRACER.complete('capture', 'camera', seq, t_capture, t)
+        if self.last_frame_t is not None:
+            CAPTURE_INTERVAL.observe(t - self.last_frame_t)
+        self.last_frame_t = t
+        FRAMES.inc()
+        if self.first_frame_at is None:
+            self.first_frame_at = ts
+        return seq
+
+    def acquire_frame(self):
+        """(FrameBuffer, seq, capture time) of the current frame, retained for the caller, who must
+        release() it. Zero-copy: read it through buf.view(). (None, 0, 0) before the first frame."""
+        with self.lock:
+            buf = self.current_frame
+            if buf is None: return None, 0, 0
+            return buf.retain(), self.frame_count, self.current_ts
+
     def get_frame(self):
+        """Current frame as bytes (one shared copy per frame)."""
         with self.lock:
-            return self.current_frame
+            return self.current_frame.bytes() if self.current_frame is not None else None
+
+    def get_frame_info(self):
+        """(frame bytes, seq, capture time) of the current frame, consistent with each other."""
+        with self.lock:
+            if self.current_frame is None: return None, self.frame_count, self.current_ts
+            return self.current_frame.bytes(), self.frame_count, self.current_ts
 
     def get_status(self):
         elapsed = time.time() - self.start_time
@@ -53,9 +136,13 @@ class CameraStreamer:
         return {
             "backend": self.backend,
             "fps": round(fps, 1),
+            "target_fps": self.target_fps,
+            "jpeg_quality": self.target_quality,
             "frames": self.frame_count,
             "error": self.error_msg,
-            "resolution": self.resolution
+            "first_frame_ms": round((self.first_frame_at - self.start_time) * 1000) if self.first_frame_at else None,
+            "resolution": self.resolution,
+            "frame_pool": self.pool.status()
         }
 
     def _capture_loop(self):
@@ -84,29 +171,38 @@ class CameraStreamer:
             rot = self.config.get('rotation', 0)
             camera.rotation = rot
             
-            logger.info("PiCamera Warming up (2s)...")
-            time.sleep(2) 
-            logger.info(f"PiCamera Running. Res: {camera.resolution}")
+            logger.info(f"PiCamera Running. Res: {camera.resolution} (warm-up {self.warmup_s}s)")
             
             self.resolution = camera.resolution
-            stream = io.BytesIO()
+            # Frames are encoded straight into pool buffers (no read() copy, no truncate)
+            output = FrameWriter(self.pool)
+            warm_until = time.time() + self.warmup_s
             
-            for _ in camera.capture_continuous(stream, 'jpeg', use_video_port=True):
-                if not self.running: break
-                
-                stream.seek(0)
-                frame = stream.read()
-                
-                with self.lock:
-                    self.current_frame = frame
-                
-                if self.detector:
-                    stream.seek(0)
-                    self.detector.process_frame(stream)
-                
-                stream.seek(0)
-                stream.truncate()
-                self.frame_count += 1
+            # Quality is fixed per capture_continuous call: restart the generator when it changes
+            while self.running:
+                quality = self.target_quality
+                t_capture = metrics.now()
+                for _ in camera.capture_continuous(output, 'jpeg', use_video_port=True, quality=quality):
+                    if not self.running: break
+                    frame_t = time.time()
+                    
+                    buf = output.take()
+                    seq = self._publish(buf.retain(), t_capture)
+                    
+                    # Stream right away; detections only once exposure has settled
+                    try:
+                        if self.detector and time.time() >= warm_until:
+                            self.detector.process_frame(FrameReader(buf.view()), seq)
+                    finally:
+                        buf.release()
+                    
+                    # Capped below the sensor rate: wait before requesting the next frame (no encode meanwhile)
+                    if self.target_fps < self.fps:
+                        delay = (1.0 / self.target_fps) - (time.time() - frame_t)
+                        if delay > 0: time.sleep(delay)
+                    
+                    if self.target_quality != quality: break
+                    t_capture = metrics.now() # Next frame: waiting on sensor + encoder
 
     def _mock_loop(self):
         """Fallback for non-Pi environments"""
@@ -126,6 +222,7 @@ class CameraStreamer:
         
         while self.running:
             start_t = time.time()
+            t_capture = metrics.now()
             
             if use_pil:
                 img = Image.new('RGB', (w, h), color=(20, 20, 20))
@@ -139,25 +236,24 @@ class CameraStreamer:
                 d.rectangle([bx, h-50, bx+40, h-10], outline='cyan', width=2)
                 d.text((10, 10), f"MOCK CAMERA: {self.frame_count}", fill='yellow')
                 
-                buf = io.BytesIO()
-                img.save(buf, format='JPEG', quality=40)
-                frame = buf.getvalue()
+                buf = self.pool.acquire()
+                img.save(buf, format='JPEG', quality=min(40, self.target_quality))
             else:
-                frame = fallback_frame
+                buf = self.pool.acquire()
+                buf.write(fallback_frame)
 
-            with self.lock:
-                self.current_frame = frame
+            seq = self._publish(buf.retain(), t_capture)
             
             # Important: Feed detector even in mock
-            if self.detector:
-                try:
-                    self.detector.process_frame(frame)
-                except Exception:
-                    pass
-
-            self.frame_count += 1
+            try:
+                if self.detector:
+                    self.detector.process_frame(FrameReader(buf.view()), seq)
+            except Exception:
+                pass
+            finally:
+                buf.release()
             
             # FPS Sleep
             elapsed = time.time() - start_t
-            delay = max(0, (1.0 / self.fps) - elapsed)
+            delay = max(0, (1.0 / self.target_fps) - elapsed)
             time.sleep(delay)
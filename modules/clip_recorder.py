@@ -0,0 +1,254 @@
+import os
+import re
+import json
+import math
+import queue
+import shutil
+import time
+import threading
+from collections import deque
+
+from . import metrics
+from .journal import atomic_write_json
+from .startup import offload
+
+CLIPS_WRITTEN = metrics.counter('laser_clips_written_total', 'Event clips written to disk')
+CLIPS_DROPPED = metrics.counter('laser_clips_dropped_total', 'Event clips dropped (writer busy or disk full)')
+CLIP_BYTES = metrics.counter('laser_clip_bytes_written_total', 'JPEG bytes written to event clips')
+
+"""
+Pre-/post-event clip recorder.
+A sampler keeps the last pre_s + post_s seconds of frames (at `fps`) in a preallocated slot ring,
+copied out of the camera's frame pool so the pool is never held, together with the detections of
+the moment. trigger() (EVADE, model failover, manual) marks an event; once post_s has passed, the
+frames from pre_s before to post_s after it are handed to the writer:
+    clips/<YYYYmmdd-HHMMSS>_<reason>.mjpeg  concatenated JPEGs (ffplay -f mjpeg, VLC)
+    clips/<YYYYmmdd-HHMMSS>_<reason>.json   triggers + per-frame seq, ts, byte offset, detections
+Writing runs on its own greenlet with each file call on the native threadpool, capped at
+write_mb_s, so SD-card latency never reaches capture. At most max_pending clips wait for the
+writer; further events are merged into the clip being collected or dropped (counted).
+"""
+class ClipRecorder:
+    def __init__(self, config_data, get_camera, get_detector, on_clip=None):
+        self.config = config_data.get('recorder', {})
+        self.get_camera = get_camera
+        self.get_detector = get_detector
+        self.on_clip = on_clip # (info) after a clip has been written
+
+        self.enabled = self.config.get('enabled', True)
+        self.pre_s = self.config.get('pre_s', 5.0)
+        self.post_s = self.config.get('post_s', 5.0)
+        self.fps = self.config.get('fps', 10)
+        self.dir = self.config.get('dir', 'clips')
+        self.max_clips = self.config.get('max_clips', 20)
+        self.write_rate = self.config.get('write_mb_s', 4.0) * 1024 * 1024
+        self.min_free_mb = self.config.get('min_free_mb', 200)
+
+        # Ring: one preallocated bytearray per slot, grown in place only if a frame does not fit
+        capacity = int(math.ceil((self.pre_s + self.post_s) * self.fps)) + 1 if self.enabled else 0
+        slot_size = self.config.get('slot_kb', 96) * 1024
+        self.slots = [bytearray(slot_size) for _ in range(capacity)]
+        self.meta = [None] * capacity # (seq, ts, size, detections, detections_seq)
+        self.pos = 0
+        self.last_seq = 0
+
+        self.requests = deque() # (reason, ts, info) from trigger(), any thread
+        self.active = None # Clip being collected (post-roll not over yet)
+        self.pending = queue.Queue(self.config.get('max_pending', 1))
+        self.written = 0
+        self.dropped = 0
+        self.last_clip = None
+        self.last_error = None
+        self.running = False
+
+    def start(self):
+        if self.running or not self.enabled: return
+        self.running = True
+        threading.Thread(target=self._sample_loop, daemon=True).start()
+        threading.Thread(target=self._writer_loop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        try:
+            self.pending.put_nowait(None) # Wake the writer
+        except queue.Full:
+            pass
+
+    def trigger(self, reason, info=None):
+        """Record the frames around now. Cheap and thread-safe (the sampler does the work)."""
+        if not self.running: return False
+        self.requests.append((reason, time.time(), info))
+        return True
+
+    # --- Sampler (hot side: one memcpy per sampled frame, no allocation) ---
+
+    def _sample_loop(self):
+        interval = 1.0 / self.fps
+        while self.running:
+            start_t = time.time()
+            try:
+                self._sample()
+                self._collect(time.time())
+            except Exception as e:
+                print(f"[Recorder] Loop Error: {e}")
+            time.sleep(max(0, interval - (time.time() - start_t)))
+
+    def _sample(self):
+        camera = self.get_camera()
+        if not camera or camera.frame_count == self.last_seq: return
+        buf, seq, ts = camera.acquire_frame()
+        if not buf: return
+        try:
+            i = self.pos % len(self.slots)
+            size = len(buf)
+            if size > len(self.slots[i]):
+                self.slots[i] = bytearray(size + size // 4)
+            self.slots[i][:size] = buf.view()
+        finally:
+            buf.release()
+        detector = self.get_detector()
+        self.meta[i] = (seq, ts, size, detector.get_latest_detections(), detector.detections_seq)
+        self.pos += 1
+        self.last_seq = seq
+
+    def _collect(self, now):
+        while self.requests:
+            reason, ts, info = self.requests.popleft()
+            trigger = {"reason": reason, "ts": round(ts, 3), "info": info}
+            if self.active:
+                # Inside the post-roll of a clip already being collected: one clip, several triggers
+                self.active['triggers'].append(trigger)
+                continue
+            name = re.sub(r'[^a-z0-9_-]', '', str(reason).lower()) or 'event'
+            self.active = {
+                "id": f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(ts))}_{name}",
+                "start": ts - self.pre_s,
+                "end": ts + self.post_s,
+                "triggers": [trigger]
+            }
+
+        if self.active and now >= self.active['end']:
+            clip, self.active = self.active, None
+            frames = self._snapshot(clip['start'], clip['end'])
+            try:
+                self.pending.put_nowait((clip, frames))
+            except queue.Full:
+                self.dropped += 1
+                CLIPS_DROPPED.inc()
+                print(f"[Recorder] Writer busy, dropped clip {clip['id']}")
+
+    def _snapshot(self, start, end):
+        """Copies of the buffered frames captured in [start, end], oldest first (the ring keeps sampling)."""
+        frames = []
+        n = len(self.slots)
+        for k in range(max(0, self.pos - n), self.pos):
+            i = k % n
+            seq, ts, size, dets, det_seq = self.meta[i]
+            if start <= ts <= end:
+                frames.append((seq, ts, dets, det_seq, bytes(memoryview(self.slots[i])[:size])))
+        return frames
+
+    # --- Writer (cold side) ---
+
+    def _writer_loop(self):
+        while self.running:
+            item = self.pending.get()
+            if item is None: continue
+            clip, frames = item
+            try:
+                self._write(clip, frames)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[Recorder] Failed to write clip {clip['id']}: {e}")
+
+    def _write(self, clip, frames):
+        if not frames: return
+        free_mb = offload(self._free_mb)
+        if free_mb < self.min_free_mb:
+            self.dropped += 1
+            CLIPS_DROPPED.inc()
+            self.last_error = f"Low disk space ({free_mb:.0f} MB free), clip {clip['id']} dropped"
+            print(f"[Recorder] {self.last_error}")
+            return
+
+        path = os.path.join(self.dir, f"{clip['id']}.mjpeg")
+        tmp = f"{path}.part"
+        index = []
+        offset = 0
+        t_start = time.time()
+        f = offload(open, tmp, 'wb')
+        try:
+            for seq, ts, dets, det_seq, data in frames:
+                offload(f.write, data)
+                index.append({"seq": seq, "ts": round(ts, 3), "offset": offset, "size": len(data),
+                              "detections": dets, "detections_seq": det_seq})
+                offset += len(data)
+                # Bandwidth cap: spread the clip out instead of saturating the SD card
+                ahead = t_start + offset / self.write_rate - time.time()
+                if ahead > 0: time.sleep(ahead)
+            offload(f.flush)
+            offload(os.fsync, f.fileno())
+        finally:
+            offload(f.close)
+        offload(os.replace, tmp, path)
+
+        info = {
+            "id": clip['id'],
+            "file": os.path.basename(path),
+            "triggers": clip['triggers'],
+            "frames": len(frames),
+            "bytes": offset,
+            "duration_s": round(frames[-1][1] - frames[0][1], 2),
+            "write_s": round(time.time() - t_start, 2)
+        }
+        offload(atomic_write_json, os.path.join(self.dir, f"{clip['id']}.json"), dict(info, index=index))
+        self.written += 1
+        self.last_clip = info
+        CLIPS_WRITTEN.inc()
+        CLIP_BYTES.inc(offset)
+        print(f"[Recorder] Clip {clip['id']}: {len(frames)} frames, {offset // 1024} KB")
+        offload(self._prune)
+        if self.on_clip:
+            self.on_clip(info)
+
+    def _free_mb(self):
+        os.makedirs(self.dir, exist_ok=True)
+        return shutil.disk_usage(self.dir).free / (1024 * 1024)
+
+    def _prune(self):
+        """Keep the newest max_clips (ids sort by time)."""
+        clips = sorted(name[:-6] for name in os.listdir(self.dir) if name.endswith('.mjpeg'))
+        for clip_id in clips[:-self.max_clips] if self.max_clips else []:
+            for ext in ('.mjpeg', '.json'):
+                try:
+                    os.remove(os.path.join(self.dir, clip_id + ext))
+                except OSError:
+                    pass
+
+    def list_clips(self):
+        """Written clips, newest first (summary from the sidecar JSON, without the frame index)."""
+        if not os.path.isdir(self.dir): return []
+        clips = []
+        for name in sorted(os.listdir(self.dir), reverse=True):
+            if not name.endswith('.json'): continue
+            try:
+                with open(os.path.join(self.dir, name)) as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                continue
+            info.pop('index', None)
+            clips.append(info)
+        return clips
+
+    def status(self):
+        buffered = [m for m in self.meta if m is not None]
+        return {
+            "enabled": self.enabled,
+            "buffered_s": round(max(m[1] for m in buffered) - min(m[1] for m in buffered), 1) if buffered else 0,
+            "recording": self.active['id'] if self.active else None,
+            "pending": self.pending.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "last_clip": self.last_clip,
+            "last_error": self.last_error
+        }
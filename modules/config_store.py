@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from .journal import atomic_write_json
+from .startup import offload
+
+def freeze(obj):
+    """Deep read-only copy: dict -> MappingProxyType, list -> tuple."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+def thaw(obj):
+    """Inverse of freeze (plain dict / list, e.g. for JSON)."""
+    if isinstance(obj, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [thaw(v) for v in obj]
+    return obj
+
+EMPTY = freeze({})
+
+class ConfigStore:
+    """
+    Runtime configuration as immutable, versioned snapshots.
+    - Readers: `store.get()` / `store.section(name)` is a single attribute read, no lock.
+      Take one reference per tick and read everything from it (no torn reads mid-update).
+    - Writers: `update(section, changes)` builds a new snapshot and swaps it in (serialized by a lock),
+      then notifies that section's subscribers.
+    - Persistence: debounced, written on the native threadpool (never blocks the hub), atomic file replacement.
+      Hardware keys (servos limits / center) go to hardware.json, the rest to config.json.
+    """
+    HW_KEYS = ('pan_limits_deg', 'tilt_limits_deg', 'center_deg')
+
+    def __init__(self, path, hardware_path=None, debounce_s=1.0):
+        self.path = path
+        self.hardware_path = hardware_path
+        self.debounce_s = debounce_s
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._subscribers = {}
+        self._dirty_at = None
+        self._writer = None
+        self.version = 0
+        self.saved_version = 0
+
+        self.snapshot = freeze(self._load())
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                config = json.load(f)
+        except Exception as e:
+            print(f"Error loading config: {e}. Using defaults.")
+            config = {}
+
+        # Overlay Hardware Config
+        if self.hardware_path and os.path.exists(self.hardware_path):
+            try:
+                with open(self.hardware_path, 'r') as f:
+                    hw_conf = json.load(f)
+                    if 'servos' not in config: config['servos'] = {}
+                    if 'servos' in hw_conf:
+                        for k, v in hw_conf['servos'].items():
+                            config['servos'][k] = v
+                    print(f"Loaded Hardware Config from {self.hardware_path}")
+            except Exception as e:
+                print(f"Error loading hardware config: {e}")
+        return config
+
+    # --- Reads (lock-free) ---
+    def get(self):
+        return self.snapshot
+
+    def section(self, name):
+        return self.snapshot.get(name, EMPTY)
+
+    # --- Writes ---
+    def update(self, section, changes, persist=True):
+        """
+        Shallow-merge `changes` into one top-level section. Returns the new snapshot.
+        persist: False keeps the change in memory until the next save()
+        """
+        with self._lock:
+            current = self.snapshot
+            merged = dict(current.get(section, EMPTY))
+            merged.update({k: freeze(v) for k, v in changes.items()})
+
+            # Structural sharing: untouched sections keep their frozen objects
+            top = dict(current)
+            top[section] = MappingProxyType(merged)
+            snapshot = MappingProxyType(top)
+
+            self.version += 1
+            self.snapshot = snapshot # Atomic reference swap
+            if persist:
+                self._mark_dirty()
+
+        for callback in self._subscribers.get(section, ()):
+            try:
+                callback(snapshot[section])
+            except Exception as e:
+                print(f"[Config] Subscriber error ({section}): {e}")
+        return snapshot
+
+    def subscribe(self, section, callback):
+        """callback(section_snapshot) after every update of `section`."""
+        self._subscribers.setdefault(section, []).append(callback)
+
+    # --- Persistence ---
+    def _mark_dirty(self):
+        # Caller holds self._lock
+        self._dirty_at = time.time()
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+
+    def save(self):
+        """Request a save of the current snapshot (debounced, non-blocking)."""
+        with self._lock:
+            self._mark_dirty()
+
+    def _write_loop(self):
+        # Wait until updates stop for debounce_s, then write the latest snapshot
+        while True:
+            dirty_at = self._dirty_at
+            wait = dirty_at + self.debounce_s - time.time()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            # write + fsync to the SD card on the native threadpool: the writer is a greenlet
+            # under gevent and would otherwise stall the control loops for the whole write
+            snapshot, version = self.snapshot, self.version
+            with self._write_lock:
+                offload(self._write, snapshot, version)
+            with self._lock:
+                if self._dirty_at == dirty_at:
+                    self._writer = None
+                    return
+
+    def flush(self):
+        """Synchronous write of the current snapshot (also used at shutdown)."""
+        snapshot, version = self.snapshot, self.version
+        with self._write_lock:
+            self._write(snapshot, version)
+
+    def _write(self, snapshot, version):
+        try:
+            main_conf = thaw(snapshot)
+            hw_data = {'servos': {}}
+            servos_conf = main_conf.get('servos', {})
+            for k in self.HW_KEYS:
+                if k in servos_conf:
+                    hw_data['servos'][k] = servos_conf.pop(k)
+
+            if self.hardware_path:
+                atomic_write_json(self.hardware_path, hw_data, indent=4)
+            else:
+                main_conf.setdefault('servos', {}).update(hw_data['servos'])
+            atomic_write_json(self.path, main_conf, indent=4)
+            self.saved_version = version
+            print(f"[Config] Saved version {version}")
+        except Exception as e:
+            print(f"[Config] Save failed: {e}")
+
+    def close(self):
+        """Write a pending (debounced) save right away."""
+        if self._writer is not None:
+            self.flush()
+
+    def status(self):
+        return {"version": self.version, "saved_version": self.saved_version}
@@ -11,15 +11,37 @@ class BaseDetector:
     """
     Abstract Base Class for Detectors.
     Interface:
-    - process_frame(frame_bytes): Process a new frame (async output update).
-    - get_latest_detections(): Return list of dicts: [{'bbox':[x1,y1,x2,y2], 'label':str, 'score':float}]
+    - start(): Start background work (called once by the app, after construction).
+    - process_frame(frame_bytes, seq=None): Process a new frame (async output update). seq is the camera frame seq (tracing).
+    - get_latest_detections(): Return list of dicts: [{'bbox':[x1,y1,x2,y2], 'label':str, 'score':float, 'role':'target'|'safety'}]
+    - detections_ts: time.time() of the frame the latest detections came from (0 = none yet).
+    - detections_seq: camera seq of that frame (0 = unknown).
+    - set_focus(roi_bbox, danger_zones): Hint where the laser and danger zones are (frame pixels).
+    - set_rate_cap(source, fps): Upper bound on the inference rate (None removes it).
+    - healthy(): False while no detections can be produced (e.g. no model loaded); an empty
+      get_latest_detections() then means "unknown", not "nothing there".
     - status(): Return dict for health check.
     """
-    def process_frame(self, frame_bytes):
+    detections_ts = 0
+    detections_seq = 0
+
+    def start(self):
+        pass
+
+    def process_frame(self, frame_bytes, seq=None):
+        pass
+
+    def set_focus(self, roi_bbox, danger_zones):
+        pass
+
+    def set_rate_cap(self, source, fps):
         pass
 
     def get_latest_detections(self):
         return []
+
+    def healthy(self):
+        return False
     
     def status(self):
         return {"mode": "base", "ready": False}
@@ -43,15 +65,20 @@ class MockDetector(BaseDetector):
         self.current_det = {
             "bbox": [x1, y1, x2, y2],
             "label": "mock_cat",
-            "score": 1.0
+            "score": 1.0,
+            "role": "target"
         }
         self.last_update = time.time()
+        self.detections_ts = self.last_update
         logger.info(f"Mock Detection Set: {self.current_det['bbox']}")
 
     def get_latest_detections(self):
         if self.current_det and (time.time() - self.last_update < self.ttl):
             return [self.current_det]
         return []
+
+    def healthy(self):
+        return True
         
     def status(self):
         return {
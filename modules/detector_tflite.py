@@ -33,6 +33,18 @@ except ImportError:
         tflite = None
 
 from .detector import BaseDetector
+from . import metrics
+from .tracing import TRACER
+
+DECODE_SECONDS = metrics.histogram('laser_decode_seconds', 'JPEG decode (draft scaled) for inference')
+POSTPROCESS_SECONDS = metrics.histogram('laser_postprocess_seconds', 'Score / label filtering and bbox conversion')
+INFERENCES = metrics.counter('laser_inferences_total', 'Frames that got an inference pass')
+SKIPPED = metrics.counter('laser_inference_skipped_total', 'Frames skipped by the inference scheduler')
+
+if available:
+    from .motion import MotionDetector, InferenceScheduler
+    from .model_manager import ModelManager
+    from .labels import LabelTable
 
 class TFLiteDetector(BaseDetector):
     def __init__(self, config):
@@ -40,6 +52,8 @@ class TFLiteDetector(BaseDetector):
             raise ImportError(f"Missing dependencies: {', '.join(missing_deps)}")
 
         self.config = config.get('detector', {}).get('tflite', {})
+        # Safety-relevant classes (person, dog, ...) are detected in the same pass as targets
+        self.safety_classes = list(config.get('safety', {}).get('profiles', {}).keys())
         self.labels_path = self.config.get('labels_path')
         self.threshold = self.config.get('threshold', 0.5)
         
@@ -52,130 +66,69 @@ class TFLiteDetector(BaseDetector):
         self.backend = self.config.get('backend', 'cpu') 
         self.fallback = self.config.get('fallback_backend', 'cpu')
         
-        # Throttling
+        # Throttling (Motion-gated)
         self.inference_fps = self.config.get('inference_fps', 10)
-        self.min_interval = 1.0 / self.inference_fps
-        self.last_inference_time = 0
+        motion_conf = self.config.get('motion', {})
+        self.motion = MotionDetector(motion_conf) if motion_conf.get('enabled', True) else None
+        self.scheduler = InferenceScheduler(motion_conf, self.inference_fps)
         
         # Stats
         self.inference_ms = 0.0
         self.frame_count = 0
         
         self.labels = {}
-        self.interpreter = None
-        self.input_details = None
-        self.output_details = None
-        self.height = 300
-        self.width = 300
-        
+        self.label_table = None
         self.latest_detections = []
+        self.detections_ts = 0 # Arrival time of the frame the detections came from
+        self.detections_seq = 0
+        
+        # Model Registry (Hot-swap / Failover)
+        specs = self._model_specs()
+        preferred = self.config.get('active_model')
+        if not preferred:
+            preferred = next((sp['name'] for sp in specs if sp.get('backend', 'cpu') == self.backend), None)
+        self.models = ModelManager(
+            specs, tflite,
+            preferred=preferred,
+            retry_sec=self.config.get('model_retry_sec', 5.0)
+        )
         
         # Initialize
         self._load_interpreter_safe()
+
+    def _model_specs(self):
+        """Explicit `models` list from config, or derived from model_path / model_path_tpu."""
+        specs = self.config.get('models')
+        if specs: return specs
+        
+        specs = []
+        if self.model_path_tpu:
+            specs.append({"name": "tpu", "backend": "tpu", "path": self.model_path_tpu, "delegate": self.delegate_path})
+        if self.model_path_cpu:
+            specs.append({"name": "cpu", "backend": "cpu", "path": self.model_path_cpu})
+        return specs
             
     def _load_interpreter_safe(self):
         try:
             self.labels = self.load_labels(self.labels_path)
+            self.label_table = LabelTable(self.labels, self.config.get('target_classes', []), self.safety_classes)
             logger.info(f"Loaded {len(self.labels)} labels.")
             
             # Label Check
-            target_classes = self.config.get('target_classes', [])
             has_cat = any('cat' in val.lower() for val in self.labels.values())
             if not has_cat:
                 logger.warning("'cat' not found in labels!")
 
-            # Backend Selection
-            if self.backend == 'tpu':
-                try:
-                    self._load_tpu_model()
-                    logger.info(f"Initialized TPU Backend: {self.model_path_tpu}")
-                    return
-                except Exception as e:
-                    logger.error(f"TPU init failed: {e}. Fallback to {self.fallback}")
-                    if self.fallback == 'cpu':
-                        self.backend = 'cpu'
-                        # Fall through to cpu
-                    else:
-                        raise e
-
-            if self.backend == 'cpu':
-                self._load_cpu_model()
-                logger.info(f"Initialized CPU Backend: {self.model_path_cpu}")
+            # Preferred backend first, then fallback backend
+            model = self.models.load_initial(self.fallback)
+            if not model:
+                raise RuntimeError("No detector model could be loaded")
+            logger.info(f"Initialized {model.backend.upper()} Backend: {model.path}")
 
         except Exception as e:
             logger.critical(f"TFLite Init Fatal Error: {e}")
             raise e
 
-    def _load_tpu_model(self):
-        if not self.model_path_tpu:
-             raise ValueError("model_path_tpu not defined")
-        
-        logger.info(f"Loading TPU Delegate: {self.delegate_path}")
-        delegate = tflite.load_delegate(self.delegate_path)
-        self.interpreter = tflite.Interpreter(
-            model_path=self.model_path_tpu,
-            experimental_delegates=[delegate]
-        )
-        self._allocate()
-
-    def _load_cpu_model(self):
-        if not self.model_path_cpu:
-            raise ValueError("model_path (CPU) not defined")
-        self.interpreter = tflite.Interpreter(model_path=self.model_path_cpu)
-        self._allocate()
-        
-    def _allocate(self):
-        self.interpreter.allocate_tensors()
-        self.input_details = self.interpreter.get_input_details()
-        self.output_details = self.interpreter.get_output_details()
-        
-        # Log Input Details
-        if self.input_details:
-             logger.info(f"Input: Shape={self.input_details[0]['shape']}, Dtype={self.input_details[0]['dtype']}")
-             
-        self.height = self.input_details[0]['shape'][1]
-        self.width = self.input_details[0]['shape'][2]
-        self.manual_detections = []
-        
-        # Attempt to auto-map outputs by shape
-        # Standard SSD: [1, N, 4] (Boxes), [1, N] (Classes), [1, N] (Scores), [1] (Count)
-        self.idx_boxes = -1
-        self.idx_classes = -1
-        self.idx_scores = -1
-        
-        for d in self.output_details:
-            shape = d['shape']
-            idx = d['index']
-            logger.info(f"Output: Idx={idx}, Shape={shape}, Dtype={d['dtype']}")
-            
-            if len(shape) == 3 and shape[-1] == 4:
-                self.idx_boxes = idx
-            elif len(shape) == 2:
-                # Ambiguous: Classes or Scores?
-                # Usually Classes is index 1, Scores is index 2 in output list order? 
-                # Let's rely on list position if shape is same
-                pass
-                
-        # Fallback to standard order if auto-map inconclusive
-        # Many EdgeTPU models follow: Locations(0), Classes(1), Scores(2), Count(3)
-        if self.idx_boxes == -1: 
-             self.idx_boxes = self.output_details[0]['index']
-             self.idx_classes = self.output_details[1]['index']
-             self.idx_scores = self.output_details[2]['index']
-        else:
-             # Found boxes, assume others follow list order excludes boxes?
-             # Actually, safest is to trust the generic order [0,1,2] unless verified otherwise.
-             # User reported "Dets: 0", meaning tensors ARE valid but values are low.
-             # So order is likely correct. The issue is likely normalization or threshold.
-             pass
-
-        # Force standard indices for MobileNet SSD v2
-        self.idx_boxes = self.output_details[0]['index']
-        self.idx_classes = self.output_details[1]['index']
-        self.idx_scores = self.output_details[2]['index']
-        
-        logger.info(f"Mapped Outputs: Box={self.idx_boxes}, Class={self.idx_classes}, Score={self.idx_scores}")
-
     def load_labels(self, path):
         if not path: return {}
         try:
@@ -201,105 +154,137 @@ class TFLiteDetector(BaseDetector):
             logger.error(f"Label load error: {e}")
             return {}
 
+    def start(self):
+        # Retry the preferred model if needed, warm standby so a TPU unplug fails over without load time
+        self.models.start(self.fallback, self.config.get('warm_standby', True))
+
     def status(self):
+        model = self.models.active
         return {
             "mode": "tflite",
-            "backend": self.backend,
+            "backend": model.backend if model else None,
+            "model": model.name if model else None,
             "inference_ms": self.inference_ms,
-            "ready": self.interpreter is not None
+            "scheduler": self.scheduler.status(),
+            "ready": model is not None,
+            "healthy": model is not None
         }
 
     def get_latest_detections(self):
         return self.latest_detections
 
-    def process_frame(self, frame_bytes):
-        if not self.interpreter: return
+    def healthy(self):
+        return self.models.active is not None
+
+    def _drop_detections(self):
+        """No model: the last detections can no longer be trusted (nor refreshed)."""
+        if self.detections_ts:
+            self.latest_detections = []
+            self.detections_ts = 0
+            self.detections_seq = 0
+
+    def set_focus(self, roi_bbox, danger_zones):
+        self.scheduler.set_zones(roi_bbox, danger_zones)
+
+    def set_rate_cap(self, source, fps):
+        self.scheduler.set_cap(source, fps)
+
+    def process_frame(self, frame_bytes, seq=None):
+        # One reference per frame; hot-swaps take effect on the next frame
+        model = self.models.active
+        if not model:
+            self._drop_detections()
+            return
+
+        if isinstance(frame_bytes, bytes):
+            stream = io.BytesIO(frame_bytes)
+        else:
+            stream = frame_bytes
+
+        # Motion Gate (luma-only decode, much cheaper than inference)
+        if self.motion:
+            t_motion = metrics.now()
+            try:
+                self.motion.update(stream)
+            except Exception as e:
+                logger.error(f"Motion Error: {e}")
+            stream.seek(0)
+            TRACER.complete('motion', 'detector', seq, t_motion)
 
         # Throttling
         now = time.time()
-        if now - self.last_inference_time < self.min_interval:
-            return 
-        self.last_inference_time = now
+        if not self.scheduler.should_run(now, self.motion):
+            SKIPPED.inc()
+            TRACER.instant('skip', 'detector', seq)
+            return
         
         self.frame_count += 1
+        INFERENCES.inc()
         start_time = time.time()
+        t_start = metrics.now()
 
         try:
-            # Decode & Preprocess
-            if isinstance(frame_bytes, bytes):
-                stream = io.BytesIO(frame_bytes)
-            else:
-                stream = frame_bytes 
-            
-            image = Image.open(stream).convert('RGB')
-            img_resized = image.resize((self.width, self.height), Image.BILINEAR)
+            # Decode (JPEG DCT scaling down to ~model size when the frame is much larger)
+            image = Image.open(stream)
+            orig_w, orig_h = image.size
+            image.draft('RGB', (model.width, model.height))
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            image.load() # Decode here, not lazily inside preprocess
+            t_decoded = metrics.now()
+            DECODE_SECONDS.observe(t_decoded - t_start)
+            TRACER.complete('decode', 'detector', seq, t_start, t_decoded)
             
-            input_dtype = self.input_details[0]['dtype']
-            input_data = np.expand_dims(np.array(img_resized, dtype=input_dtype), axis=0)
-
-            # Normalize (Float models usually -1..1, Uint8 [0,255])
-            if input_dtype == np.float32:
-                input_data = (input_data - 127.5) / 127.5
-            
-            # Inference
-            self.interpreter.set_tensor(self.input_details[0]['index'], input_data)
-            self.interpreter.invoke()
-
-            # Parse Output
-            boxes = self.interpreter.get_tensor(self.idx_boxes)[0]
-            classes = self.interpreter.get_tensor(self.idx_classes)[0]
-            scores = self.interpreter.get_tensor(self.idx_scores)[0]
+            # Inference (resize/normalize happen in place inside the input tensor)
+            try:
+                boxes, classes, scores = model.invoke(image)
+            except Exception as e:
+                # e.g. Coral USB unplugged mid-run: swap to warm standby, keep last detections
+                self.models.report_failure(model, e)
+                if not self.models.active:
+                    self._drop_detections()
+                return
+            t_post = metrics.now()
+            TRACER.complete('inference', 'detector', seq, t_decoded, t_post)
             
             detections = []
-            orig_w, orig_h = image.size
-            target_classes = [t.lower() for t in self.config.get('target_classes', [])]
-
-            for i in range(len(scores)):
-                score = float(scores[i])
-                
-                # Filter out very low confidence
-                if score < 0.1: continue
+            table = self.label_table
+            cids = table.lookup(classes)
+            keep = (scores >= self.threshold) & table.allowed[cids]
 
-                class_id = int(classes[i])
-                label = self.labels.get(class_id, f"unknown_{class_id}")
-                label_lower = label.lower()
-                
-                # Filter Logic
-                # If target_classes is empty -> Allow all
-                pass_filter = True
-                if target_classes:
-                    if 'all' not in target_classes:
-                        # Check partial match? or Exact? config implies exact "cat".
-                        # But label might be "16 cat" or just "cat".
-                        # Our loader tries to strip ID.
-                        if label_lower not in target_classes:
-                            pass_filter = False
-                
-                # DEBUG LOG (Sampled)
-                if self.frame_count % 30 == 0:
-                    status = "KEEP" if (pass_filter and score >= self.threshold) else "DROP"
+            # DEBUG LOG (Sampled)
+            if self.frame_count % 30 == 0:
+                for i in np.flatnonzero(scores >= 0.1):
+                    label = table.name(cids[i], int(classes[i]))
+                    status = "KEEP" if keep[i] else "DROP"
                     reason = ""
-                    if not pass_filter: reason = f"(Label '{label_lower}' not in {target_classes})"
-                    elif score < self.threshold: reason = f"(Score {score:.2f} < {self.threshold})"
+                    if not table.allowed[cids[i]]: reason = f"(Label '{label.lower()}' not in {sorted(table.targets | table.safety)})"
+                    elif not keep[i]: reason = f"(Score {scores[i]:.2f} < {self.threshold})"
                     
-                    logger.info(f"DET: ID={class_id} L={label} S={score:.2f} -> {status} {reason}")
+                    logger.info(f"DET: ID={int(classes[i])} L={label} S={scores[i]:.2f} -> {status} {reason}")
 
-                if pass_filter and score >= self.threshold:
-                    ymin, xmin, ymax, xmax = boxes[i]
-                    
-                    # Convert to [x1, y1, x2, y2]
-                    left = int(max(0, xmin * orig_w))
-                    top = int(max(0, ymin * orig_h))
-                    right = int(min(orig_w, xmax * orig_w))
-                    bottom = int(min(orig_h, ymax * orig_h))
-                    
-                    detections.append({
-                        "bbox": [left, top, right, bottom], # [x1, y1, x2, y2]
-                        "label": label,
-                        "score": score
-                    })
+            for i in np.flatnonzero(keep):
+                ymin, xmin, ymax, xmax = boxes[i]
+                
+                # Convert to [x1, y1, x2, y2]
+                left = int(max(0, xmin * orig_w))
+                top = int(max(0, ymin * orig_h))
+                right = int(min(orig_w, xmax * orig_w))
+                bottom = int(min(orig_h, ymax * orig_h))
+                
+                detections.append({
+                    "bbox": [left, top, right, bottom], # [x1, y1, x2, y2]
+                    "label": table.name(cids[i], int(classes[i])),
+                    "score": float(scores[i]),
+                    "role": table.role(cids[i])
+                })
             
             self.latest_detections = detections
+            self.detections_ts = now
+            self.detections_seq = seq or 0
+            t_done = metrics.now()
+            POSTPROCESS_SECONDS.observe(t_done - t_post)
+            TRACER.complete('postprocess', 'detector', seq, t_post, t_done)
             self.inference_ms = (time.time() - start_time) * 1000
             
             if self.frame_count % 30 == 0:
@@ -0,0 +1,110 @@
+import json
+import time
+import threading
+from collections import deque
+
+from . import metrics
+
+SSE_CLIENTS = metrics.gauge('laser_sse_clients', 'Connected /api/events streams')
+
+"""
+Sequence-numbered change events for non-browser consumers (long-poll / Server-Sent Events).
+EventRing keeps the last `capacity` events; a consumer remembers the last seq it saw and asks for
+everything after it, so each change is delivered exactly once (or reported as missed when the
+consumer fell further behind than the ring holds).
+EventPublisher watches the detector and publishes AutoPilot's own state callbacks:
+    detections: the detection list changed (including back to empty)
+    state:      AutoPilot state transition (every one, even EVADE -> COOLDOWN within one loop pass)
+    clip:       an event clip was written (published by ClipRecorder)
+"""
+class EventRing:
+    def __init__(self, capacity=1024):
+        self.events = deque(maxlen=capacity)
+        self.evicted = {} # type -> seq of the newest event of that type that fell out of the ring
+        self.seq = 0
+        self.cond = threading.Condition()
+
+    def publish(self, kind, data):
+        with self.cond:
+            self.seq += 1
+            if len(self.events) == self.events.maxlen:
+                oldest = self.events[0]
+                self.evicted[oldest['type']] = oldest['seq']
+            self.events.append({"seq": self.seq, "ts": round(time.time(), 3), "type": kind, "data": data})
+            self.cond.notify_all()
+            return self.seq
+
+    def after(self, seq, types=None):
+        """Events newer than `seq` (optionally only `types`).
+        Returns (events, missed, cursor): missed = events of the requested types already fell out of
+        the ring, or `seq` is from before a restart (ahead of this process); cursor = seq to pass
+        next time (covers skipped events of other types too)."""
+        if seq > self.seq:
+            # Stale cursor from a previous process: resync from now instead of waiting for seq to catch up
+            return [], True, self.seq
+        events = list(self.events) # Snapshot: publish() may append meanwhile
+        missed = any(last > seq for kind, last in self.evicted.items() if not types or kind in types)
+        out = [e for e in events if e['seq'] > seq and (not types or e['type'] in types)]
+        cursor = max(seq, events[-1]['seq']) if events else seq
+        return out, missed, cursor
+
+    def wait(self, seq, timeout, types=None):
+        """after(), but blocks (this greenlet only) up to `timeout` until there is something to return."""
+        deadline = time.time() + timeout
+        with self.cond:
+            while True:
+                events, missed, cursor = self.after(seq, types)
+                remaining = deadline - time.time()
+                if events or missed or remaining <= 0:
+                    return events, missed, cursor
+                self.cond.wait(remaining)
+
+class EventPublisher:
+    def __init__(self, config_data, ring, get_detector, autopilot):
+        self.config = config_data.get('events', {})
+        self.ring = ring
+        self.get_detector = get_detector
+        self.autopilot = autopilot
+        self.interval = 1.0 / self.config.get('poll_hz', 20)
+        self.last_detections = []
+        self.running = False
+        self.thread = None
+        # Pushed from where AutoPilot assigns its state: polling would miss EVADE (it becomes
+        # COOLDOWN in the same loop pass)
+        autopilot.on_state = self._on_state
+
+    def _on_state(self, old, new):
+        self.ring.publish('state', {"from": old, "to": new})
+
+    def start(self):
+        if self.running: return
+        self.ring.publish('state', {"from": None, "to": self.autopilot.state})
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _loop(self):
+        while self.running:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[Events] Loop Error: {e}")
+            time.sleep(self.interval)
+
+    def poll(self):
+        detector = self.get_detector()
+        dets = detector.get_latest_detections()
+        # Same list object = no new inference; otherwise compare contents
+        if dets is not self.last_detections and dets != self.last_detections:
+            self.ring.publish('detections', {
+                "detections": dets,
+                "frame_seq": detector.detections_seq,
+                "frame_ts": detector.detections_ts
+            })
+        self.last_detections = dets
+
+def sse_format(event):
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
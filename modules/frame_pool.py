@@ -0,0 +1,136 @@
+import threading
+import logging
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MISSES = metrics.counter('laser_frame_pool_misses_total', 'Frames captured into a temporary buffer because every pool buffer was in use')
+
+"""
+Preallocated JPEG capture buffers.
+The camera encodes straight into a pooled bytearray (FrameBuffer.write), publishes it, and consumers
+read it through a read-only memoryview instead of a per-frame bytes copy:
+    buf, seq, ts = camera.acquire_frame()   # retained for the caller
+    try: ... buf.view() ...
+    finally: buf.release()
+A buffer goes back to the pool when the last reference is released; never keep a view past release().
+When every buffer is held (e.g. many slow MJPEG viewers) capture falls back to a temporary buffer
+instead of blocking, counted in laser_frame_pool_misses_total.
+"""
+class FrameBuffer:
+    def __init__(self, pool, size, pooled=True):
+        self.pool = pool
+        self.pooled = pooled
+        self.data = bytearray(size)
+        self.length = 0
+        self.refs = 0
+        self._bytes = None # Cached bytes() copy, shared by all legacy consumers of this frame
+
+    # File-like target for picamera / PIL
+    def write(self, b):
+        n = len(b)
+        end = self.length + n
+        if end > len(self.data):
+            # Replace rather than resize: a stale view of the old array would make resizing fail
+            grown = bytearray(max(end, len(self.data) * 2))
+            grown[:self.length] = memoryview(self.data)[:self.length]
+            self.data = grown
+        self.data[self.length:end] = b
+        self.length = end
+        return n
+
+    def flush(self):
+        pass
+
+    def view(self):
+        return memoryview(self.data)[:self.length].toreadonly()
+
+    def bytes(self):
+        """Immutable copy (for socket.io payloads and other APIs that need bytes). Made once per frame."""
+        if self._bytes is None:
+            self._bytes = bytes(self.view())
+        return self._bytes
+
+    def __len__(self):
+        return self.length
+
+    def retain(self):
+        with self.pool.lock:
+            self.refs += 1
+        return self
+
+    def release(self):
+        with self.pool.lock:
+            if self.refs <= 0:
+                raise RuntimeError("FrameBuffer released more often than retained")
+            self.refs -= 1
+            if self.refs == 0:
+                self.length = 0
+                self._bytes = None
+                if self.pooled:
+                    self.pool.free.append(self)
+
+class FrameReader:
+    """Minimal read-only file object over a memoryview (what PIL's Image.open needs), no up-front copy."""
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def read(self, n=-1):
+        end = len(self.view) if n is None or n < 0 else min(len(self.view), self.pos + n)
+        data = self.view[self.pos:end].tobytes()
+        self.pos = end
+        return data
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += len(self.view)
+        self.pos = max(0, offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+class FrameWriter:
+    """Stable output object for picamera's capture_continuous (it keeps one output for the whole run);
+    each frame is written into the current pool buffer and take() swaps in a fresh one."""
+    def __init__(self, pool):
+        self.pool = pool
+        self.buf = pool.acquire()
+
+    def write(self, b):
+        return self.buf.write(b)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        buf = self.buf
+        self.buf = self.pool.acquire()
+        return buf
+
+class FramePool:
+    def __init__(self, count=8, size=128 * 1024):
+        self.lock = threading.Lock()
+        self.count = count
+        self.size = size
+        self.free = [FrameBuffer(self, size) for _ in range(count)]
+        self.misses = 0
+        self.free_gauge = metrics.gauge('laser_frame_pool_free', 'Capture buffers available in the pool', lambda: len(self.free))
+
+    def acquire(self):
+        """An empty buffer with one reference (the caller's)."""
+        with self.lock:
+            buf = self.free.pop() if self.free else None
+        if buf is None:
+            self.misses += 1
+            MISSES.inc()
+            buf = FrameBuffer(self, self.size, pooled=False)
+        buf.refs = 1
+        return buf
+
+    def status(self):
+        return {"buffers": self.count, "free": len(self.free), "misses": self.misses}
@@ -0,0 +1,112 @@
+"""
+NumPy geometry kernel for the safety / calibration hot paths.
+Everything is batched: pass N points / boxes, get arrays or bool masks back.
+Rect format: [x1, y1, x2, y2] (Left, Top, Right, Bottom), last axis of size 4.
+"""
+import numpy as np
+
+def project(matrix, pan, tilt):
+    """
+    Affine calibration for many pan/tilt pairs in one call.
+    matrix: (2, 3) [[c1, c2, c3], [c4, c5, c6]]  ->  x = c1*P + c2*T + c3, y = c4*P + c5*T + c6
+    pan, tilt: scalars or (N,) arrays
+    Returns (N, 2) pixels.
+    """
+    pan = np.asarray(pan, dtype=float)
+    tilt = np.asarray(tilt, dtype=float)
+    out = np.empty(pan.shape + (2,))
+    out[..., 0] = matrix[0, 0] * pan + matrix[0, 1] * tilt + matrix[0, 2]
+    out[..., 1] = matrix[1, 0] * pan + matrix[1, 1] * tilt + matrix[1, 2]
+    return out
+
+def expand_boxes(boxes, margins):
+    """Expand (N, 4) boxes by scalar or (N,) margins."""
+    boxes = np.asarray(boxes, dtype=float)
+    m = np.asarray(margins, dtype=float)[..., None]
+    out = np.empty(boxes.shape)
+    out[..., :2] = boxes[..., :2] - m
+    out[..., 2:] = boxes[..., 2:] + m
+    return out
+
+def boxes_around(points, radius):
+    """Square boxes of half-size radius (scalar or (N,)) around (N, 2) points."""
+    points = np.asarray(points, dtype=float)
+    r = np.asarray(radius, dtype=float)[..., None]
+    out = np.empty(points.shape[:-1] + (4,))
+    out[..., :2] = points - r
+    out[..., 2:] = points + r
+    return out
+
+def rects_intersect(a, b):
+    """
+    All-pairs intersection test (touching counts as overlap, like safety.rect_intersects).
+    a: (N, 4), b: (M, 4) -> (N, M) bool mask
+    """
+    a = np.asarray(a, dtype=float)[:, None, :]
+    b = np.asarray(b, dtype=float)[None, :, :]
+    return ~((a[..., 2] < b[..., 0]) | (a[..., 0] > b[..., 2]) |
+             (a[..., 3] < b[..., 1]) | (a[..., 1] > b[..., 3]))
+
+def points_in_rects(points, rects):
+    """
+    All-pairs strict point-in-rect test.
+    points: (P, 2), rects: (R, 4) -> (P, R) bool mask
+    """
+    points = np.asarray(points, dtype=float)
+    rects = np.asarray(rects, dtype=float)
+    px = points[:, 0:1]
+    py = points[:, 1:2]
+    return ((rects[:, 0] < px) & (px < rects[:, 2]) &
+            (rects[:, 1] < py) & (py < rects[:, 3]))
+
+def sweep(start, ends, steps):
+    """
+    Sample straight paths from one start to many ends.
+    start: (2,), ends: (K, 2) -> (K, steps, 2), including both endpoints.
+    """
+    start = np.asarray(start, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    t = np.linspace(0.0, 1.0, steps)[None, :, None]
+    return start + (ends[:, None, :] - start) * t
+
+def bilinear(table, origin, step, u, v):
+    """
+    Bilinear lookup in a dense grid, clamped at the edges.
+    table: (NU, NV, C) values sampled at u = origin[0] + i*step[0], v = origin[1] + j*step[1]
+    u, v: scalars or (N,) arrays -> (..., C)
+    """
+    nu, nv = table.shape[0], table.shape[1]
+    fu = np.clip((np.asarray(u, dtype=float) - origin[0]) / step[0], 0, nu - 1)
+    fv = np.clip((np.asarray(v, dtype=float) - origin[1]) / step[1], 0, nv - 1)
+    i0 = np.minimum(fu.astype(np.intp), nu - 2)
+    j0 = np.minimum(fv.astype(np.intp), nv - 2)
+    du = (fu - i0)[..., None]
+    dv = (fv - j0)[..., None]
+    return ((table[i0, j0] * (1 - du) + table[i0 + 1, j0] * du) * (1 - dv) +
+            (table[i0, j0 + 1] * (1 - du) + table[i0 + 1, j0 + 1] * du) * dv)
+
+def convex_hull(points):
+    """Convex hull of (N, 2) points, counter-clockwise (y up) as (M, 2). Fewer than 3 distinct points -> as is."""
+    pts = sorted(set(map(tuple, np.asarray(points, dtype=float).tolist())))
+    if len(pts) < 3: return np.array(pts, dtype=float).reshape(-1, 2)
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for p in pts:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0: lower.pop()
+        lower.append(p)
+    for p in reversed(pts):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0: upper.pop()
+        upper.append(p)
+    return np.array(lower[:-1] + upper[:-1], dtype=float)
+
+def in_hull(hull, x, y, margin=0.0):
+    """True if (x, y) lies inside the convex hull (from convex_hull) or within `margin` of it."""
+    if len(hull) < 3: return False
+    a = hull
+    e = np.roll(hull, -1, axis=0) - a
+    # Signed distance to every edge line (positive inside for a counter-clockwise hull)
+    dist = (e[:, 0] * (y - a[:, 1]) - e[:, 1] * (x - a[:, 0])) / np.hypot(e[:, 0], e[:, 1])
+    return bool((dist >= -margin).all())
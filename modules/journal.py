@@ -0,0 +1,120 @@
+import json
+import os
+
+import numpy as np
+
+def atomic_write_json(path, data, indent=None):
+    """Write JSON to a temp file in the same directory, fsync, then rename over the target."""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class Journal:
+    """
+    Append-only JSON Lines log. One flushed line per entry (O(1) per append).
+    A torn last line (power loss mid-write) is skipped on replay.
+    Each journal file starts with a generation header; a snapshot records the generation that
+    follows it, so a journal that was compacted but not yet removed (power loss between the
+    snapshot write and truncate()) is recognized and dropped instead of replayed twice.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = 0
+        self.f = None
+        self.torn = False
+        self.generation = 0 # Files without a header (older versions) are generation 0
+
+    def replay(self, generation=0):
+        """Entries not compacted yet. `generation` is the one recorded in the snapshot."""
+        entries = []
+        file_gen = 0
+        if not os.path.exists(self.path):
+            self.generation = generation
+            return entries
+        with open(self.path, 'r') as f:
+            for line in f:
+                # Unterminated last line: terminate it before the next append
+                self.torn = not line.endswith('\n')
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    print(f"[Journal] Skipping corrupt entry in {self.path}")
+                    continue
+                if entry.get('op') == 'gen':
+                    file_gen = entry.get('gen', 0)
+                else:
+                    entries.append(entry)
+        if file_gen < generation:
+            print(f"[Journal] {self.path} (generation {file_gen}) already compacted, dropping {len(entries)} entries")
+            self.truncate(generation)
+            return []
+        self.generation = file_gen
+        self.entries = len(entries)
+        return entries
+
+    def append(self, entry):
+        if self.f is None:
+            fresh = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self.f = open(self.path, 'a')
+            if self.torn:
+                self.f.write('\n')
+                self.torn = False
+            if fresh:
+                self.f.write(json.dumps({"op": "gen", "gen": self.generation}) + '\n')
+        self.f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self.f.flush()
+        self.entries += 1
+
+    def truncate(self, generation=None):
+        """Called after the entries were compacted into a snapshot (that recorded `generation`)."""
+        if generation is not None:
+            self.generation = generation
+        if self.f:
+            self.f.close()
+            self.f = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entries = 0
+
+class SampleStore:
+    """
+    Calibration samples as growable column arrays (pan, tilt, x, y, ts) + type labels.
+    fit() reads the columns directly; amortized O(1) append (capacity doubling).
+    """
+    FIELDS = ('pan', 'tilt', 'x', 'y', 'ts')
+
+    def __init__(self, capacity=256):
+        self.n = 0
+        self.data = np.empty((len(self.FIELDS), capacity))
+        self.types = []
+
+    def __len__(self):
+        return self.n
+
+    def append(self, pan, tilt, x, y, ts, sample_type="general"):
+        if self.n == self.data.shape[1]:
+            grown = np.empty((self.data.shape[0], self.n * 2))
+            grown[:, :self.n] = self.data[:, :self.n]
+            self.data = grown
+        self.data[:, self.n] = (pan, tilt, x, y, ts)
+        self.types.append(sample_type)
+        self.n += 1
+
+    def extend(self, samples):
+        for s in samples:
+            self.append(s['pan'], s['tilt'], s['x'], s['y'], s.get('ts', 0.0), s.get('type', 'general'))
+
+    def clear(self):
+        self.n = 0
+        self.types = []
+
+    def column(self, name):
+        """View (no copy) of one field for the current samples."""
+        return self.data[self.FIELDS.index(name), :self.n]
+
+    def to_list(self):
+        rows = self.data[:, :self.n].T.tolist()
+        return [dict(zip(self.FIELDS, row), type=t) for row, t in zip(rows, self.types)]
@@ -0,0 +1,111 @@
+import time
+import threading
+
+from . import metrics
+
+MESSAGES = metrics.counter('laser_joystick_messages_total', 'joystick_control messages received')
+MOVES = metrics.counter('laser_joystick_moves_total', 'Servo moves issued by the joystick integrator')
+
+"""
+Server-side joystick integration.
+Clients send the axis state only when it changes (plus a slow keep-alive while held); the latest
+vector per controller is integrated on a fixed-rate loop into a servo velocity (deg/s) with an
+acceleration limit. Speed no longer depends on the client's send rate or on Wi-Fi burstiness,
+and a controller that goes silent for deadman_ms is treated as released.
+"""
+class JoystickIntegrator:
+    def __init__(self, config_data, servos, is_enabled, on_move=None):
+        self.config = config_data.get('joystick', {})
+        self.servos = servos
+        self.is_enabled = is_enabled # () -> bool, e.g. AutoPilot in MANUAL
+        self.on_move = on_move # (pan, tilt), throttled to state_hz
+
+        self.rate_hz = self.config.get('rate_hz', 50)
+        self.max_speed = self.config.get('max_speed_dps', 50.0)
+        self.accel = self.config.get('accel_dps2', 400.0)
+        self.deadzone = self.config.get('deadzone', 0.1)
+        self.deadman = self.config.get('deadman_ms', 500) / 1000.0
+        self.state_interval = 1.0 / self.config.get('state_hz', 10)
+
+        self.controllers = {} # sid -> (pan_axis, tilt_axis, last_seen)
+        self.velocity = [0.0, 0.0] # deg/s (pan, tilt)
+        self.wake = threading.Event()
+        self.last_state = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+
+    def set_axes(self, sid, pan_axis, tilt_axis):
+        MESSAGES.inc()
+        pan_axis = max(-1.0, min(1.0, float(pan_axis or 0)))
+        tilt_axis = max(-1.0, min(1.0, float(tilt_axis or 0)))
+        if abs(pan_axis) < self.deadzone: pan_axis = 0.0
+        if abs(tilt_axis) < self.deadzone: tilt_axis = 0.0
+        controllers = dict(self.controllers) # Copy-on-write: the loop iterates the old dict
+        controllers[sid] = (pan_axis, tilt_axis, time.time())
+        self.controllers = controllers
+        self.wake.set()
+
+    def release(self, sid):
+        if sid in self.controllers:
+            controllers = dict(self.controllers)
+            controllers.pop(sid, None)
+            self.controllers = controllers
+
+    def _target(self, now):
+        """Velocity target from the most recent live controller (last input wins)."""
+        live = [c for c in self.controllers.values() if now - c[2] <= self.deadman]
+        if not live: return 0.0, 0.0
+        pan_axis, tilt_axis, _ = max(live, key=lambda c: c[2])
+        # Stick right -> pan decreases, stick down -> tilt increases (matches the gimbal mounting)
+        return -pan_axis * self.max_speed, tilt_axis * self.max_speed
+
+    def _loop(self):
+        dt = 1.0 / self.rate_hz
+        while self.running:
+            try:
+                now = time.time()
+                self.wake.clear()
+                if not self.is_enabled():
+                    # AutoPilot owns the servos: stop dead, no coasting
+                    self.velocity = [0.0, 0.0]
+                    target = (0.0, 0.0)
+                else:
+                    target = self._target(now)
+                if target == (0.0, 0.0) and self.velocity == [0.0, 0.0]:
+                    # Nothing to integrate (released, timed out or not MANUAL): sleep until the next message
+                    self.wake.wait()
+                    continue
+
+                step = self.accel * dt
+                for i in (0, 1):
+                    dv = target[i] - self.velocity[i]
+                    self.velocity[i] += max(-step, min(step, dv))
+                    if abs(self.velocity[i]) < 1e-3 and target[i] == 0.0: self.velocity[i] = 0.0
+
+                d_pan, d_tilt = self.velocity[0] * dt, self.velocity[1] * dt
+                if d_pan or d_tilt:
+                    pan, tilt = self.servos.move_relative(d_pan, d_tilt, ignore_limits=True)
+                    MOVES.inc()
+                    if self.on_move and now - self.last_state >= self.state_interval:
+                        self.last_state = now
+                        self.on_move(pan, tilt)
+            except Exception as e:
+                print(f"[Joystick] Loop Error: {e}")
+            time.sleep(dt)
+
+    def status(self):
+        now = time.time()
+        return {
+            "controllers": sum(1 for c in self.controllers.values() if now - c[2] <= self.deadman),
+            "velocity_dps": [round(v, 1) for v in self.velocity]
+        }
@@ -0,0 +1,55 @@
+import sys
+
+import numpy as np
+
+class LabelTable:
+    """
+    Label / class filtering compiled once at load time.
+    - names[k]          : interned label string (shared by every detection dict)
+    - label_index[cid]  : k into names, -1 if the model class id has no label
+    - is_target[cid]    : passes the target_classes filter (role 'target')
+    - allowed[cid]      : target or safety-relevant class (role 'safety'), kept by the detector
+    The last slot is a sentinel for out-of-range class ids (negative or too large, mapped there).
+    """
+
+    def __init__(self, labels, target_classes, safety_classes=()):
+        targets = {t.lower() for t in target_classes}
+        # Empty list or 'all' -> allow everything
+        self.allow_all = not targets or 'all' in targets
+        self.targets = targets
+        self.safety = {c.lower() for c in safety_classes}
+
+        size = (max(labels) + 1 if labels else 0) + 1
+        self.size = size
+        self.unknown = size - 1
+
+        names = []
+        self.label_index = np.full(size, -1, dtype=np.intp)
+        self.is_target = np.full(size, self.allow_all, dtype=bool)
+        for cid, label in labels.items():
+            if cid < 0: continue
+            self.label_index[cid] = len(names)
+            names.append(sys.intern(label))
+            if not self.allow_all:
+                self.is_target[cid] = label.lower() in targets
+        self.names = tuple(names)
+
+        self.allowed = self.is_target.copy()
+        for cid, label in labels.items():
+            if cid >= 0 and label.lower() in self.safety:
+                self.allowed[cid] = True
+
+    def lookup(self, classes):
+        """Model class output (float array) -> int class ids, garbage ids -> the unknown sentinel.
+        (Clipping would send negative ids to class 0, which is 'person' in COCO.)"""
+        cids = classes.astype(np.intp)
+        return np.where((cids < 0) | (cids >= self.unknown), self.unknown, cids)
+
+    def role(self, cid):
+        # is_target[cid] is a numpy.bool_, which cannot index a tuple under NumPy 2
+        return 'target' if self.is_target[cid] else 'safety'
+
+    def name(self, cid, raw_id=None):
+        k = self.label_index[cid]
+        if k < 0: return f"unknown_{cid if raw_id is None else raw_id}"
+        return self.names[k]
@@ -1,14 +1,16 @@
-from gpiozero import LED
-from gpiozero.pins.pigpio import PiGPIOFactory
-
 PIN_LASER = 18
 
 class LaserController:
     def __init__(self, factory=None):
         self.laser = None
+        self.state = False
         if factory:
-            self.laser = LED(PIN_LASER, pin_factory=factory)
-            self.laser.off()
+            self.connect(factory)
+
+    def connect(self, factory):
+        from gpiozero import LED
+        self.laser = LED(PIN_LASER, pin_factory=factory)
+        self.laser.off()
         self.state = False
 
     def on(self):
@@ -0,0 +1,74 @@
+import io
+import logging
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+class LaserDotDetector:
+    """
+    Finds the red laser dot in a JPEG frame.
+    - Decodes at 1/scale resolution (JPEG DCT scaling), so it is cheap enough to run per frame.
+    - Score = red dominance (R - (G+B)/2) + brightness of R, vectorized over the whole frame.
+    - Optional background score map (laser OFF frame) is subtracted to ignore red objects in the scene.
+    - Sub-pixel centroid around the peak, mapped back to full-frame pixels.
+    """
+    def __init__(self, config=None):
+        config = config or {}
+        self.scale = config.get('scale', 4)
+        self.min_score = config.get('min_score', 60)
+        self.peak_ratio = config.get('peak_ratio', 0.7)
+        self.window = config.get('window_px', 4)
+        self.max_blob_px = config.get('max_blob_px', 200)
+        self.background = None
+
+    def _score_map(self, frame):
+        stream = io.BytesIO(frame) if isinstance(frame, (bytes, bytearray)) else frame
+        image = Image.open(stream)
+        full_w, full_h = image.size
+        image.draft('RGB', (full_w // self.scale, full_h // self.scale))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        rgb = np.asarray(image).astype(np.int16)
+        r = rgb[..., 0]
+        score = (2 * r - rgb[..., 1] - rgb[..., 2]) // 2 + (r >> 1)
+        return score, (full_w / rgb.shape[1], full_h / rgb.shape[0])
+
+    def set_background(self, frame):
+        """Capture a laser-OFF reference frame (camera must be static)."""
+        self.background, _ = self._score_map(frame)
+
+    def clear_background(self):
+        self.background = None
+
+    def detect(self, frame):
+        """Returns (x, y, score) in full-frame pixels, or None if no dot is visible."""
+        score, (sx, sy) = self._score_map(frame)
+        if self.background is not None and self.background.shape == score.shape:
+            score = score - self.background
+
+        peak = int(np.argmax(score))
+        py, px = divmod(peak, score.shape[1])
+        peak_val = int(score[py, px])
+        if peak_val < self.min_score:
+            return None
+
+        # Too many strong pixels -> reflection / red object, not a dot
+        strong = score >= peak_val * self.peak_ratio
+        if np.count_nonzero(strong) > self.max_blob_px:
+            return None
+
+        # Weighted centroid in a small window around the peak
+        w = self.window
+        y1, y2 = max(0, py - w), min(score.shape[0], py + w + 1)
+        x1, x2 = max(0, px - w), min(score.shape[1], px + w + 1)
+        weights = np.where(strong[y1:y2, x1:x2], score[y1:y2, x1:x2], 0).astype(float)
+        total = weights.sum()
+        ys, xs = np.mgrid[y1:y2, x1:x2]
+        cx = (xs * weights).sum() / total
+        cy = (ys * weights).sum() / total
+
+        # Pixel centers back to full resolution
+        return (float((cx + 0.5) * sx), float((cy + 0.5) * sy), peak_val)
@@ -0,0 +1,308 @@
+import time
+import threading
+import logging
+from collections import deque
+
+import numpy as np
+
+from .preprocess import InputPreprocessor
+from . import metrics
+from .startup import offload
+
+logger = logging.getLogger(__name__)
+
+PREPROCESS_SECONDS = metrics.histogram('laser_preprocess_seconds', 'Resize / normalize into the input tensor')
+INVOKE_SECONDS = metrics.histogram('laser_invoke_seconds', 'Interpreter invoke incl. output tensor reads')
+
+class LoadedModel:
+    """
+    One TFLite interpreter (CPU or Edge TPU) with its tensor mapping and latency stats.
+    invoke() is serialized per model; different models can run/warm concurrently.
+    """
+    def __init__(self, spec):
+        self.name = spec['name']
+        self.path = spec.get('path')
+        self.backend = spec.get('backend', 'cpu')
+        self.delegate_path = spec.get('delegate', 'libedgetpu.so.1')
+
+        self.state = 'idle' # idle, loading, ready, failed
+        self.error = None
+        self.loaded_at = 0
+        self.warm_ms = 0.0
+
+        self.interpreter = None
+        self.input_details = None
+        self.output_details = None
+        self.input_index = None
+        self.input_dtype = None
+        self.height = 300
+        self.width = 300
+        self.idx_boxes = -1
+        self.idx_classes = -1
+        self.idx_scores = -1
+        self.preprocessor = None
+        self.lock = threading.Lock()
+
+        # Stats
+        self.invokes = 0
+        self.errors = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.recent_ms = deque(maxlen=256)
+
+    def load(self, tflite):
+        if not self.path:
+            raise ValueError(f"Model '{self.name}' has no path")
+
+        if self.backend == 'tpu':
+            logger.info(f"[{self.name}] Loading TPU Delegate: {self.delegate_path}")
+            delegate = tflite.load_delegate(self.delegate_path)
+            interpreter = tflite.Interpreter(model_path=self.path, experimental_delegates=[delegate])
+        else:
+            interpreter = tflite.Interpreter(model_path=self.path)
+
+        interpreter.allocate_tensors()
+        self.input_details = interpreter.get_input_details()
+        self.output_details = interpreter.get_output_details()
+
+        # Log Input Details
+        logger.info(f"[{self.name}] Input: Shape={self.input_details[0]['shape']}, Dtype={self.input_details[0]['dtype']}")
+        self.input_index = self.input_details[0]['index']
+        self.input_dtype = self.input_details[0]['dtype']
+        self.height = self.input_details[0]['shape'][1]
+        self.width = self.input_details[0]['shape'][2]
+        self.preprocessor = InputPreprocessor(self.input_index, self.input_details[0]['shape'], self.input_dtype)
+
+        for d in self.output_details:
+            logger.info(f"[{self.name}] Output: Idx={d['index']}, Shape={d['shape']}, Dtype={d['dtype']}")
+
+        # Standard SSD postprocess order: Locations(0), Classes(1), Scores(2), Count(3)
+        self.idx_boxes = self.output_details[0]['index']
+        self.idx_classes = self.output_details[1]['index']
+        self.idx_scores = self.output_details[2]['index']
+        logger.info(f"[{self.name}] Mapped Outputs: Box={self.idx_boxes}, Class={self.idx_classes}, Score={self.idx_scores}")
+
+        self.interpreter = interpreter
+
+    def warm(self):
+        """Dummy invoke so the first real frame does not pay delegate/kernels setup."""
+        start = time.time()
+        dummy = np.zeros(self.input_details[0]['shape'], dtype=self.input_dtype)
+        with self.lock:
+            self.interpreter.set_tensor(self.input_index, dummy)
+            self.interpreter.invoke()
+        self.warm_ms = (time.time() - start) * 1000
+
+    def invoke(self, image):
+        """Preprocess a PIL RGB image into the input tensor and run one inference.
+        Returns (boxes, classes, scores) for the first batch item."""
+        start = time.time()
+        with self.lock:
+            t0 = metrics.now()
+            self.preprocessor.write(self.interpreter, image)
+            t1 = metrics.now()
+            self.interpreter.invoke()
+            boxes = self.interpreter.get_tensor(self.idx_boxes)[0]
+            classes = self.interpreter.get_tensor(self.idx_classes)[0]
+            scores = self.interpreter.get_tensor(self.idx_scores)[0]
+            t2 = metrics.now()
+        PREPROCESS_SECONDS.observe(t1 - t0)
+        INVOKE_SECONDS.observe(t2 - t1)
+        self._record((time.time() - start) * 1000)
+        return boxes, classes, scores
+
+    def _record(self, ms):
+        self.invokes += 1
+        self.last_ms = ms
+        if ms > self.max_ms: self.max_ms = ms
+        self.recent_ms.append(ms)
+
+    def stats(self):
+        recent = np.array(self.recent_ms) if self.recent_ms else None
+        return {
+            "name": self.name,
+            "backend": self.backend,
+            "path": self.path,
+            "state": self.state,
+            "error": self.error,
+            "input_size": [int(self.width), int(self.height)],
+            "warm_ms": round(self.warm_ms, 1),
+            "invokes": self.invokes,
+            "errors": self.errors,
+            "last_ms": round(self.last_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": round(float(np.percentile(recent, 50)), 2) if recent is not None else None,
+            "p95_ms": round(float(np.percentile(recent, 95)), 2) if recent is not None else None
+        }
+
+class ModelManager:
+    """
+    Registry of detector models with background loading, warm standby and atomic hot-swap.
+    - `active` is a plain reference; readers grab it once per frame, swaps are a single assignment.
+    - report_failure() fails over to the best ready standby immediately and retries the
+      failed model in the background (e.g. Coral USB unplugged / re-plugged).
+    """
+    def __init__(self, specs, tflite, preferred=None, retry_sec=5.0, on_failover=None):
+        self.tflite = tflite
+        self.models = {}
+        self.order = []
+        for spec in specs:
+            self.models[spec['name']] = LoadedModel(spec)
+            self.order.append(spec['name'])
+
+        self.preferred = preferred or (self.order[0] if self.order else None)
+        self.retry_sec = retry_sec
+        self.on_failover = on_failover
+        self.active = None
+        self.failovers = 0
+        self.retrying = set()
+        self.lock = threading.Lock()
+
+    # --- Loading ---
+    def load(self, name):
+        """Synchronously load + warm a model. Returns it, or None on failure."""
+        model = self.models[name]
+        with self.lock:
+            if model.state in ('ready', 'loading'):
+                return model if model.state == 'ready' else None
+            model.state = 'loading'
+
+        try:
+            start = time.time()
+            model.load(self.tflite)
+            model.warm()
+            model.error = None
+            model.loaded_at = time.time()
+            model.state = 'ready'
+            logger.info(f"[Models] '{name}' ready in {(time.time() - start) * 1000:.0f}ms (warm {model.warm_ms:.1f}ms)")
+            return model
+        except Exception as e:
+            model.interpreter = None
+            model.error = str(e)
+            model.state = 'failed'
+            logger.error(f"[Models] '{name}' load failed: {e}")
+            return None
+
+    def load_async(self, name, activate=False):
+        def _run():
+            # Interpreter / delegate / allocate_tensors / warm invoke are blocking C calls: on the
+            # native threadpool, otherwise this greenlet would freeze the safety loop meanwhile
+            if offload(self.load, name) and activate:
+                self.activate(name)
+        threading.Thread(target=_run, daemon=True).start()
+
+    def load_initial(self, fallback_backend=None):
+        """Startup: preferred model first, then any model of the fallback backend."""
+        if self.preferred and self.load(self.preferred):
+            self.activate(self.preferred)
+            return self.active
+
+        for name in self.order:
+            if name == self.preferred: continue
+            if fallback_backend and self.models[name].backend != fallback_backend: continue
+            if self.load(name):
+                self.activate(name)
+                logger.warning(f"[Models] Preferred '{self.preferred}' unavailable. Using '{name}'")
+                return self.active
+        return None
+
+    def start(self, fallback_backend=None, warm_standby=True):
+        """
+        Background work after load_initial (which stays thread-free so it can run in a worker pool):
+        retry the preferred model if we started on a fallback, and warm the standby models.
+        """
+        active = self.active
+        if self.preferred and active and active.name != self.preferred:
+            self._schedule_retry(self.preferred)
+        if warm_standby:
+            self.warm_standby(fallback_backend)
+
+    def warm_standby(self, fallback_backend=None):
+        """Load the standby models in the background so failover does not pay load time."""
+        for name in self.order:
+            model = self.models[name]
+            if model.state != 'idle': continue
+            if fallback_backend and model.backend != fallback_backend: continue
+            self.load_async(name)
+
+    # --- Swapping ---
+    def activate(self, name):
+        """Atomically switch the active model. Loads it in the background first if needed."""
+        if name not in self.models:
+            return {"success": False, "msg": f"Unknown model '{name}'"}
+
+        model = self.models[name]
+        if model.state != 'ready':
+            self.load_async(name, activate=True)
+            return {"success": True, "msg": f"Loading '{name}'", "state": "loading"}
+
+        prev = self.active
+        self.active = model
+        if prev is not model:
+            logger.info(f"[Models] Active: {prev.name if prev else None} -> {name}")
+        return {"success": True, "active": name}
+
+    def report_failure(self, model, error):
+        """Called from the inference path when invoke() raises."""
+        model.errors += 1
+        if model.state != 'ready': return
+
+        model.state = 'failed'
+        model.error = str(error)
+        model.interpreter = None
+        logger.error(f"[Models] '{model.name}' failed at runtime: {error}")
+
+        standby = self._best_standby(exclude=model.name)
+        if self.active is model:
+            self.active = standby
+            self.failovers += 1
+            logger.warning(f"[Models] Failover: {model.name} -> {standby.name if standby else None}")
+            if self.on_failover:
+                try:
+                    self.on_failover(model.name, standby.name if standby else None)
+                except Exception as e:
+                    logger.error(f"[Models] Failover callback error: {e}")
+
+        if not standby:
+            # Nothing warm, load whatever else we have
+            for name in self.order:
+                if name != model.name and self.models[name].state in ('idle', 'failed'):
+                    self.load_async(name, activate=True)
+                    break
+
+        self._schedule_retry(model.name)
+
+    def _best_standby(self, exclude=None):
+        # Config order is priority order
+        for name in self.order:
+            m = self.models[name]
+            if name != exclude and m.state == 'ready':
+                return m
+        return None
+
+    def _schedule_retry(self, name):
+        if name in self.retrying: return
+        self.retrying.add(name)
+
+        def _retry():
+            delay = self.retry_sec
+            try:
+                while self.models[name].state != 'ready':
+                    time.sleep(delay)
+                    if offload(self.load, name):
+                        # Prefer the original model again once it is back
+                        if name == self.preferred:
+                            self.activate(name)
+                        return
+                    delay = min(delay * 2, 60.0)
+            finally:
+                self.retrying.discard(name)
+        threading.Thread(target=_retry, daemon=True).start()
+
+    def stats(self):
+        return {
+            "active": self.active.name if self.active else None,
+            "preferred": self.preferred,
+            "failovers": self.failovers,
+            "models": [self.models[n].stats() for n in self.order]
+        }
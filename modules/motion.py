@@ -0,0 +1,162 @@
+import time
+import math
+import logging
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+class MotionDetector:
+    """
+    Cheap frame-difference motion detector.
+    Decodes only the luma (Y) plane of the JPEG at 1/8 scale (libjpeg DCT scaling via draft mode),
+    so the cost is a small fraction of a full RGB decode.
+    Mask coordinates are on a coarse grid; use motion_in() with frame pixel rects.
+    """
+    def __init__(self, config):
+        self.grid_w = config.get('grid_w', 80)
+        self.grid_h = config.get('grid_h', 60)
+        self.pixel_threshold = config.get('pixel_threshold', 18)
+        self.min_changed = config.get('min_changed_px', 4)
+
+        self.prev = None
+        self.mask = np.zeros((self.grid_h, self.grid_w), dtype=bool)
+        self.frame_size = (640, 480)
+        self.changed_px = 0
+        self.moving = False
+        self.last_motion_time = 0
+
+    def update(self, stream):
+        """Feed a JPEG stream (file-like). Returns True if the scene moved since the previous frame."""
+        image = Image.open(stream)
+        self.frame_size = image.size
+        image.draft('L', (image.size[0] // 8, image.size[1] // 8))
+        gray = image.convert('L')
+        if gray.size != (self.grid_w, self.grid_h):
+            gray = gray.resize((self.grid_w, self.grid_h), Image.NEAREST)
+
+        cur = np.asarray(gray, dtype=np.int16)
+        if self.prev is None:
+            self.prev = cur
+            return False
+
+        np.greater(np.abs(cur - self.prev), self.pixel_threshold, out=self.mask)
+        self.prev = cur
+
+        self.changed_px = int(np.count_nonzero(self.mask))
+        self.moving = self.changed_px >= self.min_changed
+        if self.moving:
+            self.last_motion_time = time.time()
+        return self.moving
+
+    def motion_in(self, rect, min_px=1):
+        """Check changed cells inside rect [x1, y1, x2, y2] (frame pixels)."""
+        if not self.moving or rect is None: return False
+
+        fw, fh = self.frame_size
+        sx = self.grid_w / fw
+        sy = self.grid_h / fh
+        x1 = max(0, int(rect[0] * sx))
+        y1 = max(0, int(rect[1] * sy))
+        x2 = min(self.grid_w, int(math.ceil(rect[2] * sx)))
+        y2 = min(self.grid_h, int(math.ceil(rect[3] * sy)))
+        if x2 <= x1 or y2 <= y1: return False
+
+        return np.count_nonzero(self.mask[y1:y2, x1:x2]) >= min_px
+
+class InferenceScheduler:
+    """
+    Adaptive inference rate driven by MotionDetector.
+    - Static scene        -> idle_fps (floor)
+    - Motion anywhere     -> inference_fps (base)
+    - Motion near laser   -> boost_fps
+    - Motion in danger    -> run immediately
+    Elevated rates are held for hold_sec after motion stops.
+    Rate caps (power / thermal) bound every rate except the danger-zone immediate run.
+    A rate or cap of 0 pauses inference (only danger-zone motion still runs).
+    """
+    def __init__(self, config, base_fps):
+        self.base_fps = base_fps
+        self.idle_fps = config.get('idle_fps', 2)
+        self.boost_fps = config.get('boost_fps', base_fps * 1.5)
+        self.hold_sec = config.get('hold_sec', 1.5)
+        self.roi_pad = config.get('roi_pad_px', 60)
+        self.danger_min_px = config.get('danger_min_px', 2)
+
+        # Zones pushed by AutoPilot (frame pixels)
+        self.roi = None
+        self.danger_zones = []
+
+        self.last_run = 0
+        self.base_until = 0
+        self.boost_until = 0
+        self.rate_fps = self.idle_fps
+        self.reason = 'idle'
+        self.caps = {} # source -> max fps
+
+    def set_cap(self, source, fps):
+        """Limit the inference rate on behalf of `source` (None removes the cap)."""
+        caps = dict(self.caps) # Copy-on-write: should_run may be iterating on another thread
+        if fps is None:
+            caps.pop(source, None)
+        else:
+            caps[source] = fps
+        self.caps = caps
+
+    def set_zones(self, roi_bbox, danger_zones):
+        if roi_bbox:
+            p = self.roi_pad
+            roi_bbox = [roi_bbox[0] - p, roi_bbox[1] - p, roi_bbox[2] + p, roi_bbox[3] + p]
+        self.roi = roi_bbox
+        self.danger_zones = danger_zones or []
+
+    def should_run(self, now, motion):
+        """Decide whether the current frame gets an inference pass."""
+        if motion is None:
+            # Motion gating disabled: fixed rate
+            self.rate_fps = self.base_fps
+            self.reason = 'fixed'
+        elif motion.moving:
+            for zone in self.danger_zones:
+                if motion.motion_in(zone, self.danger_min_px):
+                    self.reason = 'danger'
+                    self.rate_fps = self.boost_fps
+                    self.boost_until = now + self.hold_sec
+                    self.last_run = now
+                    return True
+
+            if motion.motion_in(self.roi):
+                self.boost_until = now + self.hold_sec
+            else:
+                self.base_until = now + self.hold_sec
+
+        if motion is not None:
+            if now < self.boost_until:
+                self.rate_fps = self.boost_fps
+                self.reason = 'roi'
+            elif now < self.base_until:
+                self.rate_fps = self.base_fps
+                self.reason = 'motion'
+            else:
+                self.rate_fps = self.idle_fps
+                self.reason = 'idle'
+
+        if self.caps:
+            cap = min(self.caps.values())
+            if self.rate_fps > cap:
+                self.rate_fps = cap
+                self.reason = f"{self.reason} (capped)"
+
+        # A rate <= 0 (idle_fps / a cap of 0) pauses inference; danger-zone motion above still runs
+        if self.rate_fps <= 0 or now - self.last_run < 1.0 / self.rate_fps:
+            return False
+        self.last_run = now
+        return True
+
+    def status(self):
+        return {
+            "rate_fps": self.rate_fps,
+            "reason": self.reason,
+            "caps": dict(self.caps)
+        }
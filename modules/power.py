@@ -0,0 +1,132 @@
+import time
+import threading
+
+"""
+Presence-driven power manager.
+ACTIVE -> IDLE after idle_after_min without a cat (target detection) or user activity:
+    camera fps capped, inference on a sparse schedule, servos detached,
+    AutoPilot suspended, status broadcast paused.
+IDLE -> ACTIVE as soon as a cat is detected (within one sparse inference interval)
+or the user does something (wake()).
+Inhibitors (e.g. a running calibration sweep) keep it ACTIVE while they return True.
+"""
+class PowerManager:
+    SOURCE = 'power' # Rate cap owner name (camera / detector)
+
+    def __init__(self, config_data, servos, laser, autopilot, get_detector, get_camera):
+        self.config = config_data.get('power', {})
+        self.servos = servos
+        self.laser = laser
+        self.autopilot = autopilot
+        # Detector / camera are created by the startup tasks, look them up on use
+        self.get_detector = get_detector
+        self.get_camera = get_camera
+
+        self.enabled = self.config.get('enabled', True)
+        self.idle_after = self.config.get('idle_after_min', 10) * 60.0
+        self.idle_camera_fps = self.config.get('idle_camera_fps', 2)
+        self.idle_inference_fps = self.config.get('idle_inference_fps', 1)
+        self.detach_servos = self.config.get('detach_servos', True)
+        self.poll_s = self.config.get('poll_s', 0.25)
+
+        self.lock = threading.Lock()
+        self.state = 'ACTIVE'
+        self.last_presence = time.time()
+        self.idle_since = None
+        self.last_wake_reason = None
+        self.inhibitors = {} # name -> () -> bool
+        self.running = False
+        self.thread = None
+
+    @property
+    def idle(self):
+        return self.state == 'IDLE'
+
+    def start(self):
+        if self.running or not self.enabled: return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def add_inhibitor(self, name, fn):
+        """fn() -> True while `name` needs the system awake (servos attached, full frame rate)."""
+        inhibitors = dict(self.inhibitors) # Copy-on-write: the loop iterates the old dict
+        inhibitors[name] = fn
+        self.inhibitors = inhibitors
+
+    def _inhibited(self):
+        return next((name for name, fn in self.inhibitors.items() if fn()), None)
+
+    def touch(self, reason='activity'):
+        """User / client activity: keeps the system awake (and wakes it if idle)."""
+        self.last_presence = time.time()
+        if self.idle:
+            self.wake(reason)
+
+    def _loop(self):
+        while self.running:
+            try:
+                now = time.time()
+                # Only a cat (role 'target') counts as presence; a person / dog walking by must not keep us awake
+                dets = self.get_detector().get_latest_detections()
+                inhibitor = self._inhibited()
+                if any(d.get('role') == 'target' for d in dets):
+                    self.last_presence = now
+                    if self.idle:
+                        self.wake('detection')
+                elif inhibitor:
+                    # Counts as activity: the idle timer starts over once it is done
+                    self.last_presence = now
+                    if self.idle:
+                        self.wake(inhibitor)
+                elif not self.idle and now - self.last_presence > self.idle_after:
+                    self._enter_idle()
+            except Exception as e:
+                print(f"[Power] Loop Error: {e}")
+            time.sleep(self.poll_s)
+
+    def _enter_idle(self):
+        with self.lock:
+            if self.idle: return
+            self.state = 'IDLE'
+            self.idle_since = time.time()
+
+        self.autopilot.suspend()
+        self.laser.off()
+        if self.detach_servos:
+            self.servos.detach()
+        camera = self.get_camera()
+        if camera:
+            camera.set_fps_cap(self.SOURCE, self.idle_camera_fps)
+        self.get_detector().set_rate_cap(self.SOURCE, self.idle_inference_fps)
+        print(f"[Power] IDLE (no presence for {self.idle_after:.0f}s)")
+
+    def wake(self, reason='manual'):
+        with self.lock:
+            if not self.idle: return
+            self.state = 'ACTIVE'
+            self.last_wake_reason = reason
+            self.last_presence = time.time()
+
+        # Full rate first, then motors, then behaviour
+        self.get_detector().set_rate_cap(self.SOURCE, None)
+        camera = self.get_camera()
+        if camera:
+            camera.set_fps_cap(self.SOURCE, None)
+        if self.detach_servos:
+            self.servos.attach()
+        self.autopilot.resume()
+        print(f"[Power] ACTIVE (wake: {reason}, idle {time.time() - self.idle_since:.0f}s)")
+
+    def status(self):
+        return {
+            "state": self.state,
+            "enabled": self.enabled,
+            "idle_in_s": None if self.idle else max(0, round(self.idle_after - (time.time() - self.last_presence))),
+            "idle_for_s": round(time.time() - self.idle_since) if self.idle else None,
+            "last_wake": self.last_wake_reason,
+            "inhibited_by": self._inhibited()
+        }
@@ -0,0 +1,49 @@
+import numpy as np
+
+class InputPreprocessor:
+    """
+    Writes a decoded RGB frame straight into the interpreter's input tensor.
+    - Resize: nearest-neighbour gather with a precomputed flat index map (cached per source size).
+    - uint8 models: gather lands directly in the input buffer (no intermediate array).
+    - float32 models: gather into a preallocated scratch, normalize in place into the input buffer.
+    Views from interpreter.tensor() are never held across invoke().
+    """
+    def __init__(self, input_index, shape, dtype):
+        self.input_index = input_index
+        self.height = int(shape[1])
+        self.width = int(shape[2])
+        self.dtype = dtype
+        self.index_maps = {}
+        self.normalize = dtype == np.float32
+        self.scratch = None
+        if dtype != np.uint8:
+            self.scratch = np.empty((self.height * self.width, 3), dtype=np.uint8)
+
+    def _index_map(self, src_w, src_h):
+        key = (src_w, src_h)
+        idx = self.index_maps.get(key)
+        if idx is None:
+            # Sample pixel centers
+            rows = ((np.arange(self.height) + 0.5) * (src_h / self.height)).astype(np.intp)
+            cols = ((np.arange(self.width) + 0.5) * (src_w / self.width)).astype(np.intp)
+            idx = (rows[:, None] * src_w + cols[None, :]).ravel()
+            self.index_maps[key] = idx
+        return idx
+
+    def write(self, interpreter, image):
+        """image: PIL RGB image (any size). Caller must hold the interpreter lock."""
+        src = np.asarray(image)
+        src_h, src_w = src.shape[:2]
+        idx = self._index_map(src_w, src_h)
+
+        out = interpreter.tensor(self.input_index)().reshape(-1, 3)
+        if self.scratch is None:
+            np.take(src.reshape(-1, 3), idx, axis=0, out=out)
+        else:
+            np.take(src.reshape(-1, 3), idx, axis=0, out=self.scratch)
+            if self.normalize:
+                # Float models: -1..1
+                np.subtract(self.scratch, 127.5, out=out)
+                np.multiply(out, 1.0 / 127.5, out=out)
+            else:
+                np.copyto(out, self.scratch, casting='unsafe')
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+try:
+    from gevent import monkey as _monkey
+    # The sampler must be a real OS thread sleeping for real: a greenlet would only ever see itself
+    _sleep = _monkey.get_original('time', 'sleep')
+    _get_ident = _monkey.get_original('_thread', 'get_ident')
+    _Lock = _monkey.get_original('_thread', 'allocate_lock')
+except ImportError:
+    _sleep = time.sleep
+    _get_ident = threading.get_ident
+    _Lock = threading.Lock
+
+from .startup import offload
+
+_MAIN_IDENT = _get_ident() # Imported from the main thread (app.py)
+
+"""
+On-demand sampling profiler.
+A native thread walks sys._current_frames() every interval and counts stacks, returned in the
+collapsed format ("root;caller;leaf count") that flamegraph.pl / speedscope / Perfetto read.
+Under gevent all greenlets share the main OS thread, so each sample is the stack of whichever
+greenlet is running (camera, autopilot, status, request handlers) rooted at its run function;
+"gevent.hub:Hub.run" on top means the loop was idle.
+Overhead is bounded by the interval (default 10 ms) and the max duration; one run at a time.
+"""
+class SamplingProfiler:
+    def __init__(self, config=None):
+        config = config or {}
+        self.interval = config.get('interval_ms', 10) / 1000.0
+        self.max_seconds = config.get('max_seconds', 60)
+        self.max_depth = config.get('max_depth', 64)
+        self.lock = _Lock()
+        self.last = None # Summary of the last run
+
+    @property
+    def running(self):
+        return self.lock.locked()
+
+    def profile(self, seconds, interval_ms=None):
+        """Sample for `seconds` (clamped to max_seconds). Returns None if a run is already in progress.
+        Blocks the calling greenlet only; sampling happens on a pool thread."""
+        if not self.lock.acquire(False): return None
+        try:
+            seconds = max(0.1, min(float(seconds), self.max_seconds))
+            interval = max(0.001, interval_ms / 1000.0) if interval_ms else self.interval
+            return offload(self._sample, seconds, interval)
+        finally:
+            self.lock.release()
+
+    def _sample(self, seconds, interval):
+        me = _get_ident()
+        stacks = Counter()
+        samples = 0
+        busy = 0.0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            t0 = time.perf_counter()
+            if t0 >= deadline: break
+            for ident, frame in sys._current_frames().items():
+                if ident == me: continue
+                stacks[self._collapse(ident, frame)] += 1
+            samples += 1
+            busy += time.perf_counter() - t0
+            _sleep(interval)
+
+        elapsed = time.perf_counter() - start
+        self.last = {
+            "ts": round(time.time(), 1),
+            "duration_s": round(elapsed, 2),
+            "interval_ms": round(interval * 1000, 1),
+            "samples": samples,
+            "stacks": len(stacks),
+            "overhead_pct": round(100.0 * busy / elapsed, 2) if elapsed else 0
+        }
+        return stacks
+
+    def _collapse(self, ident, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            names.append(f"{module}:{getattr(code, 'co_qualname', code.co_name)}")
+            frame = frame.f_back
+        names.append('main' if ident == _MAIN_IDENT else f"thread-{ident}")
+        return ';'.join(reversed(names))
+
+    @staticmethod
+    def collapsed(stacks):
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def status(self):
+        return {"running": self.running, "last": self.last}
@@ -1,6 +1,10 @@
 import math
 import random
 
+import numpy as np
+
+from . import geometry
+
 def rect_intersects(rectA, rectB):
     """
     Check if two rectangles intersect.
@@ -26,15 +30,41 @@ def expand_bbox(bbox, margin):
 def get_head_anchor(bbox):
     """
     Heuristic for cat head: Center X, Top 25% Y.
-    bbox: [x1, y1, x2, y2]
+    bbox: [x1, y1, x2, y2], or an (N, 4) array for N boxes at once
     Returns: (cx, cy)
     """
-    x1, y1, x2, y2 = bbox
+    b = np.asarray(bbox, dtype=float)
+    x1, y1, x2, y2 = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
     cx = (x1 + x2) / 2
     h = y2 - y1
     cy = y1 + (h * 0.25)
     return (cx, cy)
 
+def danger_zones(boxes, margins, head_radii):
+    """
+    Per-class danger zones for N detections in one pass.
+    boxes: (N, 4) [x1, y1, x2, y2]; margins, head_radii: (N,)
+    Returns (N, 2, 4): [:, 0] = body expanded by margin, [:, 1] = square around the head anchor.
+    """
+    boxes = np.asarray(boxes, dtype=float)
+    zones = np.empty((len(boxes), 2, 4))
+    zones[:, 0] = geometry.expand_boxes(boxes, margins)
+    zones[:, 1] = geometry.boxes_around(np.column_stack(get_head_anchor(boxes)), head_radii)
+    return zones
+
+def rect_hits(rect, zones):
+    """
+    Vectorized rect_intersects: one rect [x1, y1, x2, y2] against zones (..., 4).
+    Returns a bool mask with the leading shape of zones.
+    """
+    zones = np.asarray(zones, dtype=float)
+    return geometry.rects_intersect([rect], zones.reshape(-1, 4)).reshape(zones.shape[:-1])
+
+def point_hits(px, py, zones):
+    """Vectorized strict point-in-rect of one point against zones (..., 4)."""
+    zones = np.asarray(zones, dtype=float)
+    return geometry.points_in_rects([[px, py]], zones.reshape(-1, 4)).reshape(zones.shape[:-1])
+
 def get_random_annulus_point(center, r_min, r_max, bounds=(640, 480)):
     """
     Sample a random point within an annulus (ring) around center.
@@ -1,8 +1,8 @@
 import time
-from gpiozero.pins.pigpio import PiGPIOFactory
-from gpiozero import Servo
 import math
 
+from . import metrics
+
 # Configuration from JSON
 PIN_PAN = 27
 PIN_TILT = 17
@@ -17,35 +17,48 @@ PAN_MAX_ANGLE = 180
 TILT_MIN_ANGLE = 0
 TILT_MAX_ANGLE = 180
 
-class ServoController:
-    def __init__(self, factory=None):
-        self.factory = factory
-        if self.factory is None:
-            # Fallback or local testing hack
-            try:
-                self.factory = PiGPIOFactory()
-            except Exception as e:
-                print(f"Warning: Could not connect to pigpio: {e}")
-                self.factory = None
+WRITE_SECONDS = metrics.histogram('laser_servo_write_seconds', 'Servo PWM value write latency')
 
+class ServoController:
+    def __init__(self, factory=None, connect=True):
+        """connect=False: start unconnected (commands only update state) until connect() is called."""
+        self.factory = None
         self.pan_servo = None
         self.tilt_servo = None
+        self.detached = False # detach() (idle power mode): commands only update state
         
         # Initialize Limits (Dynamic)
         self.pan_limits = [PAN_MIN_ANGLE, PAN_MAX_ANGLE]
         self.tilt_limits = [TILT_MIN_ANGLE, TILT_MAX_ANGLE]
         
-        if self.factory:
-            self.pan_servo = Servo(PIN_PAN, min_pulse_width=MIN_PULSE, max_pulse_width=MAX_PULSE, pin_factory=self.factory)
-            self.tilt_servo = Servo(PIN_TILT, min_pulse_width=MIN_PULSE, max_pulse_width=MAX_PULSE, pin_factory=self.factory)
-        
         self.current_pan = 90
         self.current_tilt = 90
         
+        if connect:
+            self.connect(factory)
+        
         # Move to center initially
         # self.set_pan(90)
         # self.set_tilt(80) # Calibrated Center
 
+    def connect(self, factory=None):
+        """Create the servo devices (gpiozero is imported here, it is slow to import)."""
+        from gpiozero import Servo
+        
+        self.factory = factory
+        if self.factory is None:
+            # Fallback or local testing hack
+            try:
+                from gpiozero.pins.pigpio import PiGPIOFactory
+                self.factory = PiGPIOFactory()
+            except Exception as e:
+                print(f"Warning: Could not connect to pigpio: {e}")
+                self.factory = None
+        
+        if self.factory:
+            self.pan_servo = Servo(PIN_PAN, min_pulse_width=MIN_PULSE, max_pulse_width=MAX_PULSE, pin_factory=self.factory)
+            self.tilt_servo = Servo(PIN_TILT, min_pulse_width=MIN_PULSE, max_pulse_width=MAX_PULSE, pin_factory=self.factory)
+
     def set_limits(self, pan_limits=None, tilt_limits=None):
         if pan_limits: self.pan_limits = pan_limits
         if tilt_limits: self.tilt_limits = tilt_limits
@@ -63,12 +76,12 @@ class ServoController:
         limits = [0, 180] if ignore_limits else self.pan_limits
         clamped = max(limits[0], min(angle, limits[1]))
         
-        print(f"[Servo] PanCmd: {angle:.1f} -> {clamped:.1f}")
-        
         self.current_pan = clamped
         if self.pan_servo:
             val = self._map_angle_to_value(clamped)
+            t0 = metrics.now()
             self.pan_servo.value = val
+            WRITE_SECONDS.observe(metrics.now() - t0)
         return clamped
 
     def set_tilt(self, angle, ignore_limits=False):
@@ -76,12 +89,12 @@ class ServoController:
         limits = [0, 180] if ignore_limits else self.tilt_limits
         clamped = max(limits[0], min(angle, limits[1]))
         
-        print(f"[Servo] TiltCmd: {angle:.1f} -> {clamped:.1f}")
-        
         self.current_tilt = clamped
         if self.tilt_servo:
             val = self._map_angle_to_value(clamped)
+            t0 = metrics.now()
             self.tilt_servo.value = val
+            WRITE_SECONDS.observe(metrics.now() - t0)
         return clamped
 
     def move_relative(self, d_pan, d_tilt, ignore_limits=False):
@@ -95,11 +108,23 @@ class ServoController:
         return actual_pan, actual_tilt
 
     def detach(self):
-        """Stop sending pulses to servos"""
+        """Stop sending pulses to servos (no holding torque, no buzz). Commands only update state until attach()."""
         if self.pan_servo:
             self.pan_servo.value = None
             self.pan_servo.close()
+            self.pan_servo = None
         if self.tilt_servo:
             self.tilt_servo.value = None
             self.tilt_servo.close()
+            self.tilt_servo = None
+        self.detached = True
         print("[Servo] Detached")
+
+    def attach(self):
+        """Re-create the servo devices after detach() and drive them back to the last commanded angles."""
+        self.detached = False
+        if not self.factory or self.pan_servo: return
+        self.connect(self.factory)
+        self.pan_servo.value = self._map_angle_to_value(self.current_pan)
+        self.tilt_servo.value = self._map_angle_to_value(self.current_tilt)
+        print("[Servo] Attached")
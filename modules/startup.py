@@ -0,0 +1,87 @@
+import time
+import threading
+
+try:
+    from gevent import monkey as _monkey
+    _GEVENT = _monkey.is_module_patched('threading')
+except ImportError:
+    _GEVENT = False
+
+def offload(fn, *args):
+    """
+    Run a blocking call (C extension init, heavy import) without freezing the server.
+    Under gevent it goes to the hub's native threadpool and only this greenlet waits.
+    Do not spawn threads / greenlets from inside fn (they would attach to the pool thread's hub).
+    """
+    if _GEVENT:
+        import gevent
+        # Exceptions are carried back and re-raised here (the pool would print them as unhandled)
+        def call():
+            try:
+                return True, fn(*args)
+            except Exception as e:
+                return False, e
+        ok, result = gevent.get_hub().threadpool.apply(call)
+        if not ok: raise result
+        return result
+    return fn(*args)
+
+class StartupOrchestrator:
+    """
+    Initializes independent subsystems concurrently and tracks per-subsystem readiness.
+    Each task runs in its own thread (greenlet under gevent); the web server does not wait for them.
+    """
+    def __init__(self, boot_time=None):
+        self.t0 = boot_time or time.time()
+        self.created = time.time()
+        self.tasks = {}
+        self.lock = threading.Lock()
+        self.summary_logged = False
+
+    def run(self, name, fn, on_ready=None):
+        """fn() -> result; on_ready(result) is called on success (in the task thread)."""
+        with self.lock:
+            self.tasks[name] = {"state": "initializing", "started": time.time(), "ms": None,
+                                "error": None, "detail": None}
+            self.summary_logged = False
+        threading.Thread(target=self._run, args=(name, fn, on_ready), daemon=True).start()
+
+    def _run(self, name, fn, on_ready):
+        task = self.tasks[name]
+        try:
+            result = fn()
+            if on_ready: on_ready(result)
+            task["detail"] = result if isinstance(result, str) else None
+            task["state"] = "ready"
+        except Exception as e:
+            task["error"] = str(e)
+            task["state"] = "failed"
+            print(f"[Startup] {name} failed: {e}")
+        task["ms"] = round((time.time() - task["started"]) * 1000)
+        print(f"[Startup] {name} {task['state']} in {task['ms']} ms")
+        self._maybe_log_summary()
+
+    def ready(self, name):
+        task = self.tasks.get(name)
+        return bool(task) and task["state"] == "ready"
+
+    def _maybe_log_summary(self):
+        with self.lock:
+            if self.summary_logged or any(t["ms"] is None for t in self.tasks.values()):
+                return
+            self.summary_logged = True
+        parts = ", ".join(f"{n} {t['ms']} ms" for n, t in self.tasks.items())
+        total = round((time.time() - self.t0) * 1000)
+        imports = round((self.created - self.t0) * 1000)
+        print(f"[Startup] All subsystems settled {total} ms after boot (imports {imports} ms; {parts})")
+
+    def status(self):
+        return {
+            "ready": all(t["state"] == "ready" for t in self.tasks.values()),
+            "uptime_s": round(time.time() - self.t0, 1),
+            "imports_ms": round((self.created - self.t0) * 1000),
+            "subsystems": {
+                n: {k: t[k] for k in ("state", "ms", "error", "detail")}
+                for n, t in self.tasks.items()
+            }
+        }
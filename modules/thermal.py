@@ -0,0 +1,142 @@
+import glob
+import os
+import time
+import threading
+from collections import deque
+
+"""
+Thermal / throttle aware rate governor.
+Reads SoC temperature (thermal zones) and cpufreq state from sysfs and sheds load in priority order:
+    level 1: stream fps (what clients get; detection input unchanged)
+    level 2: stream JPEG quality
+    level 3: inference rate (danger-zone inference stays immediate)
+The AutoPilot safety loop is never touched.
+sysfs_root can point at a fake tree (class/thermal/thermal_zone0/temp, ...) on a dev box.
+"""
+class ThermalGovernor:
+    SOURCE = 'thermal' # Rate cap owner name (camera / detector)
+
+    def __init__(self, config_data, get_camera, get_detector):
+        self.config = config_data.get('thermal', {})
+        self.get_camera = get_camera
+        self.get_detector = get_detector
+
+        self.enabled = self.config.get('enabled', True)
+        self.root = self.config.get('sysfs_root', '/sys')
+        self.interval = self.config.get('interval_s', 2.0)
+        # Entry temperature (C) per level, exit is `hysteresis_c` below it
+        self.thresholds = list(self.config.get('levels_c', [65, 72, 78]))
+        self.hysteresis = self.config.get('hysteresis_c', 3.0)
+        self.throttled_level = self.config.get('throttled_level', 2)
+        self.stream_fps_hot = self.config.get('stream_fps', 5)
+        self.stream_quality_hot = self.config.get('stream_quality', 50)
+        self.inference_fps_hot = self.config.get('inference_fps', 5)
+
+        self.level = 0
+        self.temp_c = None
+        self.freq = {}
+        self.throttled = False
+        self.stream_fps = None # None = no limit (read by the MJPEG generator)
+        self.decisions = deque(maxlen=20)
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running or not self.enabled: return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    # --- sysfs ---
+    def _read_int(self, path):
+        try:
+            with open(path, 'r') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def read_temp(self):
+        """Hottest thermal zone in C, or None if there is none."""
+        temps = [self._read_int(p) for p in glob.glob(os.path.join(self.root, 'class/thermal/thermal_zone*/temp'))]
+        temps = [t for t in temps if t is not None]
+        return max(temps) / 1000.0 if temps else None
+
+    def read_cpufreq(self):
+        base = os.path.join(self.root, 'devices/system/cpu/cpu0/cpufreq')
+        return {
+            "cur_khz": self._read_int(os.path.join(base, 'scaling_cur_freq')),
+            "max_khz": self._read_int(os.path.join(base, 'scaling_max_freq')),
+            "hw_max_khz": self._read_int(os.path.join(base, 'cpuinfo_max_freq'))
+        }
+
+    # --- Policy ---
+    def _target_level(self, temp, throttled):
+        level = self.level
+        # Enter every level whose threshold is reached; leave one only below threshold - hysteresis
+        if temp is not None:
+            while level < len(self.thresholds) and temp >= self.thresholds[level]:
+                level += 1
+            while level > 0 and temp < self.thresholds[level - 1] - self.hysteresis:
+                level -= 1
+        if throttled:
+            level = max(level, self.throttled_level)
+        return level
+
+    def update(self):
+        self.temp_c = self.read_temp()
+        self.freq = self.read_cpufreq()
+        hw_max, cap = self.freq['hw_max_khz'], self.freq['max_khz']
+        # cpufreq cooling device lowered the ceiling below the hardware max
+        self.throttled = bool(hw_max and cap and cap < hw_max)
+
+        level = self._target_level(self.temp_c, self.throttled)
+        # Re-asserted every tick: camera / detector may have been (re)created since
+        self._enforce(level)
+        if level != self.level:
+            self._record(level)
+
+    def _enforce(self, level):
+        camera = self.get_camera()
+        self.stream_fps = self.stream_fps_hot if level >= 1 else None
+        if camera:
+            camera.set_quality_cap(self.SOURCE, self.stream_quality_hot if level >= 2 else None)
+        self.get_detector().set_rate_cap(self.SOURCE, self.inference_fps_hot if level >= 3 else None)
+
+    def _record(self, level):
+        actions = []
+        if level >= 1: actions.append(f"stream_fps={self.stream_fps_hot}")
+        if level >= 2: actions.append(f"jpeg_quality={self.stream_quality_hot}")
+        if level >= 3: actions.append(f"inference_fps={self.inference_fps_hot}")
+        self.decisions.append({
+            "ts": round(time.time(), 1),
+            "from": self.level,
+            "to": level,
+            "temp_c": self.temp_c,
+            "throttled": self.throttled,
+            "actions": actions
+        })
+        temp = f"{self.temp_c:.1f}C" if self.temp_c is not None else "n/a"
+        print(f"[Thermal] Level {self.level} -> {level} (temp {temp}, throttled {self.throttled}): {', '.join(actions) or 'full rate'}")
+        self.level = level
+
+    def _loop(self):
+        while self.running:
+            try:
+                self.update()
+            except Exception as e:
+                print(f"[Thermal] Loop Error: {e}")
+            time.sleep(self.interval)
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "level": self.level,
+            "temp_c": self.temp_c,
+            "throttled": self.throttled,
+            "cpufreq": self.freq,
+            "stream_fps": self.stream_fps,
+            "decisions": list(self.decisions)
+        }
@@ -0,0 +1,108 @@
+import json
+import time
+
+"""
+Per-frame pipeline tracing.
+Spans (name, lane, frame seq, start, duration) go into a fixed-size ring buffer and are exported
+as Chrome trace-event JSON (chrome://tracing, https://ui.perfetto.dev). Spans of the same frame
+are linked with flow arrows, so one frame can be followed from capture to the status emit.
+Off by default; when off, complete() / instant() return after one attribute check.
+Like metrics, writes take no lock (single OS thread under gevent; a torn slot only loses one span).
+"""
+
+# Display order in the viewer
+LANES = ('camera', 'detector', 'autopilot', 'status', 'mjpeg', 'ws_video')
+
+class Tracer:
+    def __init__(self, capacity=8192):
+        self.enabled = False
+        self.capacity = capacity
+        self.buf = [None] * capacity
+        self.pos = 0
+        self.enabled_at = None
+
+    def configure(self, config):
+        capacity = config.get('capacity', self.capacity)
+        if capacity != self.capacity:
+            self.capacity = capacity
+            self.clear()
+        self.set_enabled(config.get('enabled', False))
+
+    def set_enabled(self, enabled):
+        if enabled and not self.enabled:
+            self.enabled_at = time.time()
+        self.enabled = bool(enabled)
+
+    def clear(self):
+        self.buf = [None] * self.capacity
+        self.pos = 0
+
+    def complete(self, name, lane, seq, t0, t1=None):
+        """Record a span that started at t0 (metrics.now() / perf_counter) and ends at t1 (default: now)."""
+        if not self.enabled: return
+        if t1 is None: t1 = time.perf_counter()
+        i = self.pos
+        self.pos = i + 1
+        self.buf[i % self.capacity] = (name, lane, seq, t0, t1 - t0)
+
+    def instant(self, name, lane, seq):
+        if not self.enabled: return
+        i = self.pos
+        self.pos = i + 1
+        self.buf[i % self.capacity] = (name, lane, seq, time.perf_counter(), None)
+
+    def spans(self, seconds=None):
+        """Recorded spans, oldest first, optionally only the last `seconds`."""
+        spans = [s for s in list(self.buf) if s is not None]
+        if seconds:
+            since = time.perf_counter() - seconds
+            spans = [s for s in spans if s[3] >= since]
+        spans.sort(key=lambda s: s[3])
+        return spans
+
+    def export(self, seconds=10):
+        """Chrome trace-event JSON (dict) for the last `seconds`."""
+        spans = self.spans(seconds)
+        lanes = {lane: tid for tid, lane in enumerate(LANES, start=1)}
+        for span in spans:
+            lanes.setdefault(span[1], len(lanes) + 1)
+
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "pi_laser"}}]
+        for lane, tid in lanes.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": lane}})
+            events.append({"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": tid, "args": {"sort_index": tid}})
+
+        by_seq = {}
+        for name, lane, seq, ts, dur in spans:
+            event = {"name": name, "cat": lane, "pid": 1, "tid": lanes[lane], "ts": ts * 1e6, "args": {"seq": seq}}
+            if dur is None:
+                event.update(ph="i", s="t")
+            else:
+                event.update(ph="X", dur=dur * 1e6)
+            events.append(event)
+            if seq:
+                by_seq.setdefault(seq, []).append(event)
+
+        # Flow arrows between consecutive stages of one frame (only where the lane changes)
+        flow_id = 0
+        for chain in by_seq.values():
+            for a, b in zip(chain, chain[1:]):
+                if a["tid"] == b["tid"]: continue
+                flow_id += 1
+                events.append({"name": "frame", "cat": "flow", "ph": "s", "id": flow_id, "pid": 1, "tid": a["tid"], "ts": a["ts"]})
+                events.append({"name": "frame", "cat": "flow", "ph": "f", "bp": "e", "id": flow_id, "pid": 1, "tid": b["tid"], "ts": b["ts"]})
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dumps(self, seconds=10):
+        return json.dumps(self.export(seconds))
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "capacity": self.capacity,
+            "recorded": self.pos,
+            "enabled_at": self.enabled_at
+        }
+
+TRACER = Tracer()
@@ -0,0 +1,118 @@
+import time
+import threading
+
+from . import metrics
+from .tracing import TRACER
+
+CLIENTS = metrics.gauge('laser_ws_video_clients', 'WebSocket video subscribers')
+BYTES = metrics.counter('laser_ws_video_bytes_sent_total', 'JPEG bytes pushed over WebSocket')
+DROPPED = metrics.counter('laser_ws_video_frames_dropped_total', 'Frames skipped for a WebSocket client (latest-only)')
+
+"""
+Binary WebSocket video (lower latency alternative to the MJPEG /video_feed).
+Each subscriber gets 'video_frame' events {seq, ts (capture time, ms), jpeg (binary)}.
+Latest-only: a new frame is sent only when fewer than `window` frames are un-acked
+('video_ack' from the client after it has drawn the frame); everything captured in
+between is dropped, so a slow link or a slow client never builds a backlog.
+"""
+class _Client:
+    def __init__(self):
+        self.active = True
+        self.inflight = 0
+        self.sent_at = 0
+        self.last_seq = 0
+        self.sent = 0
+        self.dropped = 0
+        self.rtt_ms = None
+        self.acked = threading.Event()
+
+class VideoPusher:
+    def __init__(self, config_data, socketio, get_camera, get_stream_fps):
+        self.config = config_data.get('camera', {}).get('ws_video', {})
+        self.socketio = socketio
+        self.get_camera = get_camera
+        self.get_stream_fps = get_stream_fps # None = unlimited (thermal governor)
+
+        self.enabled = self.config.get('enabled', True)
+        self.window = self.config.get('window', 1) # Frames in flight per client
+        self.ack_timeout = self.config.get('ack_timeout_s', 2.0)
+        self.clients = {} # sid -> _Client
+
+    def subscribe(self, sid):
+        if not self.enabled or sid in self.clients: return
+        client = _Client()
+        clients = dict(self.clients) # Copy-on-write: status() may be iterating
+        clients[sid] = client
+        self.clients = clients
+        CLIENTS.inc()
+        self.socketio.start_background_task(self._push_loop, sid, client)
+
+    def unsubscribe(self, sid):
+        if sid not in self.clients: return
+        clients = dict(self.clients)
+        client = clients.pop(sid)
+        self.clients = clients
+        client.active = False
+        client.acked.set()
+        CLIENTS.dec()
+
+    def ack(self, sid, seq):
+        client = self.clients.get(sid)
+        if not client: return
+        client.inflight = max(0, client.inflight - 1)
+        client.rtt_ms = round((time.time() - client.sent_at) * 1000, 1)
+        client.acked.set()
+
+    def _push_loop(self, sid, client):
+        last_sent = 0
+        while client.active:
+            camera = self.get_camera()
+            if not camera:
+                time.sleep(0.5)
+                continue
+
+            # Flow control: wait for the client to draw what it has (a lost ack frees the slot after a while)
+            if client.inflight >= self.window:
+                if time.time() - client.sent_at < self.ack_timeout:
+                    client.acked.clear()
+                    client.acked.wait(0.05)
+                    continue
+                client.inflight = 0
+
+            stream_fps = self.get_stream_fps()
+            if stream_fps:
+                wait = last_sent + 1.0 / stream_fps - time.time()
+                if wait > 0: time.sleep(wait)
+
+            frame, seq, ts = camera.get_frame_info()
+            if not frame or seq == client.last_seq:
+                time.sleep(0.01)
+                continue
+
+            if client.last_seq and seq > client.last_seq + 1:
+                skipped = seq - client.last_seq - 1
+                client.dropped += skipped
+                DROPPED.inc(skipped)
+            client.last_seq = seq
+
+            t_send = metrics.now()
+            client.inflight += 1
+            client.sent_at = last_sent = time.time()
+            try:
+                self.socketio.emit('video_frame', {'seq': seq, 'ts': ts * 1000, 'jpeg': frame}, to=sid)
+            except Exception as e:
+                print(f"[Video] Push to {sid} failed: {e}")
+                self.unsubscribe(sid)
+                return
+            client.sent += 1
+            BYTES.inc(len(frame))
+            TRACER.complete('ws_send', 'ws_video', seq, t_send)
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "clients": [
+                {"sent": c.sent, "dropped": c.dropped, "inflight": c.inflight, "rtt_ms": c.rtt_ms}
+                for c in self.clients.values()
+            ]
+        }
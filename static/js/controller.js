@@ -20,15 +20,57 @@ const txtPanelMode = document.getElementById('panel-mode');
 const valPan = document.getElementById('val-pan');
 const valTilt = document.getElementById('val-tilt');
 const imgStream = document.getElementById('video-stream');
+const videoCanvas = document.getElementById('video-canvas');
+const videoCtx = videoCanvas.getContext('2d');
 const canvas = document.getElementById('video-overlay');
 const ctx = canvas.getContext('2d');
 const elCalibStatus = document.getElementById('calib-status');
 const btnAuto = document.getElementById('btn-toggle-auto');
 
+// --- Video Transport ---
+// WebSocket frames (latest-only, acked) by default; ?video=mjpeg forces the MJPEG stream
+const wantWsVideo = new URLSearchParams(location.search).get('video') !== 'mjpeg' && 'createImageBitmap' in window;
+let wsVideo = false;
+
+function videoElement() {
+    return wsVideo ? videoCanvas : imgStream;
+}
+
+socket.on('video_mode', (data) => {
+    wsVideo = data.enabled;
+    if (wsVideo) {
+        imgStream.style.display = 'none';
+        imgStream.removeAttribute('src'); // Stop the MJPEG download
+        videoCanvas.style.display = 'block';
+    } else if (videoCanvas.style.display !== 'none') {
+        videoCanvas.style.display = 'none';
+        imgStream.style.display = 'block';
+        refreshVideoStream();
+    }
+});
+
+socket.on('video_frame', (msg) => {
+    // msg: { seq, ts (capture time, ms), jpeg (ArrayBuffer) }
+    createImageBitmap(new Blob([msg.jpeg], { type: 'image/jpeg' }))
+        .then((bmp) => {
+            if (videoCanvas.width !== bmp.width || videoCanvas.height !== bmp.height) {
+                videoCanvas.width = bmp.width;
+                videoCanvas.height = bmp.height;
+            }
+            videoCtx.drawImage(bmp, 0, 0);
+            bmp.close();
+            displayedFrameTs = msg.ts;
+        })
+        .catch(() => { })
+        // Ack after drawing: the server sends the next (newest) frame only then
+        .finally(() => socket.emit('video_ack', { seq: msg.seq }));
+});
+
 // --- MJPEG Reconnection Logic ---
 let streamErrors = 0;
 
 imgStream.onerror = () => {
+    if (wsVideo) return;
     console.error("Video Stream Broken. Reconnecting...");
     streamErrors++;
     setTimeout(refreshVideoStream, 1000);
@@ -46,6 +88,7 @@ window.refreshVideoStream = function () {
 socket.on('connect', () => {
     elConn.classList.add('active');
     txtConn.innerText = "Connected";
+    if (wantWsVideo) socket.emit('video_subscribe');
 });
 
 socket.on('disconnect', () => {
@@ -55,12 +98,15 @@ socket.on('disconnect', () => {
 
 socket.on('gimbal_state', (data) => {
     updateUIState(data);
+    if (data.error) alert('Error: ' + data.error);
 });
 
 socket.on('auto_status', (data) => {
-    // data: { state, bbox, roi, roi_radius, frame_size, laser, pan, tilt ... }
-    updateUIState(data);
-    drawOverlay(data);
+    // data: { state, bboxes, roi, roi_radius, frame_size, laser, pan, tilt, ts, det_ts }
+    // Pan / tilt text and the overlay are rendered from the interpolated sample (renderLoop)
+    const { pan, tilt, ...rest } = data;
+    updateUIState(rest);
+    pushStatusSample(data);
 });
 
 function updateUIState(data) {
@@ -106,6 +152,110 @@ function updateUIState(data) {
     if (data.tilt !== undefined) valTilt.innerText = Math.round(data.tilt);
 }
 
+// --- Overlay Interpolation ---
+// auto_status samples carry the server time (ts, ms). The overlay is drawn every animation frame
+// for the time of the frame on screen (WebSocket video) or one status interval in the past (MJPEG),
+// interpolating pan/tilt and ROI between the two samples around that time. Boxes come from the frame
+// they were detected on (det_ts), not from when the status was sent: they get their own timeline with
+// one entry per detection result (inference runs slower than the status rate).
+const STATUS_BUFFER_MAX = 20;
+const statusBuffer = [];
+const detBuffer = [];          // { ts: det_ts, bboxes }, one per detection result
+let clockOffset = null;        // Client clock - server clock (ms), smallest seen (~ clock skew + min latency)
+let statusInterval = 200;      // Measured spacing of status samples (ms)
+let displayedFrameTs = null;   // Capture time (server clock) of the frame on the video canvas
+
+function pushStatusSample(data) {
+    if (data.ts === undefined) {
+        drawOverlay(data); // Server without timestamps: draw as received
+        return;
+    }
+    const offset = Date.now() - data.ts;
+    clockOffset = clockOffset === null ? offset : Math.min(clockOffset, offset);
+    const last = statusBuffer[statusBuffer.length - 1];
+    if (last) {
+        if (data.ts <= last.ts) return;
+        statusInterval = 0.8 * statusInterval + 0.2 * Math.min(1000, data.ts - last.ts);
+    }
+    statusBuffer.push(data);
+    if (statusBuffer.length > STATUS_BUFFER_MAX) statusBuffer.shift();
+
+    if (!data.det_ts) {
+        detBuffer.length = 0; // No (trusted) detections on the server: no stale boxes either
+    } else if (!detBuffer.length || data.det_ts > detBuffer[detBuffer.length - 1].ts) {
+        detBuffer.push({ ts: data.det_ts, bboxes: data.bboxes });
+        if (detBuffer.length > STATUS_BUFFER_MAX) detBuffer.shift();
+    }
+}
+
+const lerp = (a, b, k) => a + (b - a) * k;
+
+function lerpBoxes(a, b, k) {
+    // Same detections in the same order (same labels): move the boxes, otherwise no blending
+    if (!a || !b || a.length !== b.length) return null;
+    const out = [];
+    for (let i = 0; i < a.length; i++) {
+        if (!a[i].bbox || !b[i].bbox || a[i].label !== b[i].label) return null;
+        out.push(Object.assign({}, b[i], { bbox: a[i].bbox.map((v, j) => lerp(v, b[i].bbox[j], k)) }));
+    }
+    return out;
+}
+
+function boxesAt(t) {
+    // Boxes of the detection results around frame time t
+    const n = detBuffer.length;
+    if (!n) return [];
+    if (t <= detBuffer[0].ts) return detBuffer[0].bboxes;
+    if (t >= detBuffer[n - 1].ts) return detBuffer[n - 1].bboxes;
+
+    let i = n - 1;
+    while (detBuffer[i - 1].ts > t) i--;
+    const a = detBuffer[i - 1];
+    const b = detBuffer[i];
+    const k = (t - a.ts) / (b.ts - a.ts);
+    return lerpBoxes(a.bboxes, b.bboxes, k) || (k < 0.5 ? a : b).bboxes;
+}
+
+function sampleAt(t) {
+    const n = statusBuffer.length;
+    if (t <= statusBuffer[0].ts) return Object.assign({}, statusBuffer[0], { bboxes: boxesAt(t) });
+    if (t >= statusBuffer[n - 1].ts) return Object.assign({}, statusBuffer[n - 1], { bboxes: boxesAt(t) }); // Hold, never extrapolate
+
+    let i = n - 1;
+    while (statusBuffer[i - 1].ts > t) i--;
+    const a = statusBuffer[i - 1];
+    const b = statusBuffer[i];
+    const k = (t - a.ts) / (b.ts - a.ts);
+    const near = k < 0.5 ? a : b;
+
+    const s = Object.assign({}, near);
+    s.pan = lerp(a.pan, b.pan, k);
+    s.tilt = lerp(a.tilt, b.tilt, k);
+    s.roi = (a.roi && b.roi) ? [lerp(a.roi[0], b.roi[0], k), lerp(a.roi[1], b.roi[1], k)] : near.roi;
+    s.bboxes = boxesAt(t);
+    return s;
+}
+
+let shownPan = null;
+let shownTilt = null;
+
+function renderLoop() {
+    if (statusBuffer.length) {
+        const t = (wsVideo && displayedFrameTs) ? displayedFrameTs : Date.now() - clockOffset - statusInterval;
+        const s = sampleAt(t);
+        drawOverlay(s);
+
+        // Touch the DOM only when the shown value changes
+        const pan = Math.round(s.pan);
+        const tilt = Math.round(s.tilt);
+        if (pan !== shownPan) { valPan.innerText = pan; shownPan = pan; }
+        if (tilt !== shownTilt) { valTilt.innerText = tilt; shownTilt = tilt; }
+    }
+    requestAnimationFrame(renderLoop);
+}
+
+requestAnimationFrame(renderLoop);
+
 // --- Overlay Logic ---
 function drawOverlay(data) {
     if (!data.frame_size) return;
@@ -120,8 +270,11 @@ function drawOverlay(data) {
 
     // Sync Display Size with Image Element
     // This ensures coordinate translation is correct if we used click event on canvas
-    canvas.style.width = imgStream.clientWidth + 'px';
-    canvas.style.height = imgStream.clientHeight + 'px';
+    // (only on change: style writes every animation frame would force layout)
+    const dw = videoElement().clientWidth + 'px';
+    const dh = videoElement().clientHeight + 'px';
+    if (canvas.style.width !== dw) canvas.style.width = dw;
+    if (canvas.style.height !== dh) canvas.style.height = dh;
 
     ctx.clearRect(0, 0, fw, fh);
 
@@ -173,6 +326,10 @@ function drawOverlay(data) {
                 [bx, by, bw, bh] = det;
             }
 
+            // Safety-only classes (person, dog...) in orange, targets in red
+            const color = det.role === 'safety' ? 'orange' : 'red';
+            ctx.strokeStyle = color;
+            ctx.fillStyle = color;
             ctx.strokeRect(bx, by, bw, bh);
 
             if (label) {
@@ -281,6 +438,49 @@ document.getElementById('btn-calib-reset').addEventListener('click', () => {
         });
 });
 
+// Auto Calibration: servo sweep + laser dot detection on the server
+let sweepTimer = null;
+
+document.getElementById('btn-calib-auto').addEventListener('click', () => {
+    if (sweepTimer) {
+        fetch('/api/calibration/auto/stop', { method: 'POST' });
+        return;
+    }
+    if (!confirm("Run automatic calibration sweep? (New samples are added to the existing ones unless calibration.sweep.clear_existing is set)")) return;
+
+    fetch('/api/calibration/auto', { method: 'POST' })
+        .then(r => r.json())
+        .then(d => {
+            if (!d.success) {
+                elCalibStatus.innerText = `Auto Calibration: ${d.msg}`;
+                elCalibStatus.style.color = "#f00";
+                return;
+            }
+            sweepTimer = setInterval(pollSweep, 500);
+        });
+});
+
+function pollSweep() {
+    fetch('/api/calibration/auto')
+        .then(r => r.json())
+        .then(d => {
+            elCalibStatus.innerText = `Sweep ${d.state}: ${d.visited}/${d.total} points, ${d.found} dots (${d.elapsed_s}s)`;
+            elCalibStatus.style.color = "#0cf";
+            if (d.state === 'RUNNING') return;
+
+            clearInterval(sweepTimer);
+            sweepTimer = null;
+            sampleCount = d.found;
+            if (d.result && d.result.success) {
+                elCalibStatus.innerText = `Calibrated (${d.result.model}) from ${d.found} dots, RMSE ${d.result.rmse_px.toFixed(1)}px`;
+                elCalibStatus.style.color = "#0f0";
+            } else {
+                elCalibStatus.innerText = `Sweep ${d.state}: ${d.result ? d.result.msg : ''}`;
+                elCalibStatus.style.color = "#f00";
+            }
+        });
+}
+
 // Update Canvas Click to handle 'general' and update count
 // ... (Logic is inside canvas.click, checking calibMode) ...
 // We need to modify the canvas.click Handler in this file too? 
@@ -423,8 +623,25 @@ window.addEventListener('keyup', (e) => {
 });
 
 // --- Main Control Loop ---
+// Only axis changes are sent; the server integrates them at a fixed rate.
+// While held, the state is re-sent every AXIS_KEEPALIVE_MS (server dead-man is 500 ms).
+const AXIS_KEEPALIVE_MS = 200;
+const AXIS_STEP = 0.05; // Smaller stick changes are not worth a message
+let lastAxes = { pan: 0, tilt: 0 };
 let lastAxisEmit = 0;
 
+function sendAxes(pan, tilt) {
+    const now = Date.now();
+    const changed = Math.abs(pan - lastAxes.pan) >= AXIS_STEP || Math.abs(tilt - lastAxes.tilt) >= AXIS_STEP ||
+        ((pan === 0) !== (lastAxes.pan === 0)) || ((tilt === 0) !== (lastAxes.tilt === 0));
+    const held = pan !== 0 || tilt !== 0;
+    if (!changed && !(held && now - lastAxisEmit >= AXIS_KEEPALIVE_MS)) return;
+
+    socket.emit('joystick_control', { pan_axis: pan, tilt_axis: tilt });
+    lastAxes = { pan: pan, tilt: tilt };
+    lastAxisEmit = now;
+}
+
 function handleButtons(gp) {
     if (gp.buttons[0].pressed && !lastBtnA) {
         socket.emit('toggle_laser');
@@ -441,51 +658,44 @@ function handleButtons(gp) {
     }
 }
 
-function handleAxes(gp) {
-    if (currentMode !== 'manual') return;
-    const now = Date.now();
-    if (now - lastAxisEmit < 20) return;
-
-    const pan = gp.axes[0];
-    const tilt = gp.axes[1];
-
-    if (Math.abs(pan) > 0.05 || Math.abs(tilt) > 0.05) {
-        socket.emit('joystick_control', { pan_axis: pan, tilt_axis: tilt });
-        lastAxisEmit = now;
-    }
+function gamepadAxes(gp) {
+    const dz = (v) => (Math.abs(v) > 0.05 ? v : 0);
+    return { pan: dz(gp.axes[0]), tilt: dz(gp.axes[1]) };
 }
 
-function handleKeyboardAxes() {
-    if (currentMode !== 'manual') return;
-    const now = Date.now();
-    if (now - lastAxisEmit < 20) return;
-
+function keyboardAxes() {
     let pan = 0;
     let tilt = 0;
     if (keys.left) pan -= 1;
     if (keys.right) pan += 1;
     if (keys.up) tilt -= 1;
     if (keys.down) tilt += 1;
-
-    if (pan !== 0 || tilt !== 0) {
-        socket.emit('joystick_control', { pan_axis: pan, tilt_axis: tilt });
-        lastAxisEmit = now;
-    }
+    return { pan: pan, tilt: tilt };
 }
 
 function updateLoop() {
+    let axes = { pan: 0, tilt: 0 };
     // 1. Handle Gamepad
     if (gamepadIndex !== null) {
         const gp = navigator.getGamepads()[gamepadIndex];
         if (gp) {
             handleButtons(gp);
-            handleAxes(gp);
+            axes = gamepadAxes(gp);
         }
     }
-    // 2. Handle Keyboard
-    handleKeyboardAxes();
+    // 2. Handle Keyboard (when the stick is centered)
+    if (axes.pan === 0 && axes.tilt === 0) axes = keyboardAxes();
+
+    // Outside manual mode the stick is released (server ignores it anyway)
+    if (currentMode !== 'manual') axes = { pan: 0, tilt: 0 };
+    sendAxes(axes.pan, axes.tilt);
     requestAnimationFrame(updateLoop);
 }
 
+// Keys released while the tab is in the background never fire keyup
+window.addEventListener('blur', () => {
+    keys.up = keys.down = keys.left = keys.right = false;
+});
+
 // Start Loop
 updateLoop();
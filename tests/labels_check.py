@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules.labels import LabelTable
+
+# ==========================================
+# LabelTable on real ndarray detector output
+# Run: python tests/labels_check.py
+# ==========================================
+
+LABELS = {0: 'person', 16: 'cat', 17: 'dog', 62: 'chair'}
+
+def check_roles():
+    table = LabelTable(LABELS, ['cat'], ['person', 'dog'])
+    # Same shape/dtype as the TFLite SSD postprocess output (float32 class ids)
+    classes = np.array([16.0, 0.0, 17.0], dtype=np.float32)
+    cids = table.lookup(classes)
+    roles = [table.role(cids[i]) for i in range(len(cids))]
+    assert roles == ['target', 'safety', 'safety'], roles
+    assert [table.name(c) for c in cids] == ['cat', 'person', 'dog']
+    assert all(table.allowed[cids])
+    print("✅ role() / name() on ndarray class ids")
+
+def check_out_of_range():
+    table = LabelTable(LABELS, ['cat'], ['person', 'dog'])
+    classes = np.array([-1.0, -7.0, 500.0, 63.0], dtype=np.float32)
+    cids = table.lookup(classes)
+    # Garbage ids must not turn into class 0 ('person') and trigger an evade
+    assert (cids == table.unknown).all(), cids
+    assert not table.allowed[cids].any()
+    assert table.name(cids[0], -1) == 'unknown_-1'
+    print("✅ Out-of-range class ids -> unknown sentinel")
+
+def check_allow_all():
+    table = LabelTable(LABELS, [], ['person'])
+    cids = table.lookup(np.array([62.0, 0.0], dtype=np.float32))
+    assert [table.role(c) for c in cids] == ['target', 'target']
+    print("✅ Empty target_classes allows everything")
+
+if __name__ == '__main__':
+    check_roles()
+    check_out_of_range()
+    check_allow_all()
+    print("All label checks passed.")
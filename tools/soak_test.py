@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Soak test: runs the whole app (mock camera + mock detector) in-process for hours under simulated
+clients and watches for slow leaks and latency drift.
+
+Clients: MJPEG viewers (reconnecting), Socket.IO clients (joystick / mode switches, drain auto_status),
+REST pollers (/api/health, /api/detections, /metrics) and a simulated cat moving through the frame.
+Sampled every --sample-every seconds: RSS, tracemalloc heap, GC pauses, per-stage latency
+percentiles (from modules/metrics histograms) and client-side latencies.
+Writes a JSON report and exits 1 when a threshold is exceeded.
+
+Usage (from the repo root):
+    python tools/soak_test.py --duration 4h --report soak_report.json
+    python tools/soak_test.py --duration 10m --sample-every 30 --warmup 60
+The app runs on a scratch copy of config/ (nothing in the repo is written).
+"""
+import time
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import urllib.request
+
+import gevent
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+def parse_duration(text):
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    text = str(text).strip().lower()
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+def percentile(values, q):
+    if not values: return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(math.ceil(q * len(values))) - 1)]
+
+def hist_percentile(bounds, counts, q):
+    """histogram_quantile()-style estimate (linear within the bucket) from per-window bucket counts."""
+    total = sum(counts)
+    if not total: return None
+    rank = q * total
+    cum = 0
+    for i, n in enumerate(counts):
+        if cum + n >= rank and n:
+            if i >= len(bounds): return bounds[-1] # +Inf bucket: clamp to the largest bound
+            lower = bounds[i - 1] if i else 0.0
+            return lower + (bounds[i] - lower) * (rank - cum) / n
+        cum += n
+    return bounds[-1]
+
+def read_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0 # Peak, not current (non-Linux)
+
+def slope_per_hour(points):
+    """Least-squares slope of [(t_s, value)] in value/hour."""
+    if len(points) < 2: return 0.0
+    n = len(points)
+    mt = sum(t for t, _ in points) / n
+    mv = sum(v for _, v in points) / n
+    den = sum((t - mt) ** 2 for t, _ in points)
+    if not den: return 0.0
+    return sum((t - mt) * (v - mv) for t, v in points) / den * 3600
+
+class GcPauses:
+    """Collects GC pause durations through gc.callbacks."""
+    def __init__(self):
+        self.start = None
+        self.pauses = [] # (generation, seconds) in the current window
+        gc.callbacks.append(self._cb)
+
+    def _cb(self, phase, info):
+        if phase == 'start':
+            self.start = time.perf_counter()
+        elif self.start is not None:
+            self.pauses.append((info.get('generation'), time.perf_counter() - self.start))
+            self.start = None
+
+    def take(self):
+        pauses, self.pauses = self.pauses, []
+        return pauses
+
+class Stats:
+    """Per-window client-side latencies / counts (reset on every sample)."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.rest_s = []
+        self.mjpeg_gap_s = []
+        self.mjpeg_frames = 0
+        self.mjpeg_bytes = 0
+        self.status_msgs = 0
+        self.errors = 0
+
+# --- Simulated clients ---
+def mjpeg_client(base_url, stats, reconnect_s):
+    while True:
+        try:
+            resp = urllib.request.urlopen(base_url + '/video_feed', timeout=10)
+            until = time.time() + reconnect_s * random.uniform(0.5, 1.5)
+            last = None
+            while time.time() < until:
+                chunk = resp.read1(65536)
+                if not chunk: break
+                stats.mjpeg_bytes += len(chunk)
+                frames = chunk.count(b'--frame')
+                if frames:
+                    now = time.perf_counter()
+                    if last is not None: stats.mjpeg_gap_s.append(now - last)
+                    last = now
+                    stats.mjpeg_frames += frames
+            resp.close() # Exercises generator teardown on the server
+        except Exception:
+            stats.errors += 1
+            gevent.sleep(1.0)
+
+def rest_client(base_url, stats, interval_s):
+    paths = ['/api/health', '/api/detections', '/metrics']
+    while True:
+        for path in paths:
+            t0 = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + path, timeout=10) as resp:
+                    resp.read()
+                stats.rest_s.append(time.perf_counter() - t0)
+            except Exception:
+                stats.errors += 1
+            gevent.sleep(interval_s)
+
+def socket_client(app_module, stats, driver):
+    client = app_module.socketio.test_client(app_module.app)
+    phase_end = 0
+    manual = False
+    while True:
+        now = time.time()
+        if driver and now > phase_end:
+            # Mostly ROAM (safety loop busy), short manual stretches with joystick input
+            manual = not manual
+            client.emit('set_mode', {'mode': 'manual' if manual else 'auto'})
+            phase_end = now + (10 if manual else 60)
+        if manual:
+            client.emit('joystick_control', {'pan_axis': random.uniform(-1, 1), 'tilt_axis': random.uniform(-1, 1)})
+        # Drain what the server pushed (the test client buffers everything)
+        stats.status_msgs += sum(1 for msg in client.get_received() if msg['name'] == 'auto_status')
+        gevent.sleep(0.05)
+
+def cat_simulator(app_module):
+    from modules.detector import MockDetector
+    x, y, vx, vy = 320.0, 240.0, 6.0, 4.0
+    while True:
+        det = app_module.detector
+        if isinstance(det, MockDetector):
+            x += vx
+            y += vy
+            if not 60 < x < 580: vx = -vx
+            if not 60 < y < 420: vy = -vy
+            det.set_detection(x, y, 120, 90, 640, 480)
+        gevent.sleep(0.2)
+
+# --- Harness ---
+def make_workspace():
+    """Scratch copy of config/ with the mock detector forced and idle mode off."""
+    work = tempfile.mkdtemp(prefix='pi_laser_soak_')
+    shutil.copytree(os.path.join(ROOT, 'config'), os.path.join(work, 'config'))
+    path = os.path.join(work, 'config', 'config.json')
+    with open(path) as f:
+        config = json.load(f)
+    config.setdefault('detector', {})['current'] = 'mock'
+    config.setdefault('power', {})['enabled'] = False
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=4)
+    return work
+
+def histogram_windows(registry, prev):
+    """Per-stage p50/p95/p99 (ms) over the counts added since `prev` (updated in place)."""
+    stages = {}
+    for name, metric in registry.metrics.items():
+        if metric.kind != 'histogram': continue
+        counts = list(metric.counts)
+        last = prev.get(name, [0] * len(counts))
+        window = [c - p for c, p in zip(counts, last)]
+        prev[name] = counts
+        if not sum(window): continue
+        stages[name] = {
+            "count": sum(window),
+            "p50_ms": round(hist_percentile(metric.bounds, window, 0.50) * 1000, 2),
+            "p95_ms": round(hist_percentile(metric.bounds, window, 0.95) * 1000, 2),
+            "p99_ms": round(hist_percentile(metric.bounds, window, 0.99) * 1000, 2)
+        }
+    return stages
+
+def evaluate(samples, args, gc_max_ms):
+    steady = [s for s in samples if not s['warmup']]
+    failures = []
+    summary = {"samples": len(steady)}
+    if len(steady) < 2:
+        failures.append("Not enough post-warm-up samples (increase --duration or lower --sample-every)")
+        return summary, failures
+
+    rss_growth = steady[-1]['rss_mb'] - steady[0]['rss_mb']
+    heap_growth = (steady[-1]['heap_mb'] - steady[0]['heap_mb']) if steady[0]['heap_mb'] is not None else None
+    summary.update({
+        "rss_start_mb": steady[0]['rss_mb'],
+        "rss_end_mb": steady[-1]['rss_mb'],
+        "rss_growth_mb": round(rss_growth, 2),
+        "rss_slope_mb_per_h": round(slope_per_hour([(s['t'], s['rss_mb']) for s in steady]), 2),
+        "heap_growth_mb": round(heap_growth, 2) if heap_growth is not None else None,
+        "gc_max_pause_ms": round(gc_max_ms, 2)
+    })
+    if rss_growth > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {rss_growth:.1f} MB (> {args.max_rss_growth_mb} MB)")
+    if heap_growth is not None and heap_growth > args.max_heap_growth_mb:
+        failures.append(f"Python heap grew {heap_growth:.1f} MB (> {args.max_heap_growth_mb} MB)")
+    if gc_max_ms > args.max_gc_pause_ms:
+        failures.append(f"GC pause {gc_max_ms:.1f} ms (> {args.max_gc_pause_ms} ms)")
+
+    # Latency drift: p99 of the last third of the run vs the first third (median of the window p99s)
+    third = max(1, len(steady) // 3)
+    drift = {}
+    for stage in sorted({k for s in steady for k in s['stages']}):
+        early = [s['stages'][stage]['p99_ms'] for s in steady[:third] if stage in s['stages']]
+        late = [s['stages'][stage]['p99_ms'] for s in steady[-third:] if stage in s['stages']]
+        if not early or not late: continue
+        e, l = percentile(early, 0.5), percentile(late, 0.5)
+        drift[stage] = {"early_p99_ms": e, "late_p99_ms": l}
+        if l > e * args.max_latency_drift and l - e > args.drift_floor_ms:
+            failures.append(f"{stage} p99 drifted {e:.1f} -> {l:.1f} ms (> x{args.max_latency_drift})")
+    summary["latency_drift"] = drift
+    return summary, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test the app in mock mode")
+    parser.add_argument('--duration', default='1h', help="e.g. 4h, 30m, 600 (seconds)")
+    parser.add_argument('--warmup', default='2m', help="Excluded from growth / drift checks")
+    parser.add_argument('--sample-every', type=float, default=60.0, help="Seconds between samples")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--mjpeg-clients', type=int, default=2)
+    parser.add_argument('--mjpeg-reconnect-s', type=float, default=30.0)
+    parser.add_argument('--socket-clients', type=int, default=2)
+    parser.add_argument('--rest-clients', type=int, default=1)
+    parser.add_argument('--rest-interval-s', type=float, default=0.5)
+    parser.add_argument('--no-tracemalloc', action='store_true', help="Skip heap tracking (it slows Python ~2x)")
+    parser.add_argument('--top', type=int, default=15, help="tracemalloc allocators in the report")
+    parser.add_argument('--report', default='soak_report.json')
+    # Thresholds
+    parser.add_argument('--max-rss-growth-mb', type=float, default=30.0)
+    parser.add_argument('--max-heap-growth-mb', type=float, default=20.0)
+    parser.add_argument('--max-gc-pause-ms', type=float, default=100.0)
+    parser.add_argument('--max-latency-drift', type=float, default=1.5, help="Late / early p99 ratio")
+    parser.add_argument('--drift-floor-ms', type=float, default=2.0, help="Ignore drift smaller than this")
+    args = parser.parse_args()
+
+    duration = parse_duration(args.duration)
+    warmup = parse_duration(args.warmup)
+    report_path = os.path.abspath(args.report)
+
+    work = make_workspace()
+    os.chdir(work)
+    print(f"[Soak] Workspace {work}, duration {duration:.0f}s, warm-up {warmup:.0f}s")
+
+    if not args.no_tracemalloc:
+        tracemalloc.start(1)
+    gcp = GcPauses()
+
+    import app as app_module
+    from modules.metrics import REGISTRY
+    app_module.start_background()
+    gevent.spawn(app_module.socketio.run, app_module.app, host='127.0.0.1', port=args.port,
+                 use_reloader=False, log_output=False)
+    gevent.sleep(1.0)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    stats = Stats()
+    for _ in range(args.mjpeg_clients):
+        gevent.spawn(mjpeg_client, base_url, stats, args.mjpeg_reconnect_s)
+    for _ in range(args.rest_clients):
+        gevent.spawn(rest_client, base_url, stats, args.rest_interval_s)
+    for i in range(args.socket_clients):
+        gevent.spawn(socket_client, app_module, stats, i == 0)
+    gevent.spawn(cat_simulator, app_module)
+
+    samples = []
+    prev_hist = {}
+    baseline = None
+    gc_max_ms = 0.0
+    start = time.time()
+    next_sample = start + args.sample_every
+    while time.time() - start < duration:
+        gevent.sleep(max(0, next_sample - time.time()))
+        next_sample += args.sample_every
+        t = time.time() - start
+        is_warmup = t < warmup
+
+        pauses = [p for _, p in gcp.take()]
+        window = args.sample_every
+        sample = {
+            "t": round(t, 1),
+            "warmup": is_warmup,
+            "rss_mb": round(read_rss_mb(), 2),
+            "heap_mb": round(tracemalloc.get_traced_memory()[0] / 2**20, 2) if tracemalloc.is_tracing() else None,
+            "gc": {
+                "collections": len(pauses),
+                "max_ms": round(max(pauses) * 1000, 2) if pauses else 0,
+                "total_ms": round(sum(pauses) * 1000, 2)
+            },
+            "stages": histogram_windows(REGISTRY, prev_hist),
+            "clients": {
+                "rest_p50_ms": round(percentile(stats.rest_s, 0.5) * 1000, 2) if stats.rest_s else None,
+                "rest_p99_ms": round(percentile(stats.rest_s, 0.99) * 1000, 2) if stats.rest_s else None,
+                "mjpeg_fps": round(stats.mjpeg_frames / window / max(1, args.mjpeg_clients), 1),
+                "mjpeg_gap_p99_ms": round(percentile(stats.mjpeg_gap_s, 0.99) * 1000, 1) if stats.mjpeg_gap_s else None,
+                "mjpeg_mb": round(stats.mjpeg_bytes / 2**20, 1),
+                "status_msgs": stats.status_msgs,
+                "errors": stats.errors
+            },
+            "app": {
+                "autopilot": app_module.autopilot.state,
+                "mjpeg_generators": REGISTRY.metrics['laser_mjpeg_clients'].value,
+                "calibration_samples": len(app_module.calibration.store),
+                "greenlets": sum(1 for o in gc.get_objects() if isinstance(o, gevent.Greenlet))
+            }
+        }
+        stats.reset()
+        if not is_warmup:
+            gc_max_ms = max(gc_max_ms, sample['gc']['max_ms'])
+            if baseline is None and tracemalloc.is_tracing():
+                baseline = tracemalloc.take_snapshot()
+        samples.append(sample)
+        print(f"[Soak] t={t:7.0f}s rss={sample['rss_mb']:.1f}MB heap={sample['heap_mb']}MB "
+              f"gc_max={sample['gc']['max_ms']}ms rest_p99={sample['clients']['rest_p99_ms']}ms "
+              f"mjpeg={sample['clients']['mjpeg_fps']}fps errors={sample['clients']['errors']}{' (warm-up)' if is_warmup else ''}")
+
+    summary, failures = evaluate(samples, args, gc_max_ms)
+
+    allocators = []
+    if baseline is not None:
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        for diff in snapshot.compare_to(baseline, 'lineno')[:args.top]:
+            frame = diff.traceback[0]
+            allocators.append({
+                "where": f"{os.path.relpath(frame.filename, ROOT)}:{frame.lineno}",
+                "size_diff_kb": round(diff.size_diff / 1024, 1),
+                "count_diff": diff.count_diff,
+                "size_kb": round(diff.size / 1024, 1)
+            })
+
+    report = {
+        "args": vars(args),
+        "passed": not failures,
+        "failures": failures,
+        "summary": summary,
+        "top_allocators": allocators,
+        "samples": samples
+    }
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[Soak] Summary: {json.dumps({k: v for k, v in summary.items() if k != 'latency_drift'})}")
+    for a in allocators[:5]:
+        print(f"[Soak]   +{a['size_diff_kb']}KB ({a['count_diff']:+d}) {a['where']}")
+    for msg in failures:
+        print(f"[Soak] FAIL: {msg}")
+    print(f"[Soak] {'PASSED' if not failures else 'FAILED'} - report written to {report_path}")
+    shutil.rmtree(work, ignore_errors=True)
+    os._exit(0 if not failures else 1) # Daemon loops / server greenlet would keep the hub alive
+
+if __name__ == '__main__':
+    main()